@@ -0,0 +1,241 @@
+import json
+import platform
+import random
+import statistics
+import string
+import subprocess
+import time
+from dataclasses import dataclass
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from courses.models import Course, Permission
+from courses_platform_api.choices_types import ProfileRoles
+from lessons.models import Lesson, Question, Option
+from users.mixin import UserMixin
+from users.models import Lead
+from users.serializers import TokenEmailObtainPairSerializer
+from users.views import UsersListAPIView
+
+User = get_user_model()
+
+BENCHMARK_PASSWORD = 'Benchmark-password-1'
+
+
+@dataclass
+class DataSize:
+    tenants: int = 2
+    admins: int = 2
+    curators: int = 3
+    learners: int = 100
+    courses: int = 3
+    lessons: int = 5
+    questions: int = 5
+    options: int = 4
+    enrollments: int = 2
+
+
+class DataGenerator:
+    """
+    Deterministic synthetic data: the same seed and size build the same tenants, prefix of emails and slugs
+    allows to generate them more than once.
+    Every tenant has administrators with profile access, their curators, courses with lessons and tests,
+    and learners enrolled in courses of the tenant. Rows are inserted by bulk_create.
+    """
+    slug_chars = string.ascii_letters + string.digits
+
+    def __init__(self, size, seed=0, prefix='bench'):
+        self.size = size
+        self.rnd = random.Random(seed)
+        self.slugs_rnd = random.Random(f'{prefix}-{seed}')
+        self.prefix = prefix
+        self.password = make_password(BENCHMARK_PASSWORD)
+        self.counter = 0
+
+    def slug(self):
+        self.counter += 1
+        return ''.join(self.slugs_rnd.choice(self.slug_chars) for _ in range(12)) + f'-{self.counter}'
+
+    def users(self, tenant, role, name, count):
+        return User.objects.bulk_create([
+            User(slug=self.slug(), role=role, email=f'{self.prefix}-{tenant}-{name}{i}@example.com',
+                 first_name=f'{name.capitalize()}{i}', last_name=f'Tenant{tenant}', password=self.password)
+            for i in range(count)
+        ], batch_size=2000)
+
+    def generate(self):
+        size, tenants = self.size, []
+        superuser = User.objects.bulk_create([User(slug=self.slug(), role=ProfileRoles.SUPERUSER,
+                                                   email=f'{self.prefix}-superuser@example.com',
+                                                   password=self.password)])[0]
+        for tenant in range(size.tenants):
+            admins = self.users(tenant, ProfileRoles.ADMINISTRATOR, 'admin', size.admins)
+            curators = self.users(tenant, ProfileRoles.CURATOR, 'curator', size.curators)
+            learners = self.users(tenant, ProfileRoles.LEARNER, 'learner', size.learners)
+            Permission.objects.bulk_create([Permission(user=admin, access=True) for admin in admins])
+            Lead.objects.bulk_create([Lead(user=curator, lead=self.rnd.choice(admins)) for curator in curators])
+
+            courses = Course.objects.bulk_create([
+                Course(slug=self.slug(), admin=admin, name=f'Course {i} of {admin.first_name}',
+                       description='Description ' * 20)
+                for admin in admins for i in range(size.courses)
+            ])
+            lessons = Lesson.objects.bulk_create([
+                Lesson(course=course, sort=i, name=f'Lesson {i}', text='Text ' * 100, test=bool(size.questions),
+                       free_access=i == 0)
+                for course in courses for i in range(size.lessons)
+            ], batch_size=2000)
+            questions = Question.objects.bulk_create([
+                Question(lesson=lesson, question=f'Question {i}')
+                for lesson in lessons for i in range(size.questions)
+            ], batch_size=2000)
+            Option.objects.bulk_create([
+                Option(question=question, option=f'Option {i}', correct=i == 0)
+                for question in questions for i in range(size.options)
+            ], batch_size=5000)
+
+            enrollments = min(size.enrollments, len(courses))
+            Permission.objects.bulk_create([
+                Permission(user=learner, course=course, access=self.rnd.random() < 0.8)
+                for learner in learners for course in self.rnd.sample(courses, enrollments)
+            ], batch_size=5000)
+            tenants.append({'admins': admins, 'curators': curators, 'learners': learners, 'courses': courses,
+                            'lessons': lessons})
+        return superuser, tenants
+
+
+class Benchmark:
+    """
+    Requests go through the whole stack of urls, middlewares and views in the process,
+    latency, throughput and count of SQL queries are measured for every scenario
+    """
+    def __init__(self, repeat=20, warmup=2):
+        self.repeat = repeat
+        self.warmup = warmup
+        self.client = Client(HTTP_HOST='localhost')
+
+    @staticmethod
+    def auth(user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {TokenEmailObtainPairSerializer.get_token(user).access_token}'}
+
+    def scenarios(self, superuser, tenant):
+        admin, curator = tenant['admins'][0], tenant['curators'][0]
+        course = tenant['courses'][0]
+        lesson = tenant['lessons'][0]
+        permissions = Permission.objects.filter(course=course, access=True).select_related('user')
+        learners = [permission.user for permission in permissions[:self.repeat + self.warmup]]
+        learner = learners[0] if learners else tenant['learners'][0]
+        course_url = reverse('v1.0:courses:course-detail', args=[course.slug])
+        lesson_url = reverse('v1.0:courses:lessons:lesson-detail', args=[course.slug, lesson.pk])
+        answers = {str(i): option for i, option in
+                   enumerate(Option.objects.filter(question__lesson=lesson, correct=True).values_list('id', flat=True))}
+
+        yield 'token', lambda i: self.client.post(reverse('v1.0:token_obtain_pair'),
+                                                  {'email': learner.email, 'password': BENCHMARK_PASSWORD})
+        courses_url, users_url = reverse('v1.0:courses:course-list'), reverse('v1.0:users:user-list')
+        for name, user in (('superuser', superuser), ('administrator', admin), ('curator', curator),
+                           ('learner', learner)):
+            headers = self.auth(user)
+            yield f'courses list ({name})', lambda i, h=headers: self.client.get(courses_url, **h)
+            if name != 'learner':
+                yield f'users list ({name})', lambda i, h=headers: self.client.get(users_url, **h)
+        headers = self.auth(admin)
+        yield 'course detail (administrator)', lambda i: self.client.get(course_url, **headers)
+        yield 'course learners list (administrator)', lambda i: self.client.get(
+            reverse('v1.0:courses:course-learner-list', args=[course.slug]), **headers)
+        headers = self.auth(learner)
+        yield 'lessons list (learner)', lambda i: self.client.get(
+            reverse('v1.0:courses:lessons:lesson-list', args=[course.slug]), **headers)
+        yield 'lesson detail (learner)', lambda i: self.client.get(lesson_url, **headers)
+        if learners and answers:
+            learners_headers = [self.auth(user) for user in learners]
+            result_url = reverse('v1.0:courses:lessons:lesson-test-result', args=[course.slug, lesson.pk])
+            yield 'grading (learner)', lambda i: self.client.post(result_url, answers, content_type='application/json',
+                                                                  **learners_headers[i % len(learners_headers)])
+
+    def measure(self, request):
+        for i in range(self.warmup):
+            request(i)
+        timings, queries, statuses = [], [], set()
+        for i in range(self.warmup, self.warmup + self.repeat):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = request(i)
+                timings.append(time.perf_counter() - start)
+            queries.append(len(captured.captured_queries))
+            statuses.add(response.status_code)
+        timings.sort()
+        return {
+            'requests': len(timings),
+            'throughput': round(len(timings) / sum(timings), 2),
+            'p50_ms': round(statistics.median(timings) * 1000, 3),
+            'p99_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000, 3),
+            'max_ms': round(timings[-1] * 1000, 3),
+            'queries': max(queries),
+            'statuses': sorted(statuses),
+        }
+
+    def run(self, superuser, tenants):
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['localhost']):
+            return {name: self.measure(request) for name, request in self.scenarios(superuser, tenants[0])}
+
+    def users_list_strategies(self, superuser, tenants):
+        """
+        Users list view with courses lists loaded by subquery and by prefetch strategies.
+        Returns results of scenarios and names of users, whose lists differ between strategies.
+        """
+        factory, results, mismatched = APIRequestFactory(), {}, []
+        with override_settings(DEBUG=False):
+            for name, user in (('superuser', superuser), ('administrator', tenants[0]['admins'][0])):
+                headers, data = self.auth(user), {}
+                for strategy in (UserMixin.SUBQUERY, UserMixin.PREFETCH):
+                    view, responses = UsersListAPIView.as_view(courses_list_strategy=strategy), []
+
+                    def request(i, view=view, responses=responses):
+                        responses.append(view(factory.get('/', **headers)))
+                        return responses[-1]
+                    results[f'users list ({name}, {strategy})'] = self.measure(request)
+                    data[strategy] = responses[-1].data['results']
+                if data[UserMixin.SUBQUERY] != data[UserMixin.PREFETCH]:
+                    mismatched.append(name)
+        return results, mismatched
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+    }
+
+
+def compare(previous, current):
+    """
+    Rows of p50 latency and queries changes of scenarios between two results files
+    """
+    rows = []
+    for size, scenarios in current['sizes'].items():
+        for name, result in scenarios.items():
+            if before := previous.get('sizes', {}).get(size, {}).get(name):
+                change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+                rows.append((size, name, before['p50_ms'], result['p50_ms'], change,
+                             before['queries'], result['queries']))
+    return rows
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)
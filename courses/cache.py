@@ -0,0 +1,152 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import caches
+
+from courses.models import Permission
+from courses_platform_api.db.routers import read_from_primary
+from courses_platform_api.settings import COURSE_ACCESS_CACHE
+
+
+class CourseAccessCache:
+    """
+    Access decisions of users to courses: Permission with access=True exists.
+    Every process keeps local LRU of decisions, optional shared Django cache is used on local misses.
+    With the shared cache local entries are keyed by versions of the course and the user read from it,
+    so writes in any process invalidate decisions of all processes. Missing versions start from current time,
+    entries of evicted versions are never reused.
+    Without the shared cache decisions are kept locally by generations of the course,
+    other processes see writes after the local timeout. Decisions are read from the primary database.
+    """
+    def __init__(self, cache_alias='', max_size=10000, timeout=30, shared_timeout=300):
+        self.cache_alias = cache_alias
+        self.max_size = max_size
+        self.timeout = timeout
+        self.shared_timeout = shared_timeout
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.lock = Lock()
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    @staticmethod
+    def shared_key(user, course, versions):
+        return f'course-access:{course}:{versions[0]}:{versions[1]}:{user}'
+
+    @staticmethod
+    def version_keys(user, course):
+        return [f'course-access:{course}:generation', f'course-access:{course}:version:{user}']
+
+    def versions(self, shared, user, course):
+        keys = self.version_keys(user, course)
+        values = shared.get_many(keys)
+        if len(values) < len(keys):
+            for key in keys:
+                shared.add(key, int(time.time() * 1000), None)
+            values = shared.get_many(keys)
+        return tuple(values.get(key, 0) for key in keys)
+
+    async def aversions(self, shared, user, course):
+        keys = self.version_keys(user, course)
+        values = await shared.aget_many(keys)
+        if len(values) < len(keys):
+            for key in keys:
+                await shared.aadd(key, int(time.time() * 1000), None)
+            values = await shared.aget_many(keys)
+        return tuple(values.get(key, 0) for key in keys)
+
+    def has_access(self, user, course):
+        if shared := self.shared:
+            versions = self.versions(shared, user, course)
+            key = (user, course, versions)
+            if (access := self.get_local(key)) is None:
+                access = shared.get(self.shared_key(user, course, versions))
+                if access is None:
+                    access = self.query(user, course)
+                    shared.set(self.shared_key(user, course, versions), access, self.shared_timeout)
+                self.set_local(key, access)
+            return access
+        key = (user, course, self.generations.get(course, 0))
+        if (access := self.get_local(key)) is None:
+            access = self.query(user, course)
+            self.set_local(key, access)
+        return access
+
+    async def ahas_access(self, user, course):
+        if shared := self.shared:
+            versions = await self.aversions(shared, user, course)
+            key = (user, course, versions)
+            if (access := self.get_local(key)) is None:
+                access = await shared.aget(self.shared_key(user, course, versions))
+                if access is None:
+                    access = await self.aquery(user, course)
+                    await shared.aset(self.shared_key(user, course, versions), access, self.shared_timeout)
+                self.set_local(key, access)
+            return access
+        key = (user, course, self.generations.get(course, 0))
+        if (access := self.get_local(key)) is None:
+            access = await self.aquery(user, course)
+            self.set_local(key, access)
+        return access
+
+    def get_local(self, key):
+        with self.lock:
+            if entry := self.entries.get(key):
+                access, expires = entry
+                if expires > time.monotonic():
+                    self.entries.move_to_end(key)
+                    return access
+                del self.entries[key]
+        return None
+
+    def set_local(self, key, access):
+        with self.lock:
+            self.entries[key] = (access, time.monotonic() + self.timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    @staticmethod
+    def query(user, course):
+        with read_from_primary():
+            return Permission.objects.filter(user_id=user, course_id=course, access=True).exists()
+
+    @staticmethod
+    async def aquery(user, course):
+        with read_from_primary():
+            return await Permission.objects.filter(user_id=user, course_id=course, access=True).aexists()
+
+    @staticmethod
+    def bump(shared, key):
+        shared.add(key, int(time.time() * 1000), None)
+        try:
+            shared.incr(key)
+        except ValueError:
+            shared.set(key, int(time.time() * 1000), None)
+
+    def invalidate(self, user, course):
+        with self.lock:
+            self.entries.pop((user, course, self.generations.get(course, 0)), None)
+        if shared := self.shared:
+            self.bump(shared, self.version_keys(user, course)[1])
+
+    def invalidate_course(self, course):
+        with self.lock:
+            self.generations[course] = self.generations.get(course, 0) + 1
+        if shared := self.shared:
+            self.bump(shared, self.version_keys(None, course)[0])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+course_access = CourseAccessCache(
+    cache_alias=COURSE_ACCESS_CACHE['CACHE_ALIAS'],
+    max_size=COURSE_ACCESS_CACHE['MAX_SIZE'],
+    timeout=COURSE_ACCESS_CACHE['TIMEOUT'],
+    shared_timeout=COURSE_ACCESS_CACHE['SHARED_TIMEOUT'],
+)
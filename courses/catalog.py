@@ -0,0 +1,175 @@
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from courses_platform_api.db.routers import read_from_primary
+from courses_platform_api.settings import CATALOG_CACHE
+
+
+class CatalogCache:
+    """
+    Version counters of the courses catalog: global version is bumped on changes of courses,
+    user version on changes of permissions and leads of the user.
+    Cached responses are keyed by versions, so bumps invalidate them without deletes.
+    Missing counters start from current time, entries of evicted counters are never reused.
+    """
+    def __init__(self, cache_alias='default', timeout=300):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @staticmethod
+    def version_key(user=None):
+        return f'catalog:version:{user}' if user else 'catalog:version'
+
+    @staticmethod
+    def modified_key(user=None):
+        return f'catalog:modified:{user}' if user else 'catalog:modified'
+
+    def counter_keys(self, users):
+        return [key for user in users for key in (self.version_key(user), self.modified_key(user))]
+
+    def missing_counters(self, users, values):
+        return [user for user in users if self.version_key(user) not in values or self.modified_key(user) not in values]
+
+    def parse_versions(self, users, values):
+        versions = tuple(values.get(self.version_key(user), 0) for user in users)
+        modified = max(values.get(self.modified_key(user), time.time()) for user in users)
+        return versions, modified
+
+    def versions(self, user=None):
+        """
+        Returns versions and time of the last change of catalog of the user
+        """
+        users = [None, user] if user else [None]
+        values = self.cache.get_many(self.counter_keys(users))
+        if missing := self.missing_counters(users, values):
+            for user in missing:
+                self.init(user)
+            values = self.cache.get_many(self.counter_keys(users))
+        return self.parse_versions(users, values)
+
+    async def aversions(self, user=None):
+        users = [None, user] if user else [None]
+        values = await self.cache.aget_many(self.counter_keys(users))
+        if missing := self.missing_counters(users, values):
+            for user in missing:
+                await self.ainit(user)
+            values = await self.cache.aget_many(self.counter_keys(users))
+        return self.parse_versions(users, values)
+
+    def init(self, user=None):
+        now = time.time()
+        self.cache.add(self.version_key(user), int(now * 1000), None)
+        self.cache.add(self.modified_key(user), now, None)
+
+    async def ainit(self, user=None):
+        now = time.time()
+        await self.cache.aadd(self.version_key(user), int(now * 1000), None)
+        await self.cache.aadd(self.modified_key(user), now, None)
+
+    def bump(self, user=None):
+        self.init(user)
+        try:
+            self.cache.incr(self.version_key(user))
+        except ValueError:
+            self.cache.set(self.version_key(user), int(time.time() * 1000), None)
+        self.cache.set(self.modified_key(user), time.time(), None)
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    async def aget(self, key):
+        return await self.cache.aget(key)
+
+    async def aset(self, key, value):
+        await self.cache.aset(key, value, self.timeout)
+
+
+catalog_cache = CatalogCache(cache_alias=CATALOG_CACHE['CACHE_ALIAS'], timeout=CATALOG_CACHE['TIMEOUT'])
+
+
+class CatalogCacheMixin:
+    """
+    GET responses are cached by url name, scope of the user, query params and catalog versions.
+    ETag and Last-Modified are sent with responses, conditional requests are answered with 304.
+    Views with `catalog_user_scope = False` return the same data to all users.
+    Views with own GET handler implement it in `catalog_response`, it reads the primary database,
+    so responses of lagging replicas aren't cached.
+    """
+    catalog_user_scope = True
+
+    def catalog_response(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_catalog_scope(self):
+        user = self.request.user
+        if not self.catalog_user_scope or not user or not user.is_authenticated:
+            return None, 'public'
+        return user.pk, f'{user.role}:{user.pk}'
+
+    def get_catalog_key(self, scope, versions):
+        request = self.request
+        params = sorted(request.query_params.lists())
+        raw = f'{request.resolver_match.view_name}|{self.kwargs}|{scope}|{versions}|{params}|{request.get_host()}'
+        return 'catalog:response:' + hashlib.sha1(raw.encode()).hexdigest()
+
+    def get_catalog_validators(self, scope, versions, modified):
+        """
+        Cache key, weak ETag and Last-Modified of the response
+        """
+        key = self.get_catalog_key(scope, versions)
+        return key, f'W/"{key.rsplit(":", 1)[1]}"', int(modified)
+
+    @staticmethod
+    def set_catalog_validators(response, etag, last_modified):
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get(self, request, *args, **kwargs):
+        user, scope = self.get_catalog_scope()
+        versions, modified = catalog_cache.versions(user)
+        key, etag, last_modified = self.get_catalog_validators(scope, versions, modified)
+
+        if response := get_conditional_response(request, etag=etag, last_modified=last_modified):
+            return response
+
+        if (cached := catalog_cache.get(key)) is not None:
+            response = Response(cached)
+        else:
+            with read_from_primary():
+                response = self.catalog_response(request, *args, **kwargs)
+            if response.status_code == 200:
+                catalog_cache.set(key, response.data)
+        return self.set_catalog_validators(response, etag, last_modified)
+
+
+class AsyncCatalogCacheMixin(CatalogCacheMixin):
+    """
+    CatalogCacheMixin of async views, `catalog_response` is a coroutine which returns data of the response
+    """
+    async def get(self, request, *args, **kwargs):
+        user, scope = self.get_catalog_scope()
+        versions, modified = await catalog_cache.aversions(user)
+        key, etag, last_modified = self.get_catalog_validators(scope, versions, modified)
+
+        if response := get_conditional_response(request, etag=etag, last_modified=last_modified):
+            return response
+
+        if (data := await catalog_cache.aget(key)) is None:
+            with read_from_primary():
+                data = await self.catalog_response(request, *args, **kwargs)
+            await catalog_cache.aset(key, data)
+        return self.set_catalog_validators(Response(data), etag, last_modified)
@@ -0,0 +1,67 @@
+import json
+from dataclasses import fields
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from courses.benchmark import Benchmark, DataGenerator, DataSize, environment, compare, load
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput, p50/p99 latency and queries of hot endpoints on generated data of several sizes. ' \
+           'Data of every size is generated in a transaction, which is rolled back after measuring.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--learners', type=int, nargs='+', default=[100, 1000],
+                            help='data sizes, count of learners per tenant')
+        for field in fields(DataSize):
+            if field.name != 'learners':
+                parser.add_argument(f'--{field.name}', type=int, default=field.default)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=20, help='measured requests of every scenario')
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--output', help='path of JSON file with results')
+        parser.add_argument('--compare', help='path of JSON file with previous results')
+        parser.add_argument('--strategies', action='store_true',
+                            help='measure users list with subquery and prefetch courses lists and compare their data')
+
+    def handle(self, *args, **options):
+        results = {**environment(), 'repeat': options['repeat'], 'sizes': {}}
+        for learners in options['learners']:
+            size = DataSize(**{field.name: learners if field.name == 'learners' else options[field.name]
+                               for field in fields(DataSize)})
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{learners} learners per tenant'))
+            try:
+                with transaction.atomic():
+                    superuser, tenants = DataGenerator(size, options['seed']).generate()
+                    benchmark = Benchmark(options['repeat'], options['warmup'])
+                    scenarios = benchmark.run(superuser, tenants)
+                    if options['strategies']:
+                        strategies, mismatched = benchmark.users_list_strategies(superuser, tenants)
+                        if mismatched:
+                            raise CommandError(f"Strategies returned different users lists of {', '.join(mismatched)}.")
+                        scenarios.update(strategies)
+                    raise Rollback
+            except Rollback:
+                pass
+            results['sizes'][str(learners)] = scenarios
+            for name, result in scenarios.items():
+                self.stdout.write(f"{name:40} p50 {result['p50_ms']:9.2f} ms  p99 {result['p99_ms']:9.2f} ms  "
+                                  f"{result['throughput']:8.1f} req/s  {result['queries']:3} queries  "
+                                  f"{','.join(map(str, result['statuses']))}")
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f"Results are saved to {options['output']}.")
+
+        if options['compare']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Compared with {options['compare']}"))
+            for size, name, before, after, change, queries_before, queries_after in \
+                    compare(load(options['compare']), results):
+                self.stdout.write(f'{size:>7} {name:40} p50 {before:9.2f} -> {after:9.2f} ms ({change:+.1f}%)  '
+                                  f'queries {queries_before} -> {queries_after}')
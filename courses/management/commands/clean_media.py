@@ -0,0 +1,94 @@
+from collections import Counter
+from itertools import islice
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from courses.models import Course, MediaBlob
+from courses_platform_api.settings import MEDIA_BLOBS
+from lessons.models import Material, ImageTask
+
+# File field and JSON field of its image variants
+FILE_FIELDS = [(Course, 'cover', 'cover_variants'), (Material, 'file', None), (ImageTask, 'image', 'image_variants')]
+
+
+class Command(BaseCommand):
+    help = 'Recount references of media blobs and remove files of blobs without references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        untracked = self.adopt(options['batch_size'])
+        recounted = self.recount(options['batch_size'])
+        removed = self.sweep(options['batch_size'])
+        self.stdout.write(f'Found {untracked} untracked files, recounted references of {recounted} blobs, '
+                          f'removed {removed} orphan blobs.')
+
+    @staticmethod
+    def adopt(batch_size):
+        """
+        Files of saves rolled back after the file was written have no blobs. They get blobs without references
+        dated by the file, so the sweep removes them like other orphans. Insert of a blob saved by a request
+        in progress waits for its commit and is skipped. Parts of interrupted writes are removed.
+        """
+        expired = timezone.now() - MEDIA_BLOBS['ORPHANS_EXPIRE_AFTER']
+        untracked, files = 0, default_storage.blob_files()
+        while batch := list(islice(files, batch_size)):
+            known = set(MediaBlob.objects.values_list('name', flat=True).filter(name__in=[file[0] for file in batch]))
+            blobs = []
+            for name, digest, size, modified in batch:
+                if digest is None:
+                    if modified < expired:
+                        default_storage.remove_blob(name)
+                elif name not in known:
+                    blobs.append(MediaBlob(digest=digest, name=name, size=size, updated=modified))
+            MediaBlob.objects.bulk_create(blobs, ignore_conflicts=True)
+            untracked += len(blobs)
+        return untracked
+
+    @staticmethod
+    def references():
+        """
+        References of files by rows, the thumbnail is both the image and its variant
+        """
+        counter = Counter()
+        for model, field, variants in FILE_FIELDS:
+            rows = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            for row in rows.values_list(field, *filter(None, [variants])).iterator():
+                counter.update({row[0], *(row[1].values() if variants else ())})
+        return counter
+
+    def recount(self, batch_size):
+        """
+        Fixes references lost by cascade deletes and rolled back saves, `updated` is kept,
+        so blobs just saved by requests in progress stay for ORPHANS_EXPIRE_AFTER
+        """
+        counter = self.references()
+        changed = []
+        for blob in MediaBlob.objects.only('digest', 'name', 'reference_count').iterator():
+            if blob.reference_count != counter[blob.name]:
+                blob.reference_count = counter[blob.name]
+                changed.append(blob)
+        MediaBlob.objects.bulk_update(changed, ['reference_count'], batch_size=batch_size)
+        return len(changed)
+
+    @staticmethod
+    def sweep(batch_size):
+        """
+        Orphans are locked while their files are removed, new saves of the same content wait for the commit
+        """
+        expired = timezone.now() - MEDIA_BLOBS['ORPHANS_EXPIRE_AFTER']
+        removed = 0
+        while True:
+            with transaction.atomic():
+                orphans = list(MediaBlob.objects.select_for_update(skip_locked=True).only('digest', 'name').
+                               filter(reference_count=0, updated__lt=expired)[:batch_size])
+                for blob in orphans:
+                    default_storage.remove_blob(blob.name)
+                MediaBlob.objects.filter(digest__in=[blob.digest for blob in orphans]).delete()
+            removed += len(orphans)
+            if len(orphans) < batch_size:
+                return removed
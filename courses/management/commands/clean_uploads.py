@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from lessons.mixins import UploadMixin
+
+
+class Command(BaseCommand):
+    help = 'Remove chunked uploads which were not completed in time'
+
+    def handle(self, *args, **options):
+        count = UploadMixin.clean_expired()
+        self.stdout.write(f'Removed {count} expired uploads.')
@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory
+
+from courses.models import Course, Permission
+from courses.views import CoursesListAPIView, CourseLearnersListAPIView
+from lessons.models import Lesson, Result
+from lessons.views import LessonsListAPIView
+from users.models import Lead
+from users.serializers import TokenEmailObtainPairSerializer
+from users.views import UsersListAPIView
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Show EXPLAIN plans of the main views querysets and lookups for the given user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='email of the user who requests the views')
+        parser.add_argument('--course', help='slug of the course, the first course of the database by default')
+        parser.add_argument('--analyze', action='store_true', help='execute queries and show real timings')
+        parser.add_argument('--disable-seqscan', action='store_true',
+                            help='discourage sequential scans, shows which indexes are used on small databases')
+
+    def handle(self, *args, **options):
+        if not (user := User.objects.filter(email=options['email']).first()):
+            raise CommandError('There is no user with that email.')
+        course = Course.objects.filter(slug=options['course']).first() if options['course'] else \
+            Course.objects.order_by('id').first()
+        if not course:
+            raise CommandError('There is no course.')
+        lesson = Lesson.objects.filter(course=course).order_by('id').first()
+        self.token = TokenEmailObtainPairSerializer.get_token(user).access_token
+        self.factory = APIRequestFactory()
+
+        seq_scans = 0
+        with transaction.atomic():
+            if options['disable_seqscan']:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, queryset in self.querysets(user, course, lesson):
+                plan = queryset.explain(analyze=options['analyze'])
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                self.stdout.write(plan + '\n')
+                if 'Seq Scan' in plan:
+                    seq_scans += 1
+                    self.stdout.write(self.style.WARNING(f'Sequential scan in {name}\n'))
+        self.stdout.write(f'{seq_scans} querysets with sequential scans.')
+
+    def querysets(self, user, course, lesson):
+        yield 'courses list', self.view_queryset(CoursesListAPIView)
+        yield 'course learners list', self.view_queryset(CourseLearnersListAPIView, slug=course.slug)
+        yield 'users list', self.view_queryset(UsersListAPIView)
+        yield 'lessons list', self.view_queryset(LessonsListAPIView, slug=course.slug)
+        yield 'course access', Permission.objects.filter(user_id=user.pk, course_id=course.pk, access=True)
+        yield 'curator administrators', Lead.objects.values_list('lead_id').filter(user_id=user.pk)
+        if lesson:
+            yield 'test result', Result.objects.filter(lesson_id=lesson.pk, user_id=user.pk)
+
+    def view_queryset(self, view_class, **kwargs):
+        view = view_class()
+        view.args, view.kwargs, view.format_kwarg = (), kwargs, None
+        view.request = view.initialize_request(self.factory.get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}'))
+        return view.filter_queryset(view.get_queryset())
@@ -0,0 +1,24 @@
+from dataclasses import fields
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from courses.benchmark import DataGenerator, DataSize, BENCHMARK_PASSWORD
+
+
+class Command(BaseCommand):
+    help = 'Generate deterministic synthetic tenants with users, courses, lessons, tests and permissions'
+
+    def add_arguments(self, parser):
+        for field in fields(DataSize):
+            parser.add_argument(f'--{field.name}', type=int, default=field.default,
+                                help=f'count of {field.name}' + (' per tenant' if field.name != 'tenants' else ''))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='bench', help='prefix of emails of generated users')
+
+    def handle(self, *args, **options):
+        size = DataSize(**{field.name: options[field.name] for field in fields(DataSize)})
+        with transaction.atomic():
+            superuser, tenants = DataGenerator(size, options['seed'], options['prefix']).generate()
+        self.stdout.write(f'Generated {size.tenants} tenants, superuser {superuser.email}, '
+                          f'password of all users "{BENCHMARK_PASSWORD}".')
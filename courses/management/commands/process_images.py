@@ -0,0 +1,111 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from courses.catalog import catalog_cache
+from courses.models import Course
+from courses_platform_api.choices_types import ImageStatus
+from courses_platform_api.images import process_image
+from courses_platform_api.settings import IMAGE_PROCESSING
+from lessons.models import ImageTask
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FIELDS = [(Course, 'cover'), (ImageTask, 'image')]
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails and responsive variants of uploaded images in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=IMAGE_PROCESSING['WORKERS'],
+                            help='count of worker processes, 0 processes images in the command process')
+        parser.add_argument('--batch-size', type=int, default=IMAGE_PROCESSING['BATCH_SIZE'])
+        parser.add_argument('--loop', action='store_true', help='keep polling for uploaded images')
+        parser.add_argument('--interval', type=int, default=IMAGE_PROCESSING['POLL_INTERVAL'],
+                            help='seconds between polls when there are no uploaded images')
+
+    def handle(self, *args, **options):
+        executor = ProcessPoolExecutor(options['workers']) if options['workers'] else None
+        try:
+            while True:
+                processed = failed = 0
+                for model, field in IMAGE_FIELDS:
+                    batch_processed, batch_failed = self.process_batch(executor, model, field, options['batch_size'])
+                    processed += batch_processed
+                    failed += batch_failed
+                if processed or failed:
+                    self.stdout.write(f'Processed {processed} images, failed {failed} images.')
+                if not options['loop']:
+                    break
+                if not processed and not failed:
+                    time.sleep(options['interval'])
+        finally:
+            if executor:
+                executor.shutdown()
+
+    def process_batch(self, executor, model, field, batch_size):
+        """
+        Rows are locked while their images are processed, other workers skip them.
+        Pillow work runs in worker processes, files and rows are saved by the command process.
+        """
+        status, variants = f'{field}_status', f'{field}_variants'
+        with transaction.atomic():
+            rows = list(model.objects.select_for_update(skip_locked=True).only('id', field).
+                        filter(**{status: ImageStatus.PENDING}).order_by('id')[:batch_size])
+            if not rows:
+                return 0, 0
+
+            tasks = [(row, getattr(row, field)) for row in rows]
+            tasks = [(row, image, self.submit(executor, image)) for row, image in tasks]
+
+            processed = failed = 0
+            for row, image, result in tasks:
+                try:
+                    saved = self.save_variants(image, result())
+                except Exception as e:
+                    failed += 1
+                    logger.error('Processing of %s %s image %s failed: %r', model.__name__, row.pk, image.name, e)
+                    model.objects.filter(id=row.pk).update(**{status: ImageStatus.FAILED})
+                else:
+                    processed += 1
+                    model.objects.filter(id=row.pk).update(**{field: saved['thumbnail'], status: ImageStatus.READY,
+                                                              variants: saved})
+        if model is Course:
+            catalog_cache.bump()
+        return processed, failed
+
+    @staticmethod
+    def submit(executor, image):
+        """
+        Returns callable, that waits for variants of the image generated by worker process
+        """
+        try:
+            with image.storage.open(image.name, 'rb') as file:
+                content = file.read()
+        except OSError as e:
+            error = e
+
+            def result():
+                raise error
+            return result
+        if executor:
+            return executor.submit(process_image, content).result
+        return lambda: process_image(content)
+
+    @staticmethod
+    def save_variants(image, generated):
+        """
+        Original upload is kept in variants, the image field is replaced by the thumbnail
+        """
+        name = os.path.splitext(image.name)[0]
+        saved = {'original': image.name}
+        for variant, (extension, content) in generated.items():
+            path = f"{name}_{variant.split('.')[0]}.{extension}"
+            saved[variant] = image.storage.save(path, ContentFile(content))
+        return saved
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import Course
+from courses.progress import ProgressMixin
+
+
+class Command(BaseCommand):
+    help = 'Recount materialized progress of learners from test results and home tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('courses', nargs='*', help='slugs of courses, all courses by default')
+
+    def handle(self, *args, **options):
+        courses = None
+        if options['courses']:
+            courses = list(Course.objects.values_list('id', flat=True).filter(slug__in=options['courses']))
+            if len(courses) != len(set(options['courses'])):
+                raise CommandError('Some of the courses do not exist.')
+        count = ProgressMixin.rebuild(courses)
+        self.stdout.write(f'Rebuilt progress of {count} learners.')
@@ -0,0 +1,30 @@
+# Generated by Django 4.1.3 on 2026-10-18 13:00
+
+import courses.models
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_course_video'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='cover_status',
+            field=models.IntegerField(blank=True, choices=[(1, 'Processing'), (2, 'Ready'), (3, 'Failed')], null=True, verbose_name='cover status'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='cover_variants',
+            field=models.JSONField(blank=True, default=dict, verbose_name='cover variants'),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='cover',
+            field=models.ImageField(blank=True, null=True, upload_to=courses.models.Course.file_path, validators=[django.core.validators.FileExtensionValidator(['jpg', 'png', 'jpeg'])]),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+# Duplicates of a user and course keep the permission with access and the latest end date (empty is unlimited)
+DELETE_DUPLICATES = """
+    DELETE FROM courses_permission permission USING (
+        SELECT id, row_number() OVER (
+            PARTITION BY user_id, course_id ORDER BY access DESC, date_end DESC NULLS FIRST, id
+        ) AS number
+        FROM courses_permission
+    ) duplicate
+    WHERE permission.id = duplicate.id AND duplicate.number > 1
+"""
+
+
+def delete_duplicates(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(DELETE_DUPLICATES)
+        if cursor.rowcount:
+            print(f'\n  Deleted {cursor.rowcount} duplicate permissions', end='')
+
+
+class Migration(migrations.Migration):
+    """
+    Duplicates are deleted before unique constraints of permissions are added.
+    Deleted rows can't be restored, reverse migration keeps remaining rows.
+    """
+    dependencies = [
+        ('courses', '0008_course_cover_processing'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+    ]
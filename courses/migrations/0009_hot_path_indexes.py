@@ -0,0 +1,29 @@
+# Generated by Django 4.1.3 on 2026-10-18 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_deduplicate_permissions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['admin', 'is_active'], name='course_admin_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='permission',
+            index=models.Index(fields=['course', 'access'], name='permission_course_access_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='permission',
+            constraint=models.UniqueConstraint(fields=('user', 'course'), include=('access',), name='unique_course_permission'),
+        ),
+        migrations.AddConstraint(
+            model_name='permission',
+            constraint=models.UniqueConstraint(condition=models.Q(('course__isnull', True)), fields=('user',), name='unique_profile_permission'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.3 on 2026-10-18 14:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0009_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lessons_completed', models.IntegerField(default=0, verbose_name='lessons with accepted home task')),
+                ('tests_taken', models.IntegerField(default=0, verbose_name='taken tests')),
+                ('score_sum', models.IntegerField(default=0, verbose_name='sum of test results')),
+                ('tasks_pending', models.IntegerField(default=0, verbose_name='home tasks on review')),
+                ('last_activity', models.DateTimeField(blank=True, null=True, verbose_name='last activity')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='courses.course')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='courseprogress',
+            constraint=models.UniqueConstraint(fields=('course', 'user'), name='unique_course_progress'),
+        ),
+    ]
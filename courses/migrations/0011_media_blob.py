@@ -0,0 +1,34 @@
+# Generated by Django 4.1.3 on 2026-10-18 15:38
+
+import courses.models
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_course_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='SHA-256 of content')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='file name')),
+                ('size', models.BigIntegerField(verbose_name='size')),
+                ('reference_count', models.IntegerField(default=0, verbose_name='references')),
+                ('updated', models.DateTimeField(verbose_name='references updated')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='cover',
+            field=models.ImageField(blank=True, max_length=255, null=True, upload_to=courses.models.Course.file_path, validators=[django.core.validators.FileExtensionValidator(['jpg', 'png', 'jpeg'])]),
+        ),
+        migrations.AddIndex(
+            model_name='mediablob',
+            index=models.Index(condition=models.Q(('reference_count', 0)), fields=['updated'], name='mediablob_orphan_idx'),
+        ),
+    ]
@@ -1,9 +1,19 @@
-from django.db.models import OuterRef, Subquery
+import datetime
+from collections import Counter
 
-from courses.models import Permission
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery, Q
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+from courses.cache import course_access
+from courses.models import Course, Permission
 from courses_platform_api.choices_types import ProfileRoles
 from users.models import Lead
 
+User = get_user_model()
+
 
 class CourseMixin:
     @staticmethod
@@ -20,3 +30,139 @@ class CourseMixin:
             admin_list = Lead.objects.values_list('lead_id').filter(user_id=user)
             return queryset.filter(admin_id__in=admin_list, is_active=True)
         return queryset.filter(admin_id=user) if role == ProfileRoles.ADMINISTRATOR else queryset
+
+    @staticmethod
+    def can_create(user):
+        """
+        Administrator without access of the profile can have only one course
+        """
+        if Permission.objects.filter(user_id=user, access=True).exists():
+            return True
+        return not Course.objects.filter(admin_id=user).count()
+
+    @staticmethod
+    def get_course(request, slug):
+        """
+        Course is loaded once per request with its administrator and learner access of request user,
+        permission classes and views share the same instance
+        """
+        if not hasattr(request, 'resolved_courses'):
+            request.resolved_courses = {}
+        if slug not in request.resolved_courses:
+            course = get_object_or_404(Course.objects.select_related('admin'), slug=slug)
+            if request.user and request.user.is_authenticated and request.user.role == ProfileRoles.LEARNER:
+                course.learner_access = course_access.has_access(request.user.pk, course.pk)
+            request.resolved_courses[slug] = course
+        return request.resolved_courses[slug]
+
+    @staticmethod
+    async def aget_course(request, slug):
+        """
+        get_course of async views, after it permission classes get the course without database queries
+        """
+        if not hasattr(request, 'resolved_courses'):
+            request.resolved_courses = {}
+        if slug not in request.resolved_courses:
+            try:
+                course = await Course.objects.select_related('admin').aget(slug=slug)
+            except Course.DoesNotExist:
+                raise Http404
+            if request.user and request.user.is_authenticated and request.user.role == ProfileRoles.LEARNER:
+                course.learner_access = await course_access.ahas_access(request.user.pk, course.pk)
+            request.resolved_courses[slug] = course
+        return request.resolved_courses[slug]
+
+
+class CourseObjectMixin:
+    def get_object(self):
+        course = CourseMixin.get_course(self.request, self.kwargs['slug'])
+        self.check_object_permissions(self.request, course)
+        return course
+
+
+class LearnersBulkMixin:
+    GRANT = 'grant'
+    REVOKE = 'revoke'
+    EXTEND = 'extend'
+    ACTIONS = (GRANT, REVOKE, EXTEND)
+
+    @staticmethod
+    def resolve_learners(identifiers):
+        """
+        Learners found by slug or email in one query, {identifier: user id}
+        """
+        learners = {}
+        users = User.objects.values_list('id', 'slug', 'email').\
+            filter(Q(slug__in=identifiers) | Q(email__in=identifiers), role=ProfileRoles.LEARNER)
+        for pk, slug, email in users:
+            learners[slug] = learners[email] = pk
+        return learners
+
+    @staticmethod
+    def compare(permissions, values, outcomes, updated):
+        for permission in permissions:
+            if any(permission[field] != value for field, value in values.items()):
+                updated.append(permission['id'])
+                outcomes[permission['user_id']] = 'updated'
+            else:
+                outcomes[permission['user_id']] = 'unchanged'
+
+    @staticmethod
+    def insert(course, learners, values, batch_size=1000):
+        """
+        Inserts missing permissions, permissions created concurrently are skipped.
+        Returns ids of learners whose permissions were inserted.
+        """
+        table, inserted = Permission._meta.db_table, set()
+        rows = [(pk, course.pk, datetime.date.today(), values.get('date_end'), values['access']) for pk in learners]
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                cursor.execute(
+                    f'INSERT INTO {table} (user_id, course_id, date_start, date_end, access) '
+                    f'VALUES {", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))} '
+                    f'ON CONFLICT DO NOTHING RETURNING user_id',
+                    [value for row in batch for value in row]
+                )
+                inserted.update(pk for pk, in cursor.fetchall())
+        return inserted
+
+    @classmethod
+    def change_access(cls, course, action, users, date_end=None):
+        """
+        Grant creates missing permissions and activates existing ones, revoke deactivates permissions,
+        extend changes date_end of permissions. Whole list is handled by one select, one bulk insert and one update,
+        permissions created concurrently with the insert are read again and updated like existing ones.
+        Returns outcome of every identifier: created, updated, unchanged, not_enrolled or not_found.
+        """
+        identifiers = list(dict.fromkeys(users))
+        learners = cls.resolve_learners(identifiers)
+        values = {cls.GRANT: {'access': True}, cls.REVOKE: {'access': False}, cls.EXTEND: {}}[action]
+        if date_end is not None and action != cls.REVOKE:
+            values['date_end'] = date_end
+
+        outcomes, created, updated = {}, [], []
+        fields = ('id', 'user_id', 'access', 'date_end')
+        with transaction.atomic():
+            permissions = Permission.objects.select_for_update().values(*fields).\
+                filter(course=course, user_id__in=set(learners.values()))
+            permissions = {permission['user_id']: permission for permission in permissions}
+            for pk in set(learners.values()) - permissions.keys():
+                if action == cls.GRANT:
+                    created.append(pk)
+                    outcomes[pk] = 'created'
+                else:
+                    outcomes[pk] = 'not_enrolled'
+            cls.compare(permissions.values(), values, outcomes, updated)
+
+            if created:
+                conflicts = set(created) - cls.insert(course, created, values)
+                if conflicts:
+                    cls.compare(Permission.objects.select_for_update().values(*fields).
+                                filter(course=course, user_id__in=conflicts), values, outcomes, updated)
+            if updated:
+                Permission.objects.filter(id__in=updated).update(**values)
+
+        results = [{'user': identifier, 'outcome': outcomes.get(learners.get(identifier), 'not_found')}
+                   for identifier in identifiers]
+        return {'summary': dict(Counter(result['outcome'] for result in results)), 'results': results}
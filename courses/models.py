@@ -1,28 +1,25 @@
-import time
 from django.contrib.auth import get_user_model
 from django.core.validators import FileExtensionValidator
 from django.db import models
 
-from imagekit import register
-from imagekit.models import ProcessedImageField
-
-from courses_platform_api.images import ImageThumbnail
-from courses_platform_api.mixins import GeneratorMixin
+from courses_platform_api.choices_types import ImageStatus
+from courses_platform_api.mixins import GeneratorMixin, ImageMixin
 from courses_platform_api.settings import VALID_EXTENSIONS
 User = get_user_model()
 
 
 class Course(models.Model):
     def file_path(self, filename):
-        return "media/%s/courses/%s/%s_%s" % (self.admin.slug, self.slug,  str(time.time()), filename)
-
-    register.generator('courses:thumbnail', ImageThumbnail)
+        # Directory of the file is chosen by the content-addressed storage
+        return filename
 
     slug = models.SlugField('slug', max_length=20, unique=True)
     admin = models.ForeignKey(User, on_delete=models.CASCADE, related_name='courses')
     name = models.CharField('course name', max_length=40)
-    cover = ProcessedImageField(spec_id='courses:thumbnail', upload_to=file_path, null=True, blank=True,
-                                validators=[FileExtensionValidator(VALID_EXTENSIONS)])
+    cover = models.ImageField(upload_to=file_path, null=True, blank=True, max_length=255,
+                              validators=[FileExtensionValidator(VALID_EXTENSIONS)])
+    cover_status = models.IntegerField('cover status', choices=ImageStatus.CHOICES, null=True, blank=True)
+    cover_variants = models.JSONField('cover variants', default=dict, blank=True)
     description = models.TextField('description', null=True, blank=True)
     short_description = models.CharField('short description', null=True, blank=True, max_length=200)
     video = models.CharField('presentation video', null=True, blank=True, max_length=200)
@@ -30,10 +27,28 @@ class Course(models.Model):
     is_active = models.BooleanField('is active', default=True)
     price = models.SmallIntegerField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['admin', 'is_active'], name='course_admin_active_idx'),
+        ]
+
+    # Cover loaded from the database, variants of a new cover are made again
+    saved_cover = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.saved_cover = instance.__dict__.get('cover')
+        return instance
+
     def save(self, *args, **kwargs):
+        if ImageMixin.is_new_upload(self.cover, self.saved_cover):
+            self.cover_status, self.cover_variants = ImageStatus.PENDING, {}
         if not self.id:
-            self.slug = GeneratorMixin.slug(self.id)
-        super().save(*args, **kwargs)
+            GeneratorMixin.save_with_slug(self, lambda: super(Course, self).save(*args, **kwargs), kwargs.get('using'))
+        else:
+            super().save(*args, **kwargs)
+        self.saved_cover = self.cover.name
 
     def switch_status(self):
         self.is_active = not self.is_active
@@ -47,6 +62,16 @@ class Permission(models.Model):
     date_end = models.DateField(null=True, blank=True)
     access = models.BooleanField('is active', default=False)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'course'], include=['access'], name='unique_course_permission'),
+            models.UniqueConstraint(fields=['user'], condition=models.Q(course__isnull=True),
+                                    name='unique_profile_permission'),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'access'], name='permission_course_access_idx'),
+        ]
+
     def inactivate_user(self):
         self.access = False
         self.save(update_fields=['access'])
@@ -54,3 +79,42 @@ class Permission(models.Model):
     def activate_user(self):
         self.access = True
         self.save(update_fields=['access'])
+
+
+class CourseProgress(models.Model):
+    """
+    Progress of the learner in the course, kept up to date by results and home tasks of its lessons
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='progress')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='progress')
+    lessons_completed = models.IntegerField('lessons with accepted home task', default=0)
+    tests_taken = models.IntegerField('taken tests', default=0)
+    score_sum = models.IntegerField('sum of test results', default=0)
+    tasks_pending = models.IntegerField('home tasks on review', default=0)
+    last_activity = models.DateTimeField('last activity', null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'user'], name='unique_course_progress'),
+        ]
+
+    @property
+    def average_score(self):
+        return round(self.score_sum / self.tests_taken) if self.tests_taken else None
+
+
+class MediaBlob(models.Model):
+    """
+    File of the content-addressed storage, one per SHA-256 digest of content.
+    Every saved file field adds a reference, every removed one releases it.
+    """
+    digest = models.CharField('SHA-256 of content', max_length=64, primary_key=True)
+    name = models.CharField('file name', max_length=255, unique=True)
+    size = models.BigIntegerField('size')
+    reference_count = models.IntegerField('references', default=0)
+    updated = models.DateTimeField('references updated')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated'], condition=models.Q(reference_count=0), name='mediablob_orphan_idx'),
+        ]
@@ -0,0 +1,151 @@
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum, Max, F, FilteredRelation, FloatField
+from django.db.models.functions import Cast, Coalesce, Greatest, NullIf, Round
+from django.utils import timezone
+
+from courses.catalog import catalog_cache
+from courses.models import CourseProgress
+from courses_platform_api.choices_types import TaskStatus
+from lessons.models import Lesson, Result, Task
+
+COUNTERS = ('lessons_completed', 'tests_taken', 'score_sum', 'tasks_pending')
+
+
+class ProgressMixin:
+    """
+    Learner progress of the course is materialized in CourseProgress: results of tests and home tasks change
+    its counters by one upsert, so lists of courses and learners read progress without aggregation of raw rows.
+    Set-based updates of tasks and results don't send signals, `rebuild` recounts progress from raw rows.
+    """
+    @staticmethod
+    def progress_fields(relation):
+        score_sum = Cast(f'{relation}__score_sum', FloatField())
+        return {
+            'lessons_completed': Coalesce(f'{relation}__lessons_completed', 0),
+            'average_score': Round(score_sum / NullIf(f'{relation}__tests_taken', 0)),
+            'tasks_pending': Coalesce(f'{relation}__tasks_pending', 0),
+            'last_activity': F(f'{relation}__last_activity'),
+        }
+
+    @classmethod
+    def with_course_progress(cls, queryset, user):
+        """
+        Courses with progress of the learner, joined in the same query
+        """
+        return queryset.annotate(learner_progress=FilteredRelation('progress', condition=Q(progress__user_id=user))).\
+            annotate(**cls.progress_fields('learner_progress'))
+
+    @classmethod
+    def with_learner_progress(cls, queryset, course):
+        """
+        Permissions of the course with progress of their learners, joined in the same query
+        """
+        return queryset.annotate(
+            learner_progress=FilteredRelation('user__progress', condition=Q(user__progress__course_id=course))
+        ).annotate(**cls.progress_fields('learner_progress'))
+
+    @staticmethod
+    def task_deltas(task, status, previous=None):
+        """
+        Lesson is completed by its first accepted task and stays completed while any of its tasks is accepted
+        """
+        deltas = {
+            'lessons_completed': (status == TaskStatus.ACCEPT) - (previous == TaskStatus.ACCEPT),
+            'tasks_pending': (status == TaskStatus.REVIEW) - (previous == TaskStatus.REVIEW),
+        }
+        if deltas['lessons_completed'] and Task.objects.filter(user_id=task.user_id, lesson_id=task.lesson_id,
+                                                               status=TaskStatus.ACCEPT).exclude(pk=task.pk).exists():
+            deltas['lessons_completed'] = 0
+        return deltas
+
+    @staticmethod
+    def change(user, lesson, deltas, activity=None):
+        """
+        Adds deltas to counters of the learner in the course of the lesson, missing progress row is created.
+        Counters don't go below zero.
+        """
+        if not any(deltas.values()) and activity is None:
+            return
+        values = [deltas.get(counter, 0) for counter in COUNTERS]
+        table = CourseProgress._meta.db_table
+        counters = ', '.join(COUNTERS)
+        updates = ', '.join(f'{counter} = GREATEST({table}.{counter} + %s, 0)' for counter in COUNTERS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, course_id, {counters}, last_activity) '
+                f'SELECT %s, course_id, {", ".join(["GREATEST(%s, 0)"] * len(COUNTERS))}, %s '
+                f'FROM {Lesson._meta.db_table} WHERE id = %s '
+                f'ON CONFLICT (course_id, user_id) DO UPDATE SET {updates}, '
+                f'last_activity = GREATEST({table}.last_activity, EXCLUDED.last_activity)',
+                [user, *values, activity, lesson, *values]
+            )
+        catalog_cache.bump(user)
+
+    @staticmethod
+    def change_existing(user, lesson, deltas):
+        """
+        Adds deltas of deleted rows, progress rows aren't created for them
+        """
+        if not any(deltas.values()):
+            return
+        CourseProgress.objects.filter(user_id=user, course__lesson=lesson).update(
+            **{counter: Greatest(F(counter) + delta, 0) for counter, delta in deltas.items() if delta}
+        )
+        catalog_cache.bump(user)
+
+    @classmethod
+    def result_saved(cls, result):
+        cls.change(result.user_id, result.lesson_id, {'tests_taken': 1, 'score_sum': result.result},
+                   result.date or timezone.now())
+
+    @classmethod
+    def result_deleted(cls, result):
+        cls.change_existing(result.user_id, result.lesson_id, {'tests_taken': -1, 'score_sum': -result.result})
+
+    @classmethod
+    def task_saved(cls, task, created):
+        deltas = cls.task_deltas(task, task.status, None if created else task.saved_status)
+        if any(deltas.values()):
+            cls.change(task.user_id, task.lesson_id, deltas, timezone.now())
+        task.saved_status = task.status
+
+    @classmethod
+    def task_deleted(cls, task):
+        cls.change_existing(task.user_id, task.lesson_id, cls.task_deltas(task, None, task.status))
+
+    @staticmethod
+    def rebuild(courses=None):
+        """
+        Recounts progress of all learners of the courses (all courses by default) from results and tasks
+        by two aggregate queries, returns count of progress rows
+        """
+        results = Result.objects.values('user_id', course_id=F('lesson__course_id')).annotate(
+            tests_taken=Count('id'), score_sum=Sum('result'), last_activity=Max('date'))
+        tasks = Task.objects.values('user_id', course_id=F('lesson__course_id')).annotate(
+            lessons_completed=Count('lesson', distinct=True, filter=Q(status=TaskStatus.ACCEPT)),
+            tasks_pending=Count('id', filter=Q(status=TaskStatus.REVIEW)))
+        existing = CourseProgress.objects.values_list('user_id', 'course_id', 'last_activity')
+        if courses is not None:
+            results = results.filter(lesson__course_id__in=courses)
+            tasks = tasks.filter(lesson__course_id__in=courses)
+            existing = existing.filter(course_id__in=courses)
+
+        progress = {(user, course): CourseProgress(user_id=user, course_id=course, last_activity=last_activity)
+                    for user, course, last_activity in existing}
+        for row in [*results, *tasks]:
+            key = (row.pop('user_id'), row.pop('course_id'))
+            item = progress.setdefault(key, CourseProgress(user_id=key[0], course_id=key[1]))
+            last_activity = row.pop('last_activity', None)
+            if last_activity and (item.last_activity is None or last_activity > item.last_activity):
+                item.last_activity = last_activity
+            for counter, value in row.items():
+                setattr(item, counter, value)
+
+        with transaction.atomic():
+            deleted = CourseProgress.objects.all()
+            if courses is not None:
+                deleted = deleted.filter(course_id__in=courses)
+            deleted.delete()
+            CourseProgress.objects.bulk_create(progress.values(), batch_size=1000)
+        catalog_cache.bump()
+        return len(progress)
@@ -1,37 +1,84 @@
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 
+from courses.mixins import LearnersBulkMixin
 from courses.models import Course, Permission
+from courses_platform_api.metrics import SerializerTimingMixin
 
 User = get_user_model()
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Urls of processed variants of the image, {'thumbnail': url, '320.jpeg': url, '320.webp': url, ...}
+    """
+    def to_representation(self, value):
+        request = self.context.get('request')
+        variants = {}
+        for name, path in value.items():
+            url = default_storage.url(path)
+            variants[name] = request.build_absolute_uri(url) if request else url
+        return variants
+
+
+class CourseSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     slug = serializers.CharField(read_only=True)
     admin = serializers.CharField(read_only=True)
     admin_id = serializers.IntegerField(write_only=True)
+    cover_status = serializers.IntegerField(read_only=True)
+    cover_variants = ImageVariantsField()
 
     class Meta:
         model = Course
-        fields = ('slug', 'admin', 'admin_id', 'name', 'cover', 'description', 'short_description', 'video', 'sequence', 'is_active', 'price')
+        fields = ('slug', 'admin', 'admin_id', 'name', 'cover', 'cover_status', 'cover_variants', 'description',
+                  'short_description', 'video', 'sequence', 'is_active', 'price')
+
+
+class CourseCloneSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=40, required=False)
 
 
 class CoursesListSerializer(CourseSerializer):
     admin = serializers.CharField()
 
 
-class LearnerCoursesListSerializer(CoursesListSerializer):
+class ProgressSerializerMixin(serializers.Serializer):
+    """
+    Progress of the learner in the course, annotated from CourseProgress
+    """
+    lessons_completed = serializers.IntegerField(read_only=True)
+    average_score = serializers.IntegerField(read_only=True)
+    tasks_pending = serializers.IntegerField(read_only=True)
+    last_activity = serializers.DateTimeField(read_only=True)
+
+
+class LearnerCoursesListSerializer(ProgressSerializerMixin, CoursesListSerializer):
     access = serializers.BooleanField()
     date_end = serializers.DateField()
 
     class Meta(CoursesListSerializer.Meta):
-        fields = ('slug', 'name', 'admin', 'cover', 'description', 'short_description', 'video', 'price', 'access', 'date_end')
+        fields = ('slug', 'name', 'admin', 'cover', 'cover_status', 'cover_variants', 'description', 'short_description',
+                  'video', 'price', 'access', 'date_end', 'lessons_completed', 'average_score', 'tasks_pending',
+                  'last_activity')
 
 
-class CourseLearnersListSerializer(serializers.ModelSerializer):
+class CourseLearnersListSerializer(ProgressSerializerMixin, SerializerTimingMixin, serializers.ModelSerializer):
     full_name = serializers.CharField(read_only=True)
     user_slug = serializers.CharField(read_only=True)
 
     class Meta:
         model = Permission
-        fields = ('user_slug', 'full_name', 'date_end', 'access')
+        fields = ('user_slug', 'full_name', 'date_end', 'access', 'lessons_completed', 'average_score',
+                  'tasks_pending', 'last_activity')
+
+
+class CourseLearnersBulkSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=LearnersBulkMixin.ACTIONS)
+    users = serializers.ListField(child=serializers.CharField(max_length=255), allow_empty=False, max_length=10000)
+    date_end = serializers.DateField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        if attrs['action'] == LearnersBulkMixin.EXTEND and attrs.get('date_end') is None:
+            raise serializers.ValidationError({'date_end': 'This field is required to extend access.'})
+        return attrs
@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
+
+from courses.cache import course_access
+from courses.catalog import catalog_cache
+from courses.models import Course, Permission
+from courses.progress import ProgressMixin
+from courses_platform_api.choices_types import ProfileRoles
+from lessons.mixins import CourseBundleMixin
+from lessons.models import Lesson, Material, Question, Option, Result, Task
+from users.models import Lead
+
+User = get_user_model()
+
+# Sent after set-based updates of permissions, which do not send model signals
+course_access_changed = Signal()
+
+# Access decisions are invalidated after commit, so requests reading rows before the commit
+# can't cache old decisions under new versions
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def invalidate_permission_access(sender, instance, **kwargs):
+    user, course = instance.user_id, instance.course_id
+    transaction.on_commit(lambda: course_access.invalidate(user, course))
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_access(sender, instance, **kwargs):
+    course = instance.pk
+    transaction.on_commit(lambda: course_access.invalidate_course(course))
+
+
+@receiver(course_access_changed)
+def invalidate_changed_access(sender, course_ids=(), **kwargs):
+    courses = list(course_ids)
+
+    def invalidate():
+        for course in courses:
+            course_access.invalidate_course(course)
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(course_access_changed)
+def bump_catalog_version(sender, **kwargs):
+    catalog_cache.bump()
+
+
+@receiver(post_save, sender=User)
+def bump_catalog_version_of_administrator(sender, instance, **kwargs):
+    if instance.role == ProfileRoles.ADMINISTRATOR:
+        catalog_cache.bump()
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(post_save, sender=Lead)
+@receiver(post_delete, sender=Lead)
+def bump_catalog_user_version(sender, instance, **kwargs):
+    catalog_cache.bump(instance.user_id)
+
+
+def invalidate_bundles(sender, courses, origin=None):
+    """
+    Rows deleted with their parent are skipped, the receiver of the parent marks the bundles.
+    Rows deleted by one query mark bundles of the same lesson or question once.
+    """
+    if origin is not None and (origin.model if isinstance(origin, QuerySet) else type(origin)) is not sender:
+        return
+    if isinstance(origin, QuerySet):
+        marked = origin.__dict__.setdefault('marked_bundles', set())
+        if (key := str(courses.query) if isinstance(courses, QuerySet) else tuple(courses)) in marked:
+            return
+        marked.add(key)
+    CourseBundleMixin.invalidate_on_commit(courses)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def invalidate_bundles_of_lesson(sender, instance, origin=None, **kwargs):
+    invalidate_bundles(sender, [instance.course_id], origin)
+
+
+@receiver(post_save, sender=Material)
+@receiver(post_delete, sender=Material)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_bundles_of_lesson_content(sender, instance, origin=None, **kwargs):
+    invalidate_bundles(sender, Lesson.objects.values('course_id').filter(pk=instance.lesson_id), origin)
+
+
+@receiver(post_save, sender=Option)
+@receiver(post_delete, sender=Option)
+def invalidate_bundles_of_option(sender, instance, origin=None, **kwargs):
+    invalidate_bundles(sender, Question.objects.values('lesson__course_id').filter(pk=instance.question_id), origin)
+
+
+@receiver(post_save, sender=Result)
+def track_result_progress(sender, instance, created, **kwargs):
+    if created:
+        ProgressMixin.result_saved(instance)
+
+
+@receiver(post_delete, sender=Result)
+def untrack_result_progress(sender, instance, **kwargs):
+    ProgressMixin.result_deleted(instance)
+
+
+@receiver(post_save, sender=Task)
+def track_task_progress(sender, instance, created, **kwargs):
+    ProgressMixin.task_saved(instance, created)
+
+
+@receiver(post_delete, sender=Task)
+def untrack_task_progress(sender, instance, **kwargs):
+    ProgressMixin.task_deleted(instance)
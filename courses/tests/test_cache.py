@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from courses.cache import CourseAccessCache, course_access
+from courses.models import Course, Permission
+from courses_platform_api.choices_types import ProfileRoles
+
+User = get_user_model()
+
+
+class CourseAccessCacheTestCase(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='user1@user.com', role=ProfileRoles.ADMINISTRATOR)
+        self.learner = User.objects.create_user(email='user2@user.com')
+        self.course = Course.objects.create(admin=self.admin, name="Course 1")
+        self.permission = Permission.objects.create(user=self.learner, course=self.course)
+
+    def test_access_decision_cached(self):
+        self.assertFalse(course_access.has_access(self.learner.pk, self.course.pk))
+        with self.assertNumQueries(0):
+            self.assertFalse(course_access.has_access(self.learner.pk, self.course.pk))
+
+    def test_permission_changes_invalidate_cache(self):
+        self.assertFalse(course_access.has_access(self.learner.pk, self.course.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.permission.activate_user()
+        self.assertTrue(course_access.has_access(self.learner.pk, self.course.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.permission.inactivate_user()
+        self.assertFalse(course_access.has_access(self.learner.pk, self.course.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.permission.activate_user()
+            self.permission.delete()
+        self.assertFalse(course_access.has_access(self.learner.pk, self.course.pk))
+
+    def test_cache_invalidated_after_commit(self):
+        self.assertFalse(course_access.has_access(self.learner.pk, self.course.pk))
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.permission.activate_user()
+            self.assertFalse(course_access.has_access(self.learner.pk, self.course.pk))
+        for callback in callbacks:
+            callback()
+        self.assertTrue(course_access.has_access(self.learner.pk, self.course.pk))
+
+    def test_course_switch_status_invalidates_cache(self):
+        self.assertFalse(course_access.has_access(self.learner.pk, self.course.pk))
+        Permission.objects.filter(pk=self.permission.pk).update(access=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.switch_status()
+        self.assertTrue(course_access.has_access(self.learner.pk, self.course.pk))
+
+    def test_shared_cache_used_on_local_miss(self):
+        first, second = CourseAccessCache(cache_alias='default'), CourseAccessCache(cache_alias='default')
+        cache.clear()
+        self.assertFalse(first.has_access(self.learner.pk, self.course.pk))
+        with self.assertNumQueries(0):
+            self.assertFalse(second.has_access(self.learner.pk, self.course.pk))
+
+        Permission.objects.filter(pk=self.permission.pk).update(access=True)
+        first.invalidate_course(self.course.pk)
+        self.assertTrue(second.has_access(self.learner.pk, self.course.pk))
+
+    def test_revocation_seen_by_local_caches_of_other_processes(self):
+        first, second = CourseAccessCache(cache_alias='default'), CourseAccessCache(cache_alias='default')
+        cache.clear()
+        Permission.objects.filter(pk=self.permission.pk).update(access=True)
+        self.assertTrue(first.has_access(self.learner.pk, self.course.pk))
+        self.assertTrue(second.has_access(self.learner.pk, self.course.pk))
+
+        Permission.objects.filter(pk=self.permission.pk).update(access=False)
+        first.invalidate(self.learner.pk, self.course.pk)
+        self.assertFalse(second.has_access(self.learner.pk, self.course.pk))
+
+    def test_granted_access_kept_without_shared_cache(self):
+        access_cache = CourseAccessCache()
+        Permission.objects.filter(pk=self.permission.pk).update(access=True)
+        self.assertTrue(access_cache.has_access(self.learner.pk, self.course.pk))
+        with self.assertNumQueries(0):
+            self.assertTrue(access_cache.has_access(self.learner.pk, self.course.pk))
+        Permission.objects.filter(pk=self.permission.pk).update(access=False)
+        access_cache.invalidate_course(self.course.pk)
+        self.assertFalse(access_cache.has_access(self.learner.pk, self.course.pk))
+
+    def test_local_cache_size_limited(self):
+        access_cache = CourseAccessCache(max_size=2)
+        for course in range(5):
+            access_cache.has_access(self.learner.pk, course)
+        self.assertEqual(len(access_cache.entries), 2)
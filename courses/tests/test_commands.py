@@ -0,0 +1,294 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from courses.benchmark import load
+from courses.models import Course, Permission, MediaBlob
+from courses_platform_api.choices_types import ProfileRoles, ImageStatus
+from courses_platform_api.mixins import ImageMixin
+from courses_platform_api.settings import IMAGE_VARIANT_WIDTHS, THUMB_SIZE
+from lessons.models import Lesson, Material
+
+User = get_user_model()
+
+
+def image_file(name='cover.jpg', size=(2000, 1500)):
+    content = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(content, 'JPEG')
+    return SimpleUploadedFile(name, content.getvalue(), content_type='image/jpeg')
+
+
+class ProcessImagesCommandTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.user = User.objects.create_user(email='user@user.com', password='strong', role=ProfileRoles.ADMINISTRATOR)
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_uploaded_cover_is_stored_raw_and_pending(self):
+        course = Course.objects.create(admin=self.user, name='Course', cover=image_file())
+        self.assertEqual(course.cover_status, ImageStatus.PENDING)
+        self.assertEqual(course.cover.width, 2000)
+
+    def test_process_images_generates_thumbnail_and_variants(self):
+        course = Course.objects.create(admin=self.user, name='Course', cover=image_file())
+        original = course.cover.name
+        out = StringIO()
+        call_command('process_images', workers=0, stdout=out)
+        self.assertIn('Processed 1 images, failed 0 images.', out.getvalue())
+
+        course.refresh_from_db()
+        self.assertEqual(course.cover_status, ImageStatus.READY)
+        self.assertEqual(course.cover_variants['original'], original)
+        self.assertEqual(course.cover.name, course.cover_variants['thumbnail'])
+        self.assertLessEqual(max(course.cover.width, course.cover.height), THUMB_SIZE)
+        for width in IMAGE_VARIANT_WIDTHS:
+            with Image.open(course.cover.storage.path(course.cover_variants[f'{width}.webp'])) as image:
+                self.assertEqual((image.format, image.width), ('WEBP', width))
+            with Image.open(course.cover.storage.path(course.cover_variants[f'{width}.jpeg'])) as image:
+                self.assertEqual((image.format, image.width), ('JPEG', width))
+
+        out = StringIO()
+        call_command('process_images', workers=0, stdout=out)
+        self.assertEqual(out.getvalue(), '')
+
+    def test_process_images_small_image_is_not_upscaled(self):
+        course = Course.objects.create(admin=self.user, name='Course', cover=image_file(size=(400, 300)))
+        call_command('process_images', workers=0, stdout=StringIO())
+        course.refresh_from_db()
+        with Image.open(course.cover.storage.path(course.cover_variants['1280.jpeg'])) as image:
+            self.assertEqual(image.width, 400)
+
+    def test_process_images_broken_image_failed(self):
+        course = Course.objects.create(admin=self.user, name='Course',
+                                       cover=SimpleUploadedFile('cover.jpg', b'not an image'))
+        with self.assertLogs('courses.management.commands.process_images', 'ERROR'):
+            call_command('process_images', workers=0, stdout=StringIO())
+        course.refresh_from_db()
+        self.assertEqual(course.cover_status, ImageStatus.FAILED)
+
+    def test_process_images_worker_processes(self):
+        course = Course.objects.create(admin=self.user, name='Course', cover=image_file())
+        call_command('process_images', workers=1, stdout=StringIO())
+        course.refresh_from_db()
+        self.assertEqual(course.cover_status, ImageStatus.READY)
+
+
+class MediaBlobStorageTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.user = User.objects.create_user(email='user@user.com', password='strong', role=ProfileRoles.ADMINISTRATOR)
+        self.course = Course.objects.create(admin=self.user, name='Course')
+        self.lesson = Lesson.objects.create(course=self.course)
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def material(self, name, content=b'%PDF material'):
+        material = Material(lesson=self.lesson)
+        material.file.save(name, ContentFile(content))
+        return material
+
+    def expire(self):
+        MediaBlob.objects.update(updated=timezone.now() - timedelta(days=2))
+
+    def test_same_content_stored_once(self):
+        first, second = self.material('first.pdf'), self.material('second.pdf')
+        other = self.material('first.pdf', b'%PDF other')
+        self.assertEqual(first.file.name, second.file.name)
+        digest = hashlib.sha256(b'%PDF material').hexdigest()
+        self.assertEqual(first.file.name, f'media/blobs/{digest[:2]}/{digest}.pdf')
+        self.assertEqual((first.filename, second.filename), ('first.pdf', 'second.pdf'))
+        self.assertNotEqual(other.file.name, first.file.name)
+        blob = MediaBlob.objects.get(name=first.file.name)
+        self.assertEqual((blob.reference_count, blob.size), (2, 13))
+        with second.file.open('rb') as file:
+            self.assertEqual(file.read(), b'%PDF material')
+        self.assertEqual(len(os.listdir(os.path.dirname(first.file.path))), 1)
+
+    def test_file_removed_only_without_references(self):
+        first, second = self.material('first.pdf'), self.material('second.pdf')
+        ImageMixin.remove(first.file)
+        self.expire()
+        call_command('clean_media', stdout=StringIO())
+        self.assertTrue(os.path.isfile(second.file.path))
+
+        ImageMixin.remove(second.file)
+        Material.objects.all().delete()
+        call_command('clean_media', stdout=StringIO())
+        self.assertTrue(os.path.isfile(second.file.path))
+        self.expire()
+        out = StringIO()
+        call_command('clean_media', stdout=out)
+        self.assertIn('removed 1 orphan blobs', out.getvalue())
+        self.assertFalse(os.path.exists(os.path.dirname(second.file.path)))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_references_recounted_after_cascade_delete(self):
+        kept = self.material('kept.pdf', b'%PDF kept')
+        self.material('deleted.pdf')
+        self.lesson.materials.exclude(pk=kept.pk).delete()
+        self.expire()
+        out = StringIO()
+        call_command('clean_media', stdout=out)
+        self.assertIn('recounted references of 1 blobs, removed 1 orphan blobs.', out.getvalue())
+        self.assertEqual(MediaBlob.objects.get().name, kept.file.name)
+
+    def test_processed_cover_variants_released(self):
+        self.course.cover = image_file()
+        self.course.save()
+        call_command('process_images', workers=0, stdout=StringIO())
+        self.course.refresh_from_db()
+        self.assertEqual(MediaBlob.objects.filter(reference_count=1).count(), len(self.course.cover_variants))
+        ImageMixin.remove(self.course.cover)
+        ImageMixin.remove_variants(self.course.cover, self.course.cover_variants)
+        self.assertFalse(MediaBlob.objects.exclude(reference_count=0).exists())
+
+    def test_file_of_rolled_back_save_removed(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            material = self.material('rolled_back.pdf')
+            Material.objects.create(pk=material.pk, lesson=self.lesson, file='other.pdf')
+        self.assertTrue(os.path.isfile(material.file.path))
+        self.assertFalse(MediaBlob.objects.exists())
+        tmp = 'media/blobs/tmp/part'
+        os.makedirs(os.path.dirname(default_storage.path(tmp)), exist_ok=True)
+        with open(default_storage.path(tmp), 'wb') as file:
+            file.write(b'part')
+
+        out = StringIO()
+        call_command('clean_media', stdout=out)
+        self.assertIn('Found 1 untracked files', out.getvalue())
+        self.assertEqual(MediaBlob.objects.get().reference_count, 0)
+        self.assertTrue(os.path.isfile(material.file.path))
+        self.assertTrue(default_storage.exists(tmp))
+
+        self.expire()
+        os.utime(default_storage.path(tmp), (0, 0))
+        call_command('clean_media', stdout=StringIO())
+        self.assertFalse(os.path.exists(material.file.path))
+        self.assertFalse(default_storage.exists(tmp))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_file_saved_before_blobs_deleted_directly(self):
+        with open(default_storage.path('legacy.pdf'), 'wb') as file:
+            file.write(b'%PDF legacy')
+        default_storage.delete('legacy.pdf')
+        self.assertFalse(default_storage.exists('legacy.pdf'))
+
+
+class CourseCoverAPITestCase(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        User.objects.create_superuser(email='super@super.super', password='strong')
+        self.user = User.objects.create_user(email='user@user.com', password='strong', role=ProfileRoles.ADMINISTRATOR)
+        self.course = Course.objects.create(admin=self.user, name='Course')
+        self.url = reverse('v1.0:courses:course-detail', kwargs={'slug': self.course.slug})
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'super@super.super', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_cover_upload_status_and_variants(self):
+        response = self.client.patch(self.url, {'cover': image_file()}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['cover_status'], ImageStatus.PENDING)
+        self.assertEqual(response.data['cover_variants'], {})
+
+        call_command('process_images', workers=0, stdout=StringIO())
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['cover_status'], ImageStatus.READY)
+        self.assertRegex(response.data['cover_variants']['640.webp'], r'/media/blobs/\w{2}/\w{64}\.webp$')
+
+    def test_update_without_cover_keeps_cover(self):
+        self.client.patch(self.url, {'cover': image_file()}, format='multipart')
+        call_command('process_images', workers=0, stdout=StringIO())
+        self.course.refresh_from_db()
+        response = self.client.patch(self.url, {'name': 'New name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['cover_status'], ImageStatus.READY)
+        self.assertTrue(self.course.cover.storage.exists(self.course.cover.name))
+
+
+class ExplainQueriesCommandTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user@user.com', password='strong', role=ProfileRoles.ADMINISTRATOR)
+        self.learner = User.objects.create_user(email='learner@user.com', password='strong')
+        self.course = Course.objects.create(admin=self.user, name='Course')
+        Lesson.objects.create(course=self.course, name='Lesson')
+        Permission.objects.create(user=self.learner, course=self.course, access=True)
+
+    def test_explain_queries_uses_indexes(self):
+        out = StringIO()
+        call_command('explain_queries', 'learner@user.com', '--disable-seqscan', stdout=out)
+        output = out.getvalue()
+        for name in ('courses list', 'course learners list', 'users list', 'lessons list', 'course access',
+                     'test result'):
+            self.assertIn(name, output)
+        self.assertIn('unique_course_permission', output)
+        self.assertIn('unique_result', output)
+
+    def test_explain_queries_unknown_user(self):
+        with self.assertRaises(CommandError):
+            call_command('explain_queries', 'unknown@user.com', stdout=StringIO())
+
+
+class BenchmarkCommandTestCase(TestCase):
+    def test_generate_data_is_deterministic(self):
+        call_command('generate_data', '--tenants', '1', '--learners', '5', '--prefix', 'first', stdout=StringIO())
+        call_command('generate_data', '--tenants', '1', '--learners', '5', '--prefix', 'second', stdout=StringIO())
+        first = list(Permission.objects.filter(user__email__startswith='first-', course__isnull=False).
+                     values_list('user__first_name', 'course__name', 'access').order_by('id'))
+        second = list(Permission.objects.filter(user__email__startswith='second-', course__isnull=False).
+                      values_list('user__first_name', 'course__name', 'access').order_by('id'))
+        self.assertEqual(len(first), 10)
+        self.assertEqual(first, second)
+        self.assertEqual(User.objects.filter(email__startswith='first-', role=ProfileRoles.LEARNER).count(), 5)
+
+    def test_benchmark_saves_and_compares_results(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = f'{directory}/results.json'
+            call_command('benchmark', '--learners', '10', '--tenants', '1', '--admins', '1', '--courses', '1',
+                         '--repeat', '2', '--warmup', '0', '--strategies',
+                         '--output', output, stdout=StringIO())
+            results = load(output)
+            out = StringIO()
+            call_command('benchmark', '--learners', '10', '--tenants', '1', '--admins', '1', '--courses', '1',
+                         '--repeat', '2', '--warmup', '0',
+                         '--compare', output, stdout=out)
+
+        scenarios = results['sizes']['10']
+        self.assertEqual(scenarios['courses list (learner)']['statuses'], [200])
+        self.assertEqual(scenarios['grading (learner)']['statuses'], [201])
+        self.assertEqual(scenarios['courses list (superuser)']['requests'], 2)
+        self.assertIn('p99_ms', scenarios['token'])
+        self.assertEqual(scenarios['users list (administrator, subquery)']['statuses'], [200])
+        self.assertEqual(scenarios['users list (administrator, prefetch)']['statuses'], [200])
+        self.assertIn('courses list (superuser)', out.getvalue().split('Compared with')[1])
+        self.assertFalse(User.objects.exists())
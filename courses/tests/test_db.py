@@ -0,0 +1,161 @@
+from unittest import mock
+
+import psycopg2
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from courses.catalog import catalog_cache
+from courses.models import Course, Permission
+from courses_platform_api.choices_types import ProfileRoles
+from courses_platform_api.db.pool import ConnectionPool, PoolTimeout
+from courses_platform_api.db.postgresql_pool.base import DatabaseWrapper
+
+User = get_user_model()
+
+
+class ConnectionPoolTestCase(TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool(max_size=2, max_lifetime=60, health_check_after=30, timeout=0.1)
+        self.params = connection.get_connection_params()
+
+    def tearDown(self):
+        self.pool.close()
+
+    def connect(self):
+        return psycopg2.connect(**self.params)
+
+    def test_connection_reused(self):
+        raw = self.pool.get(self.connect)
+        self.pool.put(raw)
+        self.assertIs(self.pool.get(self.connect), raw)
+        self.assertEqual(self.pool.size, 1)
+
+    def test_open_transaction_rolled_back(self):
+        raw = self.pool.get(self.connect)
+        raw.autocommit = False
+        raw.cursor().execute('SELECT 1')
+        self.pool.put(raw)
+        self.assertEqual(raw.info.transaction_status, TRANSACTION_STATUS_IDLE)
+        self.assertIs(self.pool.get(self.connect), raw)
+
+    def test_expired_and_closed_connections_replaced(self):
+        raw = self.pool.get(self.connect)
+        self.pool.put(raw)
+        self.pool.max_lifetime = 0
+        new = self.pool.get(self.connect)
+        self.assertIsNot(new, raw)
+        self.assertTrue(raw.closed)
+
+        self.pool.max_lifetime = 60
+        self.pool.health_check_after = 0
+        self.pool.put(new)
+        new.close()
+        self.assertIsNot(self.pool.get(self.connect), new)
+        self.assertEqual(self.pool.size, 1)
+
+    def test_health_check_of_idle_connection(self):
+        raw = self.pool.get(self.connect)
+        self.pool.put(raw)
+        self.pool.health_check_after = 0
+        with mock.patch.object(self.pool, 'discard') as discard:
+            self.assertIs(self.pool.get(self.connect), raw)
+        discard.assert_not_called()
+
+    def test_timeout_when_all_connections_in_use(self):
+        self.pool.get(self.connect)
+        self.pool.get(self.connect)
+        with self.assertRaises(PoolTimeout):
+            self.pool.get(self.connect)
+
+
+class PooledBackendTestCase(TestCase):
+    def setUp(self):
+        self.database = DatabaseWrapper({**connection.settings_dict, 'POOL': {'MAX_SIZE': 2}}, alias='pooled')
+
+    def tearDown(self):
+        self.database.close()
+        self.database.pool.close()
+
+    def backend_pid(self):
+        with self.database.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_connection_returned_to_pool_on_close(self):
+        pid = self.backend_pid()
+        raw = self.database.connection
+        self.database.close()
+        self.assertIsNone(self.database.connection)
+        self.assertFalse(raw.closed)
+        self.assertEqual(self.backend_pid(), pid)
+        self.assertEqual(self.database.pool.size, 1)
+
+
+class ReplicaRouterTestCase(TransactionTestCase):
+    """
+    Replica is the second alias of the test database
+    """
+    def setUp(self):
+        catalog_cache.cache.clear()
+        connections.settings['replica'] = {**connection.settings_dict}
+        patcher = mock.patch('courses_platform_api.db.routers.DATABASE_REPLICAS', ['replica'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(email='user@user.com', password='strong', role=ProfileRoles.ADMINISTRATOR)
+        Permission.objects.create(user=self.user, access=True)
+        Course.objects.create(admin=self.user, name='Course')
+        self.client = APIClient()
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def tearDown(self):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+
+    def test_safe_methods_read_from_replica(self):
+        url = reverse('v1.0:courses:course-detail', args=[Course.objects.get().slug])
+        with CaptureQueriesContext(connections['replica']) as replica, CaptureQueriesContext(connection) as default:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Course')
+        self.assertEqual(len(replica.captured_queries), 1)
+        self.assertEqual(len(default.captured_queries), 0)
+
+    def test_one_replica_per_request(self):
+        connections.settings['other'] = {**connection.settings_dict}
+        self.addCleanup(connections.settings.__delitem__, 'other')
+        self.addCleanup(connections.__delitem__, 'other')
+        self.addCleanup(lambda: connections['other'].close())
+        url = reverse('v1.0:courses:course-learner-list', args=[Course.objects.get().slug])
+        with mock.patch('courses_platform_api.db.routers.DATABASE_REPLICAS', ['replica', 'other']):
+            for _ in range(5):
+                with CaptureQueriesContext(connections['replica']) as replica, \
+                        CaptureQueriesContext(connections['other']) as other:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(sorted([len(replica.captured_queries), len(other.captured_queries)]), [0, 3])
+
+    def test_cached_responses_read_from_default(self):
+        with CaptureQueriesContext(connections['replica']) as replica, CaptureQueriesContext(connection) as default:
+            response = self.client.get(reverse('v1.0:courses:course-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['name'], 'Course')
+        self.assertEqual(len(replica.captured_queries), 0)
+        self.assertTrue(all('courses_course' in query['sql'] for query in default.captured_queries))
+        self.assertTrue(default.captured_queries)
+
+    def test_writes_and_unsafe_methods_use_default(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.post(reverse('v1.0:courses:course-list'),
+                                        {'name': 'New course', 'admin_id': self.user.pk})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(replica.captured_queries), 0)
+        self.assertEqual(Course.objects.count(), 2)
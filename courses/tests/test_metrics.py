@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from courses.catalog import catalog_cache
+from courses.models import Course, Permission
+from courses_platform_api.choices_types import ProfileRoles
+from courses_platform_api.metrics import registry, QueryBudgetExceeded, RequestMetrics, current_request
+from courses_platform_api.settings import REQUEST_METRICS, QUERY_BUDGETS
+from lessons.models import Lesson, Question, Option
+from lessons.serializers import QuestionSerializer
+
+User = get_user_model()
+
+
+class RequestMetricsTestCase(APITestCase):
+    def setUp(self):
+        registry.clear()
+        catalog_cache.cache.clear()
+        self.url = reverse('v1.0:courses:course-list')
+        self.user = User.objects.create_user(email='user@user.com', password='strong', role=ProfileRoles.ADMINISTRATOR)
+        Course.objects.create(admin=self.user, name='Course')
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user@user.com', 'password': 'strong'})
+        self.token = res.data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_metrics_recorded_by_url_name(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        data = registry.views['v1.0:courses:course-list']
+        self.assertEqual(data['requests'][('GET', 200)], 2)
+        self.assertEqual(data['queries'], 2)
+        self.assertGreater(data['db_time'], 0)
+        self.assertGreater(data['serializer_time'], 0)
+        self.assertEqual(registry.views['v1.0:token_obtain_pair']['requests'][('POST', 200)], 1)
+
+    async def test_metrics_recorded_in_async_handler(self):
+        response = await AsyncClient().get(self.url, AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = registry.views['v1.0:courses:course-list']
+        self.assertEqual(data['requests'][('GET', 200)], 1)
+        self.assertEqual(data['queries'], 2)
+
+    def test_savepoints_of_test_transaction_not_counted(self):
+        Permission.objects.create(user=self.user, access=True)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'name': 'New course', 'admin_id': self.user.pk})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        savepoints = [query for query in queries.captured_queries if 'SAVEPOINT' in query['sql']]
+        self.assertTrue(savepoints)
+        self.assertEqual(registry.views['v1.0:courses:course-list']['queries'], len(queries) - len(savepoints))
+
+    def test_metrics_endpoint_requires_token(self):
+        self.client.get(self.url)
+        client = APIClient()
+        self.assertEqual(client.get('/metrics/').status_code, status.HTTP_404_NOT_FOUND)
+        with mock.patch.dict(REQUEST_METRICS, {'TOKEN': 'metrics-token'}):
+            self.assertEqual(client.get('/metrics/').status_code, status.HTTP_401_UNAUTHORIZED)
+            response = client.get('/metrics/', HTTP_AUTHORIZATION='Bearer metrics-token')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        content = response.content.decode()
+        self.assertIn('api_requests_total{view="v1.0:courses:course-list",method="GET",status="200"} 1', content)
+        self.assertIn('api_db_queries_total{view="v1.0:courses:course-list"} 2', content)
+        self.assertIn('api_request_duration_seconds_count{view="v1.0:courses:course-list"} 1', content)
+
+    def test_query_budget_exceeded_fails_in_strict_mode(self):
+        with mock.patch.dict(QUERY_BUDGETS, {'v1.0:courses:course-list': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(self.url)
+        self.assertEqual(registry.views['v1.0:courses:course-list']['budget_exceeded'], 1)
+
+    def test_query_budget_exceeded_logged_in_not_strict_mode(self):
+        with mock.patch.dict(QUERY_BUDGETS, {'v1.0:courses:course-list': 1}), \
+                override_settings(QUERY_BUDGETS_STRICT=False), \
+                self.assertLogs('courses_platform_api.metrics', 'WARNING') as logs:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ran 2 queries, budget is 1', logs.output[0])
+
+    def test_nested_serializers_timed_once(self):
+        question = Question.objects.create(lesson=Lesson.objects.create(course=Course.objects.get(), name='Lesson'),
+                                           question='Question')
+        Option.objects.bulk_create([Option(question=question, option=option) for option in ('Right', 'Wrong')])
+        question = Question.objects.prefetch_related('options').get(pk=question.pk)
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        try:
+            with mock.patch('courses_platform_api.metrics.time.perf_counter', side_effect=[1.0, 1.5]):
+                data = QuestionSerializer(question).data
+        finally:
+            current_request.reset(token)
+        self.assertEqual(len(data['options']), 2)
+        self.assertEqual(metrics.serializer_time, 0.5)
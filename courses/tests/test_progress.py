@@ -0,0 +1,119 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from courses.models import Course, Permission, CourseProgress
+from courses_platform_api.choices_types import ProfileRoles, TaskStatus
+from lessons.models import Lesson, Result, Task
+
+User = get_user_model()
+
+
+class CourseProgressTestCase(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='user1@user.com', password='strong',
+                                              role=ProfileRoles.ADMINISTRATOR)
+        self.learner = User.objects.create_user(email='user2@user.com', password='strong', role=ProfileRoles.LEARNER,
+                                                first_name='Learner')
+        self.other = User.objects.create_user(email='user3@user.com', password='strong', role=ProfileRoles.LEARNER,
+                                              first_name='Other')
+        Permission.objects.create(user=self.admin, access=True)
+        self.course = Course.objects.create(admin=self.admin, name='Course')
+        self.lesson1 = Lesson.objects.create(course=self.course, name='Lesson 1', sort=1)
+        self.lesson2 = Lesson.objects.create(course=self.course, name='Lesson 2', sort=2)
+        Permission.objects.create(user=self.learner, course=self.course, access=True)
+        Permission.objects.create(user=self.other, course=self.course, access=True)
+
+    def progress(self, user=None):
+        return CourseProgress.objects.get(user=user or self.learner, course=self.course)
+
+    def login(self, email):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_results_change_progress(self):
+        Result.objects.create(user=self.learner, lesson=self.lesson1, result=50)
+        result = Result.objects.create(user=self.learner, lesson=self.lesson2, result=100)
+        progress = self.progress()
+        self.assertEqual((progress.tests_taken, progress.score_sum, progress.average_score), (2, 150, 75))
+        self.assertEqual(progress.last_activity, result.date)
+
+        result.delete()
+        progress = self.progress()
+        self.assertEqual((progress.tests_taken, progress.average_score), (1, 50))
+
+    def test_task_status_changes_progress(self):
+        task = Task.objects.create(user=self.learner, lesson=self.lesson1)
+        self.assertFalse(CourseProgress.objects.exists())
+
+        task.status = TaskStatus.REVIEW
+        task.save()
+        self.assertEqual((self.progress().tasks_pending, self.progress().lessons_completed), (1, 0))
+
+        task = Task.objects.get(pk=task.pk)
+        task.status = TaskStatus.ACCEPT
+        task.save()
+        task.save()
+        progress = self.progress()
+        self.assertEqual((progress.tasks_pending, progress.lessons_completed), (0, 1))
+        self.assertIsNotNone(progress.last_activity)
+
+        task.delete()
+        self.assertEqual(self.progress().lessons_completed, 0)
+
+    def test_lesson_with_several_accepted_tasks_completed_once(self):
+        first = Task.objects.create(user=self.learner, lesson=self.lesson1, status=TaskStatus.ACCEPT)
+        second = Task.objects.create(user=self.learner, lesson=self.lesson1, status=TaskStatus.REVIEW)
+        second.status = TaskStatus.ACCEPT
+        second.save()
+        self.assertEqual(self.progress().lessons_completed, 1)
+
+        first.delete()
+        self.assertEqual(self.progress().lessons_completed, 1)
+        second.status = TaskStatus.EDIT
+        second.save()
+        self.assertEqual(self.progress().lessons_completed, 0)
+
+        Task.objects.create(user=self.learner, lesson=self.lesson1, status=TaskStatus.ACCEPT)
+        Task.objects.create(user=self.learner, lesson=self.lesson1, status=TaskStatus.ACCEPT)
+        call_command('rebuild_progress', self.course.slug, stdout=StringIO())
+        self.assertEqual(self.progress().lessons_completed, 1)
+
+    def test_rebuild_progress(self):
+        Result.objects.create(user=self.learner, lesson=self.lesson1, result=40)
+        Task.objects.create(user=self.learner, lesson=self.lesson1, status=TaskStatus.ACCEPT)
+        Task.objects.create(user=self.other, lesson=self.lesson1, status=TaskStatus.NEW)
+        Task.objects.filter(user=self.other).update(status=TaskStatus.REVIEW)
+        CourseProgress.objects.filter(user=self.learner).update(tests_taken=0, score_sum=0)
+
+        out = StringIO()
+        call_command('rebuild_progress', self.course.slug, stdout=out)
+        self.assertIn('Rebuilt progress of 2 learners.', out.getvalue())
+        progress = self.progress()
+        self.assertEqual((progress.tests_taken, progress.score_sum, progress.lessons_completed), (1, 40, 1))
+        self.assertEqual(self.progress(self.other).tasks_pending, 1)
+
+    def test_learner_courses_list_progress(self):
+        Result.objects.create(user=self.learner, lesson=self.lesson1, result=80)
+        Task.objects.create(user=self.learner, lesson=self.lesson2, status=TaskStatus.REVIEW)
+        self.login('user2@user.com')
+        response = self.client.get(reverse('v1.0:courses:course-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        course = response.data['results'][0]
+        self.assertEqual((course['lessons_completed'], course['average_score'], course['tasks_pending']), (0, 80, 1))
+        self.assertIsNotNone(course['last_activity'])
+
+    def test_course_learners_list_progress(self):
+        Task.objects.create(user=self.learner, lesson=self.lesson1, status=TaskStatus.ACCEPT)
+        self.login('user1@user.com')
+        response = self.client.get(reverse('v1.0:courses:course-learner-list', args=[self.course.slug]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        learners = {learner['full_name'].strip(): learner for learner in response.data['results']}
+        self.assertEqual(learners['Learner']['lessons_completed'], 1)
+        self.assertIsNone(learners['Learner']['average_score'])
+        self.assertEqual(learners['Other']['lessons_completed'], 0)
+        self.assertIsNone(learners['Other']['last_activity'])
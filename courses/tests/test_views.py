@@ -1,10 +1,27 @@
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
-from django.urls import reverse
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, resolve
 from rest_framework import status
+from rest_framework.response import Response
 from rest_framework.test import APITestCase, APIClient
+from rest_framework.throttling import BaseThrottle
 
-from courses.models import Course, Permission
+from courses.catalog import catalog_cache
+from courses.models import Course, Permission, MediaBlob
+from courses.views import CoursesShortListAsyncView, CourseCuratorsListAsyncView, CoursesShortListAPIView, \
+    CourseCuratorsListAPIView
+from courses_platform_api.async_views import method_view
 from courses_platform_api.choices_types import ProfileRoles
+from lessons.models import Lesson, Material, Question, Option
 from users.models import Lead
 
 User = get_user_model()
@@ -248,6 +265,92 @@ class CourseAPIViewTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class CourseCloneAPIViewTestCase(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong')
+        self.user1 = User.objects.create_user(email='user1@user.com', password='strong', role=ProfileRoles.ADMINISTRATOR)
+        self.user2 = User.objects.create_user(email='user2@user.com', password='strong', role=ProfileRoles.ADMINISTRATOR)
+        self.user3 = User.objects.create_user(email='user3@user.com', password='strong')
+        self.course = Course.objects.create(admin=self.user1, name='Course', description='Description', price=10)
+        Permission.objects.create(user=self.user3, course=self.course, access=True)
+        self.add_lessons(2)
+        self.url = reverse('v1.0:courses:course-clone', args=[self.course.slug])
+        self.login('super@super.super')
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def login(self, email):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def add_lessons(self, count):
+        for number in range(count):
+            lesson = Lesson.objects.create(course=self.course, name=f'Lesson {number}', sort=number, test=True)
+            Material(lesson=lesson).file.save('material.pdf', ContentFile(b'%PDF material'))
+            question = Question.objects.create(lesson=lesson, question=f'Question {number}')
+            Option.objects.create(question=question, option='Right', correct=True)
+            Option.objects.create(question=question, option='Wrong')
+
+    def test_course_cloned_with_lessons_materials_and_tests(self):
+        response = self.client.post(self.url, {'name': 'Copy'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        clone = Course.objects.get(slug=response.data['slug'])
+        self.assertNotEqual(clone.slug, self.course.slug)
+        self.assertEqual((clone.name, clone.admin_id, clone.description, clone.price, clone.is_active),
+                         ('Copy', self.user1.pk, 'Description', 10, True))
+        self.assertFalse(Permission.objects.filter(course=clone).exists())
+
+        lessons = Lesson.objects.filter(course=clone).order_by('sort')
+        self.assertEqual([lesson.name for lesson in lessons], ['Lesson 0', 'Lesson 1'])
+        for lesson in lessons:
+            self.assertEqual(lesson.materials.count(), 1)
+            question = lesson.questions.get()
+            self.assertEqual(question.question, f'Question {lesson.sort}')
+            self.assertEqual(list(question.options.values_list('option', 'correct').order_by('id')),
+                             [('Right', True), ('Wrong', False)])
+        self.assertEqual(Lesson.objects.filter(course=self.course).count(), 2)
+
+        material = Material.objects.filter(lesson__course=clone).first()
+        self.assertEqual(material.file.name, Material.objects.filter(lesson__course=self.course).first().file.name)
+        self.assertEqual(MediaBlob.objects.get().reference_count, 4)
+
+    def test_clone_of_inactive_course_inactive(self):
+        Course.objects.filter(pk=self.course.pk).update(is_active=False)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Course.objects.get(slug=response.data['slug']).is_active)
+
+    def test_clone_queries_dont_depend_on_lessons(self):
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url)
+        self.add_lessons(10)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['name'], 'Course')
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_clone_permissions(self):
+        self.login('user3@user.com')
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.login('user2@user.com')
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.login('user1@user.com')
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        Permission.objects.create(user=self.user1, access=True)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
 class CoursesSwitchStatusAPIViewTestCase(APITestCase):
     def setUp(self):
         self.client = APIClient()
@@ -363,6 +466,29 @@ class CourseLearnersListAPIViewTestCase(CourseLearnersMixin):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['results'][0]['full_name'], 'Aaa ')
 
+    def test_course_learners_list_pages_with_equal_full_names(self):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'super@super.super', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        url, learners = self.url + '?limit=2', []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            learners += [learner['user_slug'] for learner in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(len(learners), 6)
+        self.assertEqual(len(set(learners)), 6)
+
+    def test_course_learners_list_export_csv(self):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user1@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        response = self.client.get(self.url + '?export=csv&access=True')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'user_slug,full_name,date_end,access,lessons_completed,average_score,tasks_pending,'
+                                   'last_activity')
+        self.assertEqual(len(lines), 5)
+
 
 class CourseLearnerSwitchAccessAPIViewTestCase(APITestCase):
     def setUp(self):
@@ -388,6 +514,94 @@ class CourseLearnerSwitchAccessAPIViewTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(Permission.objects.values('date_end').get(course=self.course1, user=self.user3), '2025-01-01')
 
+    def test_switch_access_status_applied_to_lessons_immediately(self):
+        lesson = Lesson.objects.create(course=self.course1, name="Lesson")
+        lesson_url = reverse('v1.0:courses:lessons:lesson-detail', args=[self.course1.slug, lesson.pk])
+        learner = APIClient()
+        res = learner.post(reverse('v1.0:token_obtain_pair'), {'email': 'user3@user.com', 'password': 'strong'})
+        learner.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        self.assertEqual(learner.get(lesson_url).status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(self.url, {'access': False})
+        self.assertEqual(learner.get(lesson_url).status_code, status.HTTP_403_FORBIDDEN)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(self.url, {'access': True})
+        self.assertEqual(learner.get(lesson_url).status_code, status.HTTP_200_OK)
+
+
+class CourseLearnersBulkAPIViewTestCase(CourseLearnersMixin):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('v1.0:courses:course-learner-bulk', args=[self.course1.slug])
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user1@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_course_learners_bulk_curator_permission_no_access(self):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user2@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        response = self.client.post(self.url, {'action': 'grant', 'users': [self.user9.slug]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_course_learners_bulk_grant(self):
+        data = {'action': 'grant', 'users': [self.user3.slug, 'user7@user.com', self.user9.slug, 'user10@user.com',
+                                             self.user2.slug, 'unknown@user.com']}
+        with self.assertNumQueries(7):
+            response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['outcome'] for result in response.data['results']],
+                         ['unchanged', 'updated', 'created', 'created', 'not_found', 'not_found'])
+        self.assertEqual(response.data['summary'], {'unchanged': 1, 'updated': 1, 'created': 2, 'not_found': 2})
+        self.assertEqual(Permission.objects.filter(course=self.course1, access=True).count(), 7)
+        self.assertFalse(Permission.objects.filter(user=self.user2).exists())
+
+    def test_course_learners_bulk_grant_reports_permissions_created_concurrently(self):
+        select_for_update = Permission.objects.select_for_update
+
+        def concurrent_subscribe():
+            # Permissions are created by other requests after the select of the grant
+            Permission.objects.create(user=self.user9, course=self.course1)
+            mocked.side_effect = select_for_update
+            return Permission.objects.none()
+
+        with mock.patch.object(Permission.objects, 'select_for_update', side_effect=concurrent_subscribe) as mocked:
+            response = self.client.post(self.url, {'action': 'grant', 'users': [self.user3.slug, self.user7.slug,
+                                                                              self.user9.slug]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['outcome'] for result in response.data['results']],
+                         ['unchanged', 'updated', 'updated'])
+        self.assertEqual(Permission.objects.filter(course=self.course1, user__in=[self.user7, self.user9],
+                                                   access=True).count(), 2)
+
+    def test_course_learners_bulk_revoke_and_extend(self):
+        response = self.client.post(self.url, {'action': 'revoke', 'users': [self.user3.slug, self.user7.slug,
+                                                                           self.user9.slug]}, format='json')
+        self.assertEqual([result['outcome'] for result in response.data['results']],
+                         ['updated', 'unchanged', 'not_enrolled'])
+        self.assertFalse(Permission.objects.get(pk=self.permission1.pk).access)
+
+        response = self.client.post(self.url, {'action': 'extend', 'users': [self.user4.slug]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, {'action': 'extend', 'users': [self.user4.slug, self.user5.slug],
+                                               'date_end': '2030-01-01'}, format='json')
+        self.assertEqual(response.data['summary'], {'updated': 2})
+        self.assertEqual(str(Permission.objects.get(pk=self.permission2.pk).date_end), '2030-01-01')
+        self.assertTrue(Permission.objects.get(pk=self.permission2.pk).access)
+
+    def test_course_learners_bulk_revoke_applied_to_lessons_immediately(self):
+        lesson = Lesson.objects.create(course=self.course1, name="Lesson")
+        lesson_url = reverse('v1.0:courses:lessons:lesson-detail', args=[self.course1.slug, lesson.pk])
+        learner = APIClient()
+        res = learner.post(reverse('v1.0:token_obtain_pair'), {'email': 'user3@user.com', 'password': 'strong'})
+        learner.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        self.assertEqual(learner.get(lesson_url).status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {'action': 'revoke', 'users': [self.user3.slug]}, format='json')
+        self.assertEqual(learner.get(lesson_url).status_code, status.HTTP_403_FORBIDDEN)
+
 
 class SubscribeToCourseAPIViewAPIViewTestCase(CourseLearnersMixin):
     def setUp(self):
@@ -428,3 +642,171 @@ class SubscribeToCourseAPIViewAPIViewTestCase(CourseLearnersMixin):
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
         response = self.client.post(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class CatalogCacheTestCase(APITestCase):
+    def setUp(self):
+        catalog_cache.cache.clear()
+        self.url = reverse('v1.0:courses:course-list')
+        self.admin = User.objects.create_user(email='user1@user.com', password='strong', role=ProfileRoles.ADMINISTRATOR)
+        self.learner = User.objects.create_user(email='user2@user.com', password='strong')
+        self.course1 = Course.objects.create(admin=self.admin, name="Course 1")
+        self.course2 = Course.objects.create(admin=self.admin, name="Course 2")
+        self.permission = Permission.objects.create(user=self.learner, course=self.course1)
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user2@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_catalog_cached_response_and_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.data, response.data)
+        self.assertEqual(cached['ETag'], etag)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.get(self.url + '?ordering=-name', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_catalog_invalidated_by_course_and_permission_changes(self):
+        etag = self.client.get(self.url)['ETag']
+        self.course1.switch_status()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+        self.course1.switch_status()
+        etag = self.client.get(self.url)['ETag']
+        self.permission.activate_user()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['results'][0]['access'])
+
+    def test_catalog_of_other_users_not_shared(self):
+        self.client.get(self.url)
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user1@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_public_user_courses_list_not_modified(self):
+        url = reverse('v1.0:users:user-courses-list', args=[self.admin.slug])
+        client = APIClient()
+        etag = client.get(url)['ETag']
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        Course.objects.create(admin=self.admin, name="Course 3")
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+
+
+def async_get(view, url, token=None, **headers):
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    request = AsyncRequestFactory().get(url, **headers)
+    request.resolver_match = resolve(request.path)
+    response = async_to_sync(view)(request, **request.resolver_match.kwargs)
+    # Responses are rendered by the handler
+    return response.render() if isinstance(response, Response) else response
+
+
+class CoursesAsyncViewsTestCase(APITestCase):
+    def setUp(self):
+        catalog_cache.cache.clear()
+        self.admin = User.objects.create_user(email='admin@user.com', password='strong', role=ProfileRoles.ADMINISTRATOR)
+        self.curator = User.objects.create_user(email='curator@user.com', password='strong', role=ProfileRoles.CURATOR,
+                                                first_name='Curator', last_name='One')
+        self.learner = User.objects.create_user(email='learner@user.com', password='strong')
+        Lead.objects.create(user=self.curator, lead=self.admin)
+        self.course1 = Course.objects.create(admin=self.admin, name="Course 1")
+        self.course2 = Course.objects.create(admin=self.admin, name="Course 2", is_active=False)
+        Permission.objects.create(user=self.learner, course=self.course1, access=True)
+        self.tokens = {
+            user.email: self.client.post(reverse('v1.0:token_obtain_pair'),
+                                         {'email': user.email, 'password': 'strong'}).data['access']
+            for user in (self.admin, self.curator, self.learner)
+        }
+        self.short_list_url = reverse('v1.0:courses:course-short-list')
+        self.curators_url = reverse('v1.0:courses:course-curator-list', args=[self.course1.slug])
+
+    def test_short_list_same_as_sync_view(self):
+        for email, token in self.tokens.items():
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+            catalog_cache.cache.clear()
+            expected = self.client.get(self.short_list_url)
+            catalog_cache.cache.clear()
+            response = async_get(CoursesShortListAsyncView.as_view(), self.short_list_url, token)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(json.loads(response.content), json.loads(expected.content))
+
+    def test_short_list_not_modified_and_cached(self):
+        token = self.tokens['learner@user.com']
+        response = async_get(CoursesShortListAsyncView.as_view(), self.short_list_url, token)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            cached = async_get(CoursesShortListAsyncView.as_view(), self.short_list_url, token)
+            not_modified = async_get(CoursesShortListAsyncView.as_view(), self.short_list_url, token,
+                                     **{'If-None-Match': etag})
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_short_list_unauthorized(self):
+        response = async_get(CoursesShortListAsyncView.as_view(), self.short_list_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', response)
+        response = async_get(CoursesShortListAsyncView.as_view(), self.short_list_url, 'wrong')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_curators_list_of_owner(self):
+        with self.assertNumQueries(2):
+            response = async_get(CourseCuratorsListAsyncView.as_view(), self.curators_url,
+                                 self.tokens['admin@user.com'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content),
+                         {'curators_list': [{'slug': self.curator.slug, 'full_name': 'Curator One'}]})
+
+    def test_curators_list_of_inactive_course_no_content(self):
+        url = reverse('v1.0:courses:course-curator-list', args=[self.course2.slug])
+        response = async_get(CourseCuratorsListAsyncView.as_view(), url, self.tokens['admin@user.com'])
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_curators_list_permissions(self):
+        response = async_get(CourseCuratorsListAsyncView.as_view(), self.curators_url, self.tokens['curator@user.com'])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        url = reverse('v1.0:courses:course-curator-list', args=['missing'])
+        response = async_get(CourseCuratorsListAsyncView.as_view(), url, self.tokens['admin@user.com'])
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_throttles_of_drf_applied(self):
+        class Throttle(BaseThrottle):
+            def allow_request(self, request, view):
+                return False
+
+            def wait(self):
+                return 30
+
+        view = CourseCuratorsListAsyncView.as_view(throttle_classes=(Throttle, ))
+        response = async_get(view, self.curators_url, self.tokens['admin@user.com'])
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_method_view_serves_other_methods_by_sync_view(self):
+        view = method_view(CourseCuratorsListAsyncView.as_view(), CourseCuratorsListAPIView.as_view(), enabled=True)
+        request = AsyncRequestFactory().post(self.curators_url,
+                                             Authorization=f"Bearer {self.tokens['admin@user.com']}")
+        request.resolver_match = resolve(self.curators_url)
+        response = async_to_sync(view)(request, slug=self.course1.slug)
+        self.assertIsInstance(response.renderer_context['view'], CourseCuratorsListAPIView)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        response = async_get(view, self.curators_url, self.tokens['admin@user.com'])
+        self.assertIsInstance(response.renderer_context['view'], CourseCuratorsListAsyncView)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIs(method_view(CoursesShortListAsyncView.as_view(), CoursesShortListAPIView, enabled=False),
+                      CoursesShortListAPIView)
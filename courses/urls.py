@@ -1,18 +1,25 @@
 from django.urls import path, include
 
 from courses.views import CoursesListAPIView, CourseAPIView, CoursesShortListAPIView, CoursesSwitchStatusAPIView, \
-    CourseLearnersListAPIView, CourseLearnerSwitchAccessAPIView, CourseCuratorsListAPIView, SubscribeToCourseAPIView
+    CourseLearnersListAPIView, CourseLearnerSwitchAccessAPIView, CourseCuratorsListAPIView, SubscribeToCourseAPIView, \
+    CourseLearnersBulkAPIView, CoursesShortListAsyncView, CourseCuratorsListAsyncView, CourseCloneAPIView
+from courses_platform_api.async_views import method_view
 
 app_name = 'courses'
 
 urlpatterns = [
     path('', CoursesListAPIView.as_view(), name='course-list'),
-    path('short-list/', CoursesShortListAPIView.as_view(), name='course-short-list'),
+    path('short-list/', method_view(CoursesShortListAsyncView.as_view(), CoursesShortListAPIView.as_view()),
+         name='course-short-list'),
     path('<str:slug>/', CourseAPIView.as_view(), name='course-detail'),
+    path('<str:slug>/clone/', CourseCloneAPIView.as_view(), name='course-clone'),
     path('<str:slug>/subscribe/', SubscribeToCourseAPIView.as_view(), name='subscribe-to-course'),
     path('<str:slug>/lessons/', include('lessons.urls')),
-    path('<str:slug>/curators/', CourseCuratorsListAPIView.as_view(), name='course-curator-list'),
+    path('<str:slug>/curators/',
+         method_view(CourseCuratorsListAsyncView.as_view(), CourseCuratorsListAPIView.as_view()),
+         name='course-curator-list'),
     path('<str:slug>/learners/', CourseLearnersListAPIView.as_view(), name='course-learner-list'),
+    path('<str:slug>/learners/bulk/', CourseLearnersBulkAPIView.as_view(), name='course-learner-bulk'),
     path('<str:slug>/learners/<str:user_slug>/switch-status/', CourseLearnerSwitchAccessAPIView.as_view(),
          name='course-learner-switch-status'),
     path('<str:slug>/switch-status/', CoursesSwitchStatusAPIView.as_view(), name='course-switch-status'),
@@ -10,24 +10,31 @@ from rest_framework.filters import OrderingFilter
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from courses.mixins import CourseMixin
+from courses.catalog import CatalogCacheMixin, AsyncCatalogCacheMixin
+from courses.mixins import CourseMixin, CourseObjectMixin, LearnersBulkMixin
 from courses.models import Course, Permission
+from courses.progress import ProgressMixin
 from courses.serializers import CoursesListSerializer, CourseSerializer, CourseLearnersListSerializer, \
-    LearnerCoursesListSerializer
+    LearnerCoursesListSerializer, CourseLearnersBulkSerializer, CourseCloneSerializer
+from courses.signals import course_access_changed
+from courses_platform_api.async_views import AsyncAPIView
 from courses_platform_api.mixins import ImageMixin
+from courses_platform_api.pagination import KeysetPagination
 from courses_platform_api.permissions import IsSuperuserOrOwner, \
     IsSuperuserAllOrOwnerAllOrCuratorActiveCoursesReadOnlyLearnerReadOnly, LearnerPermission
 from courses_platform_api.choices_types import ProfileRoles
+from lessons.mixins import CourseCloneMixin
 from users.mixin import UsersListAdministratorLimitPermissionAPIView
 from users.models import Lead
 
 User = get_user_model()
 
 
-class CoursesListAPIView(generics.ListCreateAPIView):
+class CoursesListAPIView(CatalogCacheMixin, generics.ListCreateAPIView):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = (IsSuperuserAllOrOwnerAllOrCuratorActiveCoursesReadOnlyLearnerReadOnly, )
+    pagination_class = KeysetPagination
 
     filter_backends = [OrderingFilter]
     ordering_fields = ['name']
@@ -37,9 +44,11 @@ class CoursesListAPIView(generics.ListCreateAPIView):
         if self.request.method == 'GET':
             pk = self.request.user.pk
             role = self.request.user.role
-            queryset = Course.objects.values('slug', 'name', 'cover', 'description', 'sequence', 'is_active').\
+            queryset = Course.objects.values('slug', 'name', 'cover', 'cover_status', 'cover_variants', 'description',
+                                             'sequence', 'is_active').\
                 annotate(admin=Concat('admin__first_name', Value(' '), 'admin__last_name')).distinct()
-            return CourseMixin.list_by_role(role, pk, queryset)
+            queryset = CourseMixin.list_by_role(role, pk, queryset)
+            return ProgressMixin.with_course_progress(queryset, pk) if role == ProfileRoles.LEARNER else queryset
         return super().get_queryset()
 
     def get_serializer_class(self):
@@ -50,9 +59,7 @@ class CoursesListAPIView(generics.ListCreateAPIView):
         return super().get_serializer_class()
 
     def permission_for_creation(self):
-        if Permission.objects.filter(user=self.request.user, access=True).exists():
-            return True
-        return not Course.objects.filter(admin=self.request.user).count()
+        return CourseMixin.can_create(self.request.user.pk)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -65,7 +72,7 @@ class CoursesListAPIView(generics.ListCreateAPIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
-class CourseAPIView(generics.RetrieveUpdateDestroyAPIView):
+class CourseAPIView(CourseObjectMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = (IsSuperuserAllOrOwnerAllOrCuratorActiveCoursesReadOnlyLearnerReadOnly, )
@@ -73,8 +80,9 @@ class CourseAPIView(generics.RetrieveUpdateDestroyAPIView):
 
     def perform_update(self, serializer):
         instance = self.get_object()
-        if instance.cover:
+        if 'cover' in serializer.validated_data and instance.cover:
             ImageMixin.remove(instance.cover)
+            ImageMixin.remove_variants(instance.cover, instance.cover_variants)
         serializer.save()
 
     def perform_destroy(self, instance):
@@ -84,8 +92,25 @@ class CourseAPIView(generics.RetrieveUpdateDestroyAPIView):
         instance.delete()
 
 
-class CoursesShortListAPIView(APIView):
-    def get(self, request, *args, **kwargs):
+class CourseCloneAPIView(APIView):
+    """
+    Copy of the course with lessons, materials and tests for its administrator: {"name": "New course"}
+    """
+    serializer_class = CourseCloneSerializer
+    permission_classes = (IsSuperuserOrOwner, )
+
+    def post(self, request, *args, **kwargs):
+        course = CourseMixin.get_course(request, self.kwargs['slug'])
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if request.user.role == ProfileRoles.ADMINISTRATOR and not CourseMixin.can_create(request.user.pk):
+            return Response({'error': 'You can create only one course'}, status=status.HTTP_400_BAD_REQUEST)
+        clone = CourseCloneMixin.clone(course, serializer.validated_data.get('name'))
+        return Response(CourseSerializer(clone, context={'request': request}).data, status=status.HTTP_201_CREATED)
+
+
+class CoursesShortListAPIView(CatalogCacheMixin, APIView):
+    def catalog_response(self, request, *args, **kwargs):
         pk = self.request.user.pk
         role = self.request.user.role
         queryset = Course.objects.values('slug', 'name').order_by('name')
@@ -93,7 +118,14 @@ class CoursesShortListAPIView(APIView):
         return Response({'courses_list': courses_list}, status=status.HTTP_200_OK)
 
 
-class CoursesSwitchStatusAPIView(generics.UpdateAPIView):
+class CoursesShortListAsyncView(AsyncCatalogCacheMixin, AsyncAPIView):
+    async def catalog_response(self, request, *args, **kwargs):
+        queryset = Course.objects.values('slug', 'name').order_by('name')
+        courses_list = CourseMixin.list_by_role(request.user.role, request.user.pk, queryset)
+        return {'courses_list': [course async for course in courses_list]}
+
+
+class CoursesSwitchStatusAPIView(CourseObjectMixin, generics.UpdateAPIView):
     queryset = Course.objects.all()
     permission_classes = (IsSuperuserOrOwner, )
     lookup_field = 'slug'
@@ -118,10 +150,10 @@ class CourseCuratorsListAPIView(APIView):
     permission_classes = (IsSuperuserOrOwner, )
 
     def get(self, request, *args, **kwargs):
-        slug = self.kwargs['slug']
-        if admin := Course.objects.values_list('admin').filter(slug=slug, is_active=True)[0][0]:
+        course = CourseMixin.get_course(request, self.kwargs['slug'])
+        if course.is_active:
 
-            curators_list = Lead.objects.select_related('user').filter(lead_id=admin).annotate(
+            curators_list = Lead.objects.select_related('user').filter(lead_id=course.admin_id).annotate(
                 slug=F('user__slug'),
                 full_name=Concat('user__first_name', Value(' '), 'user__last_name')
             ).values('slug', 'full_name')
@@ -130,6 +162,21 @@ class CourseCuratorsListAPIView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class CourseCuratorsListAsyncView(AsyncAPIView):
+    permission_classes = (IsSuperuserOrOwner, )
+
+    async def get(self, request, *args, **kwargs):
+        course = await CourseMixin.aget_course(request, self.kwargs['slug'])
+        if course.is_active:
+            curators_list = Lead.objects.filter(lead_id=course.admin_id).annotate(
+                slug=F('user__slug'),
+                full_name=Concat('user__first_name', Value(' '), 'user__last_name')
+            ).values('slug', 'full_name')
+
+            return Response({'curators_list': [curator async for curator in curators_list]}, status=status.HTTP_200_OK)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class CourseLearnersListAPIView(UsersListAdministratorLimitPermissionAPIView):
     serializer_class = CourseLearnersListSerializer
     permission_classes = (IsSuperuserOrOwner, )
@@ -138,12 +185,15 @@ class CourseLearnersListAPIView(UsersListAdministratorLimitPermissionAPIView):
     filterset_fields = ['access']
     ordering_fields = ['full_name', 'access']
     ordering = ['full_name', 'access']
+    keyset_tiebreaker = 'user_slug'
+    export_filename = 'learners'
 
     def get_queryset(self):
-        slug = self.kwargs['slug']
-        return Permission.objects.select_related('user').values('date_end', 'access').\
+        course = CourseMixin.get_course(self.request, self.kwargs['slug'])
+        queryset = Permission.objects.select_related('user').values('date_end', 'access').\
             annotate(full_name=Concat('user__first_name', Value(' '), 'user__last_name'), user_slug=F('user__slug')).\
-            filter(course__slug=slug).order_by('full_name')
+            filter(course=course).order_by('full_name')
+        return ProgressMixin.with_learner_progress(queryset, course.pk)
 
 
 class CourseLearnerSwitchAccessAPIView(APIView):
@@ -151,20 +201,37 @@ class CourseLearnerSwitchAccessAPIView(APIView):
     permission_classes = (IsSuperuserOrOwner, )
 
     def put(self, request, *args, **kwargs):
-        slug = self.kwargs['slug']
+        course = CourseMixin.get_course(request, self.kwargs['slug'])
         user_slug = self.kwargs['user_slug']
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
-        Permission.objects.filter(course__slug=slug, user__slug=user_slug).update(**serializer.validated_data)
+        Permission.objects.filter(course=course, user__slug=user_slug).update(**serializer.validated_data)
+        course_access_changed.send(sender=Permission, course_ids=[course.pk])
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class CourseLearnersBulkAPIView(APIView):
+    """
+    Grant, revoke or extend access of many learners by slugs or emails:
+    {"action": "grant", "users": ["slug", "user@email.com"], "date_end": "2023-12-31"}
+    """
+    serializer_class = CourseLearnersBulkSerializer
+    permission_classes = (IsSuperuserOrOwner, )
+
+    def post(self, request, *args, **kwargs):
+        course = CourseMixin.get_course(request, self.kwargs['slug'])
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report = LearnersBulkMixin.change_access(course, **serializer.validated_data)
+        if report['summary'].get('created') or report['summary'].get('updated'):
+            course_access_changed.send(sender=Permission, course_ids=[course.pk])
+        return Response(report, status=status.HTTP_200_OK)
+
+
 class SubscribeToCourseAPIView(APIView):
     permission_classes = (LearnerPermission, )
 
     def post(self, request, *args, **kwargs):
-        user = request.user
-        slug = self.kwargs['slug']
-        course = Course.objects.get(slug=slug)
-        Permission.objects.get_or_create(user=user, course=course)
+        course = CourseMixin.get_course(request, self.kwargs['slug'])
+        Permission.objects.get_or_create(user_id=request.user.pk, course=course)
         return Response(status=status.HTTP_200_OK)
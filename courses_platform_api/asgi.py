@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'courses_platform_api.settings')
+# Requests are handled by changing threads, their persistent connections would stay open, DB_POOL reuses connections
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
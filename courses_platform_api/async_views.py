@@ -0,0 +1,75 @@
+import inspect
+
+from asgiref.sync import sync_to_async
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from courses.mixins import CourseMixin
+from courses_platform_api.settings import ASYNC_VIEWS
+
+
+class AsyncAPIView(APIView):
+    """
+    Read only API view for ASGI, GET handlers are coroutines which use async ORM.
+    Request initialization, authentication, permissions, throttling, content negotiation, exception handling
+    and finalize_response hooks are the ones of DRF APIView, responses are rendered by the handler.
+    Authentication classes can't query the database (JWT stateless authentication). Course of url `slug`
+    is loaded by async ORM before permission checks, so permission classes of sync views get it without queries.
+    """
+    http_method_names = ['get', 'head', 'options']
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.perform_authentication(request)
+            if 'slug' in self.kwargs:
+                await CourseMixin.aget_course(request, self.kwargs['slug'])
+            self.initial(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            self._paginator = None if self.pagination_class is None else self.pagination_class()
+        return self._paginator
+
+    async def paginate_queryset(self, queryset):
+        """
+        Page of the pagination class of the sync view, queries of the paginator run in a thread
+        """
+        return await sync_to_async(self.paginator.paginate_queryset)(queryset, self.request, view=self)
+
+
+def method_view(async_view, sync_view, enabled=ASYNC_VIEWS):
+    """
+    With ASYNC_VIEWS (ASGI deployment) GET and HEAD requests of the url are served by async view,
+    other methods by sync DRF view in a thread. Without it the sync view serves all requests.
+    """
+    if not enabled:
+        return sync_view
+    sync_view = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return await async_view(request, *args, **kwargs)
+        return await sync_view(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    return view
@@ -24,3 +24,27 @@ class TaskStatus:
         (3, 'Need edit task'),
         (4, 'Accepted'),
     ]
+
+
+class EmailStatus:
+    PENDING = 1
+    SENT = 2
+    FAILED = 3
+
+    CHOICES = [
+        (1, 'Pending'),
+        (2, 'Sent'),
+        (3, 'Failed'),
+    ]
+
+
+class ImageStatus:
+    PENDING = 1
+    READY = 2
+    FAILED = 3
+
+    CHOICES = [
+        (1, 'Processing'),
+        (2, 'Ready'),
+        (3, 'Failed'),
+    ]
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS, TRANSACTION_STATUS_INERROR
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Raw connections of one database shared by threads of the process, safe for WSGI threads and ASGI executors.
+    Idle connections are reused in LIFO order, connections older than max_lifetime are closed.
+    Connections idle longer than health_check_after seconds are checked by `SELECT 1` before reuse.
+    When max_size connections are in use, callers wait for a returned one up to timeout seconds.
+    """
+    def __init__(self, max_size=10, max_lifetime=1800, health_check_after=30, timeout=10):
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+        self.idle = deque()
+        self.created = {}
+        self.connecting = 0
+        self.condition = threading.Condition()
+
+    @property
+    def size(self):
+        return len(self.created) + self.connecting
+
+    def get(self, connect):
+        """
+        Idle connection of the pool or a new one made by `connect`
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self.condition:
+                while not self.idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self.condition.wait(remaining):
+                        raise PoolTimeout(f'No free connection in the pool of {self.max_size} connections.')
+                if not self.idle:
+                    self.connecting += 1
+                    break
+                connection, returned = self.idle.pop()
+            if self.is_usable(connection, returned):
+                return connection
+            self.discard(connection)
+
+        try:
+            connection = connect()
+        except BaseException:
+            with self.condition:
+                self.connecting -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.connecting -= 1
+            self.created[connection] = time.monotonic()
+        return connection
+
+    def put(self, connection):
+        """
+        Returns the connection to the pool, open transaction is rolled back
+        """
+        try:
+            if connection.info.transaction_status in (TRANSACTION_STATUS_INTRANS, TRANSACTION_STATUS_INERROR):
+                connection.rollback()
+            reusable = not connection.closed and connection.info.transaction_status == TRANSACTION_STATUS_IDLE \
+                and not self.is_expired(connection)
+        except psycopg2.Error:
+            reusable = False
+        if not reusable:
+            return self.discard(connection)
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    def is_expired(self, connection):
+        return time.monotonic() - self.created.get(connection, 0) > self.max_lifetime
+
+    def is_usable(self, connection, returned):
+        if connection.closed or self.is_expired(connection):
+            return False
+        if time.monotonic() - returned < self.health_check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        with self.condition:
+            self.created.pop(connection, None)
+            self.condition.notify()
+
+    def close(self):
+        """
+        Closes idle connections of the pool
+        """
+        with self.condition:
+            idle, self.idle = self.idle, deque()
+        for connection, returned in idle:
+            self.discard(connection)
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def get_pool(key, options):
+    """
+    Pool of the process by connection parameters, pools made before fork of workers aren't shared with them
+    """
+    key = (os.getpid(), key)
+    with pools_lock:
+        if key not in pools:
+            pools[key] = ConnectionPool(
+                max_size=options.get('MAX_SIZE', 10),
+                max_lifetime=options.get('MAX_LIFETIME', 1800),
+                health_check_after=options.get('HEALTH_CHECK_AFTER', 30),
+                timeout=options.get('TIMEOUT', 10),
+            )
+        return pools[key]
+
+
+def close_pools():
+    with pools_lock:
+        for pool in pools.values():
+            pool.close()
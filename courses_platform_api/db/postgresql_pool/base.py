@@ -0,0 +1,30 @@
+from django.db.backends.postgresql import base, creation
+from django.utils.asyncio import async_unsafe
+
+from courses_platform_api.db.pool import get_pool, close_pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend, which takes connections from the pool of the process and returns them on close.
+    Pool options are `POOL` of the database settings.
+    """
+    creation_class = DatabaseCreation
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool((self.alias, repr(sorted(conn_params.items()))), self.settings_dict.get('POOL', {}))
+        connection = self.pool.get(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        self.isolation_level = self.settings_dict['OPTIONS'].get('isolation_level', connection.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.put(self.connection)
@@ -0,0 +1,84 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections, DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+from courses_platform_api.settings import DATABASE_REPLICAS
+
+read_from_replica = ContextVar('read_from_replica', default=None)
+
+
+@contextmanager
+def read_from_primary():
+    """
+    Reads of the block go to the default database, used by reads whose results are cached,
+    so lagging replicas don't get stale data cached as fresh
+    """
+    token = read_from_replica.set(None)
+    try:
+        yield
+    finally:
+        read_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Reads of safe-method requests (list and detail views) go to the replica chosen for the request,
+    writes and reads of other requests go to the default database.
+    Reads inside transactions of the default database stay on it, so they see own writes.
+    """
+    @staticmethod
+    def db_for_read(model, **hints):
+        if (replica := read_from_replica.get()) and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return replica
+        return DEFAULT_DB_ALIAS
+
+    @staticmethod
+    def db_for_write(model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    @staticmethod
+    def allow_relation(obj1, obj2, **hints):
+        return True
+
+    @staticmethod
+    def allow_migrate(db, app_label, model_name=None, **hints):
+        return db not in DATABASE_REPLICAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Chooses one random replica for reads of GET, HEAD and OPTIONS requests, so all reads of the request
+    see the same state. Works in sync and async (ASGI) chains.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def choose_replica(request):
+        return random.choice(DATABASE_REPLICAS) if DATABASE_REPLICAS and request.method in SAFE_METHODS else None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = read_from_replica.set(self.choose_replica(request))
+        try:
+            return self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+
+    async def __acall__(self, request):
+        token = read_from_replica.set(self.choose_replica(request))
+        try:
+            return await self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
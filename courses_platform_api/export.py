@@ -0,0 +1,67 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+class EchoBuffer:
+    def write(self, value):
+        return value
+
+
+class StreamingExportMixin:
+    """
+    List view in `?export=csv` or `?export=ndjson` mode streams all rows of the filtered queryset.
+    Rows are read by server-side cursor and serialized by chunks, so memory doesn't depend on count of rows.
+    View attribute `results_limit` limits count of exported rows.
+    """
+    export_query_param = 'export'
+    export_formats = {
+        'csv': 'text/csv',
+        'ndjson': 'application/x-ndjson',
+    }
+    export_chunk_size = 2000
+    export_filename = 'export'
+
+    def list(self, request, *args, **kwargs):
+        export_format = request.query_params.get(self.export_query_param)
+        if export_format in self.export_formats:
+            return self.export(export_format)
+        return super().list(request, *args, **kwargs)
+
+    def export(self, export_format):
+        queryset = self.filter_queryset(self.get_queryset())
+        if (results_limit := getattr(self, 'results_limit', None)) is not None:
+            queryset = queryset[:results_limit]
+        rows = self.export_rows(queryset)
+        content = self.csv_lines(rows) if export_format == 'csv' else self.ndjson_lines(rows)
+
+        response = StreamingHttpResponse(content, content_type=self.export_formats[export_format])
+        response['Content-Disposition'] = f'attachment; filename="{self.export_filename}.{export_format}"'
+        return response
+
+    def export_rows(self, queryset):
+        rows = queryset.iterator(chunk_size=self.export_chunk_size)
+        while chunk := list(islice(rows, self.export_chunk_size)):
+            yield from self.get_serializer(self.prepare_export_chunk(chunk), many=True).data
+
+    def prepare_export_chunk(self, rows):
+        return rows
+
+    def export_fields(self):
+        return [name for name, field in self.get_serializer().fields.items() if not field.write_only]
+
+    def csv_lines(self, rows):
+        fields = self.export_fields()
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(json.dumps(value, cls=DjangoJSONEncoder) if isinstance(value, (list, dict)) else value
+                                  for value in (row.get(field) for field in fields))
+
+    @staticmethod
+    def ndjson_lines(rows):
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
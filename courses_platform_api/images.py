@@ -1,12 +1,34 @@
-from imagekit import ImageSpec
-from imagekit.processors import TrimBorderColor, Adjust, ResizeToFit
+from io import BytesIO
 
-from courses_platform_api.settings import THUMB_SIZE
+from PIL import Image, ImageOps
+from pilkit.processors import ProcessorPipeline, TrimBorderColor, Adjust, ResizeToFit
+from pilkit.utils import img_to_fobj
 
+from courses_platform_api.settings import THUMB_SIZE, IMAGE_VARIANT_WIDTHS
 
-class ImageThumbnail(ImageSpec):
-    processors = [ResizeToFit(width=THUMB_SIZE, height=THUMB_SIZE),
-                  TrimBorderColor(),
-                  Adjust(contrast=1.1, sharpness=2.0)]
-    format = 'JPEG'
-    options = {'quality': 95}
+THUMBNAIL_PROCESSORS = [ResizeToFit(width=THUMB_SIZE, height=THUMB_SIZE),
+                        TrimBorderColor(),
+                        Adjust(contrast=1.1, sharpness=2.0)]
+
+
+def encode_image(image, format, **options):
+    return img_to_fobj(image, format, **options).read()
+
+
+def process_image(content):
+    """
+    Thumbnail and responsive variants of the image, runs in worker processes.
+    Returns {variant name: (extension, content)}
+    """
+    with Image.open(BytesIO(content)) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    variants = {
+        'thumbnail': ('jpg', encode_image(ProcessorPipeline(THUMBNAIL_PROCESSORS).process(image), 'JPEG', quality=95))
+    }
+    for width in IMAGE_VARIANT_WIDTHS:
+        resized = ResizeToFit(width=width, upscale=False).process(image)
+        variants[f'{width}.jpeg'] = ('jpg', encode_image(resized, 'JPEG', quality=85, optimize=True))
+        variants[f'{width}.webp'] = ('webp', encode_image(resized, 'WEBP', quality=80))
+    return variants
@@ -0,0 +1,97 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.http import FileResponse, HttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+from courses_platform_api.settings import MEDIA_SERVE
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """
+    Part of the file read by FileResponse, it has no fileno, so WSGI servers don't sendfile the whole file
+    """
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        data = self.file.read(self.remaining if size < 0 else min(size, self.remaining))
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class MediaMixin:
+    @staticmethod
+    def parse_range(header, size):
+        """
+        (start, end) of single range `bytes=start-end`, None for missing, invalid (start after end)
+        or multiple ranges (whole file is sent), ValueError for range starting after the end of the file
+        """
+        if not (match := RANGE_RE.match(header.strip())):
+            return None
+        start, end = match.groups()
+        if not start and not end:
+            return None
+        if not start:
+            start, end = max(size - int(end), 0), size - 1
+        elif end and int(start) > int(end):
+            return None
+        else:
+            start, end = int(start), min(int(end), size - 1) if end else size - 1
+        if start >= size:
+            raise ValueError('Unsatisfiable range')
+        return start, end
+
+    @classmethod
+    def serve(cls, request, storage, name, mode=None, filename=None):
+        """
+        Response with the file `name` of the storage, downloaded as `filename` of the row. Access is checked
+        by the view, then body is sent by: accel - nginx (X-Accel-Redirect to internal location),
+        sendfile - Apache (X-Sendfile), stream - FileResponse with support of Range requests.
+        """
+        mode = mode or MEDIA_SERVE['MODE']
+        filename = filename or os.path.basename(name)
+        if mode in ('accel', 'sendfile'):
+            response = HttpResponse(content_type=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+            if mode == 'accel':
+                response['X-Accel-Redirect'] = quote(MEDIA_SERVE['ACCEL_LOCATION'] + name)
+            else:
+                response['X-Sendfile'] = storage.path(name)
+            response['Content-Disposition'] = f"inline; filename*=utf-8''{quote(filename)}"
+            return response
+
+        size = storage.size(name)
+        last_modified = int(storage.get_modified_time(name).timestamp())
+        header = request.META.get('HTTP_RANGE', '')
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if if_range and parse_http_date_safe(if_range) != last_modified:
+            header = ''
+        try:
+            part = cls.parse_range(header, size) if header else None
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        content = storage.open(name, 'rb')
+        if part is None:
+            response = FileResponse(content, filename=filename)
+        else:
+            start, end = part
+            response = FileResponse(FileRange(content, start, end - start + 1), status=206, filename=filename)
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Accept-Ranges'] = 'bytes'
+        response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,232 @@
+import logging
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from threading import Lock
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, Http404
+
+from courses_platform_api.settings import REQUEST_METRICS, QUERY_BUDGETS
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+current_request = ContextVar('current_request_metrics', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestMetrics:
+    """
+    Counters of one request, filled by database execute wrapper and serializers of the response.
+    Atomic blocks outermost in the request take savepoints only inside transactions opened before it
+    (transaction of the test), in production they begin transactions without queries, so their savepoints
+    aren't counted.
+    """
+    SAVEPOINT_STATEMENTS = ('SAVEPOINT ', 'RELEASE SAVEPOINT ', 'ROLLBACK TO SAVEPOINT ')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        self.atomic_depths = {connection.alias: len(connection.atomic_blocks)
+                              for connection in connections.all(initialized_only=True)}
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context['connection']
+        if sql.startswith(self.SAVEPOINT_STATEMENTS) and \
+                len(connection.atomic_blocks) == self.atomic_depths.get(connection.alias, 0):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+class MetricsRegistry:
+    """
+    Aggregates of requests by resolved url name, kept in memory of the process
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.clear()
+
+    def clear(self):
+        self.views = defaultdict(lambda: {
+            'requests': defaultdict(int),
+            'queries': 0,
+            'db_time': 0.0,
+            'serializer_time': 0.0,
+            'latency_sum': 0.0,
+            'latency_buckets': [0] * len(LATENCY_BUCKETS),
+            'budget_exceeded': 0,
+        })
+
+    def record(self, view, method, status, metrics, latency, budget_exceeded):
+        with self.lock:
+            data = self.views[view]
+            data['requests'][(method, status)] += 1
+            data['queries'] += metrics.queries
+            data['db_time'] += metrics.db_time
+            data['serializer_time'] += metrics.serializer_time
+            data['latency_sum'] += latency
+            for i, bucket in enumerate(LATENCY_BUCKETS):
+                if latency <= bucket:
+                    data['latency_buckets'][i] += 1
+            data['budget_exceeded'] += budget_exceeded
+
+    def render(self):
+        """
+        Prometheus text exposition format
+        """
+        lines = [
+            '# HELP api_requests_total Count of requests by view, method and status.',
+            '# TYPE api_requests_total counter',
+            '# HELP api_request_duration_seconds Latency of requests by view.',
+            '# TYPE api_request_duration_seconds histogram',
+            '# HELP api_db_queries_total Count of SQL queries by view.',
+            '# TYPE api_db_queries_total counter',
+            '# HELP api_db_duration_seconds_total Time of SQL queries by view.',
+            '# TYPE api_db_duration_seconds_total counter',
+            '# HELP api_serializer_duration_seconds_total Time of serializing data of responses by view.',
+            '# TYPE api_serializer_duration_seconds_total counter',
+            '# HELP api_query_budget_exceeded_total Count of requests over query budget of the view.',
+            '# TYPE api_query_budget_exceeded_total counter',
+        ]
+        with self.lock:
+            for view, data in sorted(self.views.items()):
+                label = f'view="{view}"'
+                count = 0
+                for (method, status), requests in sorted(data['requests'].items()):
+                    count += requests
+                    lines.append(f'api_requests_total{{{label},method="{method}",status="{status}"}} {requests}')
+                for bucket, requests in zip(LATENCY_BUCKETS, data['latency_buckets']):
+                    lines.append(f'api_request_duration_seconds_bucket{{{label},le="{bucket}"}} {requests}')
+                lines.append(f'api_request_duration_seconds_bucket{{{label},le="+Inf"}} {count}')
+                lines.append(f'api_request_duration_seconds_sum{{{label}}} {data["latency_sum"]:.6f}')
+                lines.append(f'api_request_duration_seconds_count{{{label}}} {count}')
+                lines.append(f'api_db_queries_total{{{label}}} {data["queries"]}')
+                lines.append(f'api_db_duration_seconds_total{{{label}}} {data["db_time"]:.6f}')
+                lines.append(f'api_serializer_duration_seconds_total{{{label}}} {data["serializer_time"]:.6f}')
+                lines.append(f'api_query_budget_exceeded_total{{{label}}} {data["budget_exceeded"]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper of all connections, queries are added to metrics of the current request.
+    Context of the request is copied to threads of sync_to_async, so queries of async ORM are counted too.
+    """
+    if (metrics := current_request.get()) is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_recording(connection, **kwargs):
+    # the first position keeps it under wrappers of `connection.execute_wrapper()` blocks, which pop the last one
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records count and time of SQL queries, serializer time and latency of requests by resolved url name,
+    e.g. `v1.0:courses:course-list`. Requests over query budget of the view are logged,
+    in strict mode (enabled by the test runner) QueryBudgetExceeded is raised.
+    Middleware works in sync and async (ASGI) chains.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        connection_created.connect(install_query_recording, dispatch_uid='request_metrics')
+        for connection in connections.all(initialized_only=True):
+            install_query_recording(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not REQUEST_METRICS['ENABLED']:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.record(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not REQUEST_METRICS['ENABLED']:
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.record(request, response, metrics, time.perf_counter() - start)
+
+    @staticmethod
+    def record(request, response, metrics, latency):
+        view = request.resolver_match.view_name if request.resolver_match else 'unresolved'
+        budget = QUERY_BUDGETS.get(view)
+        budget_exceeded = budget is not None and metrics.queries > budget
+        registry.record(view, request.method, response.status_code, metrics, latency, budget_exceeded)
+
+        if budget_exceeded:
+            message = f'{request.method} {request.path} ({view}) ran {metrics.queries} queries, budget is {budget}'
+            if settings.QUERY_BUDGETS_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class SerializerTimingMixin:
+    """
+    Time of representation by the outermost serializer is added to metrics of the current request,
+    items of `many=True` serializers are timed one by one
+    """
+    def to_representation(self, instance):
+        metrics = current_request.get()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_time += time.perf_counter() - start
+            metrics.serializing = False
+
+
+def metrics_view(request):
+    """
+    Aggregates of the process in Prometheus text format, available with `Authorization: Bearer <TOKEN>`
+    """
+    if not REQUEST_METRICS['TOKEN']:
+        raise Http404
+    if request.headers.get('Authorization') != f"Bearer {REQUEST_METRICS['TOKEN']}":
+        return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
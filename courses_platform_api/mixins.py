@@ -1,22 +1,68 @@
-import os
-import random
-import string
+import secrets
 from datetime import date
 
+from django.db import IntegrityError, connections, router, transaction
+
 
 class GeneratorMixin:
+    slug_attempts = 5
+
     @staticmethod
-    def slug(pk, length=15):
-        chars = string.ascii_letters + "-" + string.digits
-        rnd = random.SystemRandom()
-        return ''.join(rnd.choice(chars) for _ in range(length)) + f"-{pk}"
+    def slugs(count, length=15):
+        """
+        Unique random slugs of letters, digits, '-' and '_'. All slugs are cut from one urandom buffer,
+        base64 alphabet has 64 chars, so every char takes 6 random bits without bias.
+        """
+        slugs = set()
+        while len(slugs) < count:
+            missing = count - len(slugs)
+            buffer = secrets.token_urlsafe(missing * length * 3 // 4 + 3)
+            slugs.update(buffer[i * length:(i + 1) * length] for i in range(missing))
+        return list(slugs)
+
+    @classmethod
+    def slug(cls, length=15):
+        return cls.slugs(1, length)[0]
+
+    @classmethod
+    def save_with_slug(cls, instance, save, using=None):
+        """
+        Saves new instance with a random slug, slug taken by another row is replaced and saving is retried.
+        Inside transactions every attempt takes a savepoint, so failed insert doesn't break the transaction.
+        """
+        using = using or router.db_for_write(type(instance), instance=instance)
+        manager = type(instance)._default_manager.db_manager(using)
+        for attempt in range(cls.slug_attempts):
+            instance.slug = cls.slug()
+            try:
+                if not connections[using].in_atomic_block:
+                    return save()
+                with transaction.atomic(using=using):
+                    return save()
+            except IntegrityError:
+                if attempt == cls.slug_attempts - 1 or not manager.filter(slug=instance.slug).exists():
+                    raise
 
 
 class ImageMixin:
     @staticmethod
     def remove(image):
-        if os.path.isfile(image.path):
-            os.remove(image.path)
+        image.storage.delete(image.name)
+
+    @staticmethod
+    def remove_variants(image, variants):
+        """
+        Variants without the image itself, the thumbnail is both the image and its variant
+        """
+        for name in set(variants.values()) - {image.name}:
+            image.storage.delete(name)
+
+    @staticmethod
+    def is_new_upload(image, saved):
+        """
+        Image is uploaded, when its name differs from the name loaded from the database
+        """
+        return bool(image) and image.name != saved
 
 
 class Datemixin:
@@ -0,0 +1,157 @@
+import json
+from collections import OrderedDict
+
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class CursorSerializer:
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'), cls=DjangoJSONEncoder).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination by ordering of the queryset (OrderingFilter or view ordering)
+    with unique tiebreaker field of the view `keyset_tiebreaker` (slug by default).
+    Page is selected by `WHERE (ordering fields) > (values of the last row)`, so every page costs the same.
+    Ordering fields can't be null. Cursors are signed, so position in results can't be changed by client.
+
+    Count of results depends on `count` query parameter:
+    exact - COUNT(*) of the queryset, approximate - planner estimate of rows, none - count is not calculated.
+    View attribute `results_limit` limits count of results of all pages.
+    """
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 1000
+    limit_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    default_count_mode = 'exact'
+    count_modes = ('exact', 'approximate', 'none')
+    invalid_cursor_message = 'Invalid cursor'
+    cursor_salt = 'keyset-pagination'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.results_limit = getattr(view, 'results_limit', None)
+        self.ordering = self.get_ordering(queryset, view)
+        self.count = self.get_count(queryset, request)
+
+        values, reverse, position = self.decode_cursor(request)
+        queryset = queryset.order_by(*(self.reverse_field(field) if reverse else field for field in self.ordering))
+        if values is not None:
+            queryset = queryset.filter(self.seek_filter(values, reverse))
+
+        limit = self.limit
+        if self.results_limit is not None and not reverse:
+            limit = max(min(limit, self.results_limit - position), 0)
+        results = list(queryset[:limit + 1]) if limit else []
+        has_more = len(results) > limit
+        results = results[:limit]
+
+        if reverse:
+            results.reverse()
+            self.position = position - len(results)
+            self.has_previous = has_more
+            self.has_next = values is not None
+        else:
+            self.position = position
+            self.has_previous = values is not None and position > 0
+            self.has_next = has_more and \
+                (self.results_limit is None or self.position + len(results) < self.results_limit)
+        self.results = results
+        return results
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_limit(self, request):
+        try:
+            return _positive_int(request.query_params[self.limit_query_param], strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    @staticmethod
+    def get_ordering(queryset, view):
+        ordering = list(queryset.query.order_by or getattr(view, 'ordering', None) or queryset.model._meta.ordering)
+        tiebreaker = getattr(view, 'keyset_tiebreaker', 'slug')
+        if tiebreaker not in map(lambda field: field.lstrip('-'), ordering):
+            ordering.append(tiebreaker)
+        return ordering
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param, self.default_count_mode)
+        if mode not in self.count_modes or mode == 'none':
+            return None
+        if mode == 'approximate' and connections[queryset.db].vendor == 'postgresql':
+            count = json.loads(queryset.order_by().explain(format='json'))[0]['Plan']['Plan Rows']
+        else:
+            count = queryset.order_by().count()
+        return min(count, self.results_limit) if self.results_limit is not None else count
+
+    @staticmethod
+    def reverse_field(field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+    def seek_filter(self, values, reverse):
+        """
+        (a, b) > (x, y) is a > x or (a = x and b > y), descending fields compare with less than
+        """
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        condition, equal = Q(), Q()
+        for field, value in zip(self.ordering, values):
+            descending = field.startswith('-') != reverse
+            name = field.lstrip('-')
+            condition |= equal & Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def row_values(self, row):
+        fields = [field.lstrip('-') for field in self.ordering]
+        if isinstance(row, dict):
+            return [row[field] for field in fields]
+        return [getattr(row, field) for field in fields]
+
+    def encode_cursor(self, values, reverse, position):
+        cursor = signing.dumps({'v': values, 'r': reverse, 'p': position}, salt=self.cursor_salt,
+                               serializer=CursorSerializer)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        if not (cursor := request.query_params.get(self.cursor_query_param)):
+            return None, False, 0
+        try:
+            data = signing.loads(cursor, salt=self.cursor_salt, serializer=CursorSerializer)
+            return list(data['v']), bool(data['r']), int(data['p'])
+        except (signing.BadSignature, TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.results:
+            return None
+        return self.encode_cursor(self.row_values(self.results[-1]), False, self.position + len(self.results))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.results or self.position == 0:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.row_values(self.results[0]), True, self.position)
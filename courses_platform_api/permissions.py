@@ -2,9 +2,10 @@ from django.contrib.auth import get_user_model
 
 from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 
-from courses.models import Course, Permission
+from courses.mixins import CourseMixin
 from courses_platform_api.choices_types import ProfileRoles
 from lessons.models import Lesson
+from users.models import Lead
 
 User = get_user_model()
 
@@ -34,6 +35,12 @@ class IsSuperuserOrAdministratorOrCurator(IsAuthenticated):
         ))
 
 
+class IsCurator(IsAuthenticated):
+    def has_permission(self, request, view):
+        perm = super().has_permission(request, view)
+        return bool(perm and request.user.role == ProfileRoles.CURATOR)
+
+
 class IsSuperuserOrOwner(IsAuthenticated):
     def has_permission(self, request, view):
         perm = super().has_permission(request, view)
@@ -42,14 +49,14 @@ class IsSuperuserOrOwner(IsAuthenticated):
         return bool(perm and (
                 request.user.role == ProfileRoles.SUPERUSER or
                 (request.user.role == ProfileRoles.ADMINISTRATOR and
-                 Course.objects.filter(slug=slug, admin=request.user).exists())
+                 CourseMixin.get_course(request, slug).admin_id == request.user.pk)
         ))
 
     def has_object_permission(self, request, view, obj):
         perm = super().has_permission(request, view)
         return bool(perm and (
                 request.user.role == ProfileRoles.SUPERUSER or
-                (request.user.role == ProfileRoles.ADMINISTRATOR and obj.admin == request.user)
+                (request.user.role == ProfileRoles.ADMINISTRATOR and obj.admin_id == request.user.pk)
         ))
 
 
@@ -67,7 +74,7 @@ class IsSuperuserAllOrAdministratorActiveCoursesAllOrCuratorActiveCoursesReadOnl
         perm = super().has_permission(request, view)
         return bool(perm and (
                 request.user.role == ProfileRoles.SUPERUSER or
-                (request.user.role == ProfileRoles.ADMINISTRATOR and obj.admin == request.user and obj.is_active) or
+                (request.user.role == ProfileRoles.ADMINISTRATOR and obj.admin_id == request.user.pk and obj.is_active) or
                 (request.user.role == ProfileRoles.CURATOR and request.method in SAFE_METHODS and obj.is_active)
         ))
 
@@ -79,8 +86,7 @@ class IsSuperuserAllOrOwnerAllOrCuratorActiveCoursesReadOnlyLearnerReadOnly(IsAu
         For list of lessons we use has_object_permission
         """
         if 'slug' in view.kwargs:
-            slug = view.kwargs['slug']
-            course = Course.objects.get(slug=slug)
+            course = CourseMixin.get_course(request, view.kwargs['slug'])
             return self.has_object_permission(request, view, course)
 
         perm = super().has_permission(request, view)
@@ -94,7 +100,7 @@ class IsSuperuserAllOrOwnerAllOrCuratorActiveCoursesReadOnlyLearnerReadOnly(IsAu
 
         return bool(perm and (
                 request.user.role == ProfileRoles.SUPERUSER or
-                (request.user.role == ProfileRoles.ADMINISTRATOR and obj.admin == request.user and obj.is_active) or
+                (request.user.role == ProfileRoles.ADMINISTRATOR and obj.admin_id == request.user.pk and obj.is_active) or
                 (request.user.role in (ProfileRoles.LEARNER, ProfileRoles.CURATOR) and request.method in SAFE_METHODS
                  and obj.is_active)
         ))
@@ -117,16 +123,14 @@ class LessonPermission(IsAuthenticated):
     def has_object_permission(self, request, view, obj):
         perm = super().has_permission(request, view)
         role = request.user.role
-        slug = view.kwargs['slug']
-        course = Course.objects.get(slug=slug)
+        course = CourseMixin.get_course(request, view.kwargs['slug'])
 
         if role == ProfileRoles.LEARNER:
-            course_permission = Permission.objects.filter(course=course, user=request.user, access=True).exists()
-            learner_access = course_permission or obj['free_access']
+            learner_access = course.learner_access or obj['free_access']
 
         return bool(perm and (
                 role == ProfileRoles.SUPERUSER or
-                (role == ProfileRoles.ADMINISTRATOR and course.admin == request.user and course.is_active) or
+                (role == ProfileRoles.ADMINISTRATOR and course.admin_id == request.user.pk and course.is_active) or
                 (role == ProfileRoles.CURATOR and request.method in SAFE_METHODS and course.is_active) or
                 (role == ProfileRoles.LEARNER and request.method in SAFE_METHODS and learner_access)
         ))
@@ -137,11 +141,26 @@ class IsLearnerAll(IsAuthenticated):
         perm = super().has_permission(request, view)
         if request.user:
             role = request.user.role
-            slug = view.kwargs['slug']
-            course = Course.objects.get(slug=slug)
             if role == ProfileRoles.LEARNER:
-                lesson = Lesson.objects.values('free_access').get(pk=view.kwargs['pk'])
-                course_permission = Permission.objects.filter(course=course, user=request.user, access=True).exists()
-                learner_access = course_permission or lesson['free_access']
+                course = CourseMixin.get_course(request, view.kwargs['slug'])
+                learner_access = course.learner_access or \
+                    Lesson.objects.values('free_access').get(pk=view.kwargs['pk'])['free_access']
 
         return bool(perm and role == ProfileRoles.LEARNER and learner_access)
+
+
+class TaskImagePermission(IsAuthenticated):
+    """
+    Image of home task is available to its learner, superuser, administrator of the course
+    and curators led by this administrator
+    """
+    def has_object_permission(self, request, view, obj):
+        perm = super().has_permission(request, view)
+        role, pk = request.user.role, request.user.pk
+        admin = obj.task.lesson.course.admin_id
+        return bool(perm and (
+                role == ProfileRoles.SUPERUSER or
+                (role == ProfileRoles.LEARNER and obj.task.user_id == pk) or
+                (role == ProfileRoles.ADMINISTRATOR and admin == pk) or
+                (role == ProfileRoles.CURATOR and Lead.objects.filter(user_id=pk, lead_id=admin).exists())
+        ))
@@ -1,7 +1,7 @@
 from datetime import timedelta
 from pathlib import Path
 
-from decouple import config
+from decouple import config, Csv
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -28,6 +28,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'courses_platform_api.metrics.RequestMetricsMiddleware',
+    'courses_platform_api.db.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -60,19 +62,45 @@ TEMPLATES = [
 WSGI_APPLICATION = 'courses_platform_api.wsgi.application'
 
 
+# Connection pool of the process shares connections between threads (ASGI), connections are returned to it
+# after every request. Without the pool connections of threads are kept for DB_CONN_MAX_AGE seconds.
+DB_POOL = {
+    'ENABLED': config('DB_POOL_ENABLED', default=False, cast=bool),
+    'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+    'MAX_LIFETIME': config('DB_POOL_MAX_LIFETIME', default=1800, cast=int),
+    'HEALTH_CHECK_AFTER': 30,
+    'TIMEOUT': 10,
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'courses_platform_api.db.postgresql_pool' if DB_POOL['ENABLED'] else 'django.db.backends.postgresql',
         'NAME': config('DB_NAME', default=''),
         'USER': config('DB_USER_NAME', default=''),
         'PASSWORD': config('DB_PASSWORD', default=''),
         'HOST': config('DB_HOST', default='db'),
         'PORT': config('DB_PORT', default=''),
+        'CONN_MAX_AGE': 0 if DB_POOL['ENABLED'] else config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': DB_POOL,
     }
 }
 
+# Read replicas of the default database, reads of GET requests are sent to them
+for number, host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), 1):
+    DATABASES[f'replica{number}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['courses_platform_api.db.routers.ReplicaRouter']
+
 AUTH_USER_MODEL = "users.User"
 
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -122,6 +150,14 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 EMAIL_PORT = 587
 
+# Outbox of emails, which are sent by `./manage.py send_emails`
+EMAIL_OUTBOX = {
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 60,
+    'POLL_INTERVAL': 5,
+}
+
 FRONT_END_DOMAIN_URL = config('FRONT_END_DOMAIN_URL', default='')
 FRONT_END_NEW_PASSWORD_PART = config('FRONT_END_NEW_PASSWORD_PART', default='')
 FRONT_END_NEW_PASSWORD_URL = f'{FRONT_END_DOMAIN_URL}{FRONT_END_NEW_PASSWORD_PART}'
@@ -137,11 +173,12 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rest_framework_simplejwt.authentication.JWTStatelessUserAuthentication',
     ),
 }
 
 SIMPLE_JWT = {
+    # Access tokens are stateless, deleted users keep access until they expire
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
@@ -163,7 +200,7 @@ SIMPLE_JWT = {
 
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
-    'TOKEN_USER_CLASS': 'rest_framework_simplejwt.models.TokenUser',
+    'TOKEN_USER_CLASS': 'users.authentication.TokenClaimsUser',
 
     'JTI_CLAIM': 'jti',
 
@@ -173,5 +210,84 @@ SIMPLE_JWT = {
 }
 
 THUMB_SIZE = 800
+IMAGE_VARIANT_WIDTHS = [320, 640, 1280]
+
+# Uploaded images are processed by `./manage.py process_images`
+IMAGE_PROCESSING = {
+    'WORKERS': 2,
+    'BATCH_SIZE': 20,
+    'POLL_INTERVAL': 5,
+}
+
+# Learner access decisions, CACHE_ALIAS of CACHES shares them between processes, empty - only local cache
+COURSE_ACCESS_CACHE = {
+    'CACHE_ALIAS': config('COURSE_ACCESS_CACHE_ALIAS', default=''),
+    'MAX_SIZE': 10000,
+    'TIMEOUT': 30,
+    'SHARED_TIMEOUT': 300,
+}
+
+# Chunked uploads of materials and covers, parts are written to DIR until the upload is completed
+UPLOADS = {
+    'DIR': config('UPLOADS_DIR', default=str(BASE_DIR / 'uploads')),
+    'MAX_SIZE': 5 * 1024 * 1024,
+    'CHUNK_SIZE': 1024 * 1024,
+    'EXPIRE_AFTER': timedelta(days=1),
+}
+
+# Uploaded files are stored once per SHA-256 digest of content in DIR, blobs without references are removed
+# by `clean_media` after ORPHANS_EXPIRE_AFTER
+DEFAULT_FILE_STORAGE = 'courses_platform_api.storage.ContentAddressedStorage'
+MEDIA_BLOBS = {
+    'DIR': 'media/blobs',
+    'ORPHANS_EXPIRE_AFTER': timedelta(days=1),
+}
+
+# Protected media (materials, homework images): stream - by Django with Range requests,
+# accel - by nginx with X-Accel-Redirect to internal ACCEL_LOCATION, sendfile - by Apache mod_xsendfile
+MEDIA_SERVE = {
+    'MODE': config('MEDIA_SERVE_MODE', default='stream'),
+    'ACCEL_LOCATION': config('MEDIA_ACCEL_LOCATION', default='/protected/'),
+}
+
+# Responses of courses catalog, invalidated by version counters
+CATALOG_CACHE = {
+    'CACHE_ALIAS': config('CATALOG_CACHE_ALIAS', default='default'),
+    'TIMEOUT': 300,
+}
+
+# Metrics of requests by view, `/metrics/` endpoint is available only with METRICS_TOKEN
+REQUEST_METRICS = {
+    'ENABLED': config('REQUEST_METRICS_ENABLED', default=True, cast=bool),
+    'TOKEN': config('METRICS_TOKEN', default=''),
+}
+
+# Maximum count of SQL queries of one request by url name, strict mode raises error instead of warning
+QUERY_BUDGETS = {
+    'v1.0:token_obtain_pair': 3,
+    'v1.0:users:user-list': 6,
+    'v1.0:courses:course-list': 5,
+    'v1.0:courses:course-detail': 8,
+    'v1.0:courses:course-clone': 14,
+    'v1.0:courses:course-learner-list': 4,
+    'v1.0:courses:course-learner-bulk': 8,
+    'v1.0:courses:subscribe-to-course': 6,
+    'v1.0:courses:lessons:lesson-list': 5,
+    'v1.0:courses:lessons:lesson-detail': 4,
+    'v1.0:courses:lessons:lesson-test-detail': 13,
+    'v1.0:courses:lessons:lesson-test-import': 13,
+    'v1.0:courses:lessons:lesson-test-result': 8,
+    'v1.0:courses:lessons:lesson-bundle': 9,
+    'v1.0:tasks:task-list': 4,
+    'v1.0:tasks:task-claim': 6,
+    'v1.0:tasks:task-review': 6,
+}
+QUERY_BUDGETS_STRICT = config('QUERY_BUDGETS_STRICT', default=False, cast=bool)
+
+# Tests run in strict mode of query budgets
+TEST_RUNNER = 'courses_platform_api.test_runner.StrictQueryBudgetsRunner'
+
+# Async views of read-heavy endpoints serve GET requests, enable when the project is served by ASGI server
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
 
 CORS_ORIGIN_ALLOW_ALL = True
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, timezone as datetime_timezone
+
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from courses.models import MediaBlob
+from courses_platform_api.settings import MEDIA_BLOBS
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage keeping one file per SHA-256 digest of content as `<DIR>/<ab>/<digest><.ext>`,
+    names of uploads are kept by rows referencing the file. Every save of a file adds a reference to its
+    MediaBlob, every delete releases one, files of blobs without references are removed by `clean_media`.
+    Files saved before blobs aren't counted and are deleted directly.
+    """
+    @staticmethod
+    def digest(content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def get_available_name(self, name, max_length=None):
+        # Same name is the same content, the name of the blob is chosen in _save
+        return name
+
+    def _save(self, name, content):
+        digest = self.digest(content)
+        name = f"{MEDIA_BLOBS['DIR']}/{digest[:2]}/{digest}{os.path.splitext(name)[1].lower()}"
+        table = MediaBlob._meta.db_table
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} (digest, name, size, reference_count, updated) VALUES (%s, %s, %s, 1, %s) '
+                    f'ON CONFLICT (digest) DO UPDATE SET reference_count = {table}.reference_count + 1, '
+                    f'updated = EXCLUDED.updated RETURNING name',
+                    [digest, name, content.size, timezone.now()]
+                )
+                name = cursor.fetchone()[0]
+            # Row of the blob is locked until commit, so the sweep can't remove the file being written
+            if not self.exists(name):
+                temporary = super()._save(f"{MEDIA_BLOBS['DIR']}/tmp/{uuid.uuid4().hex}", content)
+                os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+                os.replace(self.path(temporary), self.path(name))
+        return name
+
+    def add_references(self, counts):
+        """
+        Adds counts of references to blobs by one query, returns names of the blobs
+        """
+        table = MediaBlob._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET reference_count = {table}.reference_count + copies.count, updated = %s '
+                f'FROM (VALUES {", ".join(["(%s, %s)"] * len(counts))}) AS copies (name, count) '
+                f'WHERE {table}.name = copies.name RETURNING {table}.name',
+                [timezone.now(), *[value for item in counts.items() for value in item]]
+            )
+            return {name for name, in cursor.fetchall()}
+
+    def reference(self, names):
+        """
+        References of rows copied with their files, bytes of blobs aren't copied.
+        Files saved before blobs are saved again as blobs. Returns new names by names of the files.
+        """
+        counts = Counter(name for name in names if name)
+        if not counts:
+            return {}
+        renamed = {name: name for name in self.add_references(counts)}
+        extra = Counter()
+        for name in counts.keys() - renamed.keys():
+            if not self.exists(name):
+                renamed[name] = name
+                continue
+            with self.open(name, 'rb') as file:
+                renamed[name] = self.save(os.path.basename(name), file)
+            if counts[name] > 1:
+                extra[renamed[name]] += counts[name] - 1
+        if extra:
+            self.add_references(extra)
+        return renamed
+
+    def delete(self, name):
+        if not MediaBlob.objects.filter(name=name).update(
+                reference_count=Greatest(F('reference_count') - 1, 0), updated=timezone.now()):
+            super().delete(name)
+
+    def blob_files(self):
+        """
+        Files of the blobs directory: (name, digest, size, modified time), digest is None for parts
+        of interrupted writes. Blobs saved with filenames are `<DIR>/<ab>/<digest>/<filename>`.
+        """
+        for directory, _, files in os.walk(self.path(MEDIA_BLOBS['DIR'])):
+            for file in files:
+                path = os.path.join(directory, file)
+                name = os.path.relpath(path, self.location).replace(os.sep, '/')
+                parts = name[len(MEDIA_BLOBS['DIR']) + 1:].split('/')
+                if len(parts) == 2 and parts[0] != 'tmp':
+                    digest = os.path.splitext(parts[1])[0]
+                else:
+                    digest = parts[1] if len(parts) == 3 else None
+                stat = os.stat(path)
+                yield name, digest, stat.st_size, datetime.fromtimestamp(stat.st_mtime, datetime_timezone.utc)
+
+    def remove_blob(self, name):
+        """
+        Removes the file of the blob with its digest directory, called by the sweep for orphans
+        """
+        super().delete(name)
+        try:
+            os.rmdir(os.path.dirname(self.path(name)))
+        except OSError:
+            pass
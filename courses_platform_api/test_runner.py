@@ -0,0 +1,16 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class StrictQueryBudgetsRunner(DiscoverRunner):
+    """
+    Requests over query budgets of their views fail tests instead of being logged
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.strict_budgets = override_settings(QUERY_BUDGETS_STRICT=True)
+        self.strict_budgets.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.strict_budgets.disable()
+        super().teardown_test_environment(**kwargs)
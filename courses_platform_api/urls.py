@@ -15,17 +15,21 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework_simplejwt.views import TokenRefreshView
-from users.views import EmailTokenObtainPairView
+
+from courses_platform_api.metrics import metrics_view
+from users.views import EmailTokenObtainPairView, ActiveUserTokenRefreshView
 
 v1_0_patterns = [
     path('token/', EmailTokenObtainPairView.as_view(), name="token_obtain_pair"),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', ActiveUserTokenRefreshView.as_view(), name='token_refresh'),
     path('users/', include('users.urls')),
     path('courses/', include('courses.urls')),
+    path('tasks/', include('lessons.task_urls')),
+    path('uploads/', include('lessons.upload_urls')),
 ]
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1.0/', include((v1_0_patterns, 'v1.0'), namespace='v1.0')),
+    path('metrics/', metrics_view, name='metrics'),
 ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.1.3 on 2026-10-18 13:00
+
+import django.core.validators
+from django.db import migrations, models
+import lessons.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagetask',
+            name='image_status',
+            field=models.IntegerField(blank=True, choices=[(1, 'Processing'), (2, 'Ready'), (3, 'Failed')], null=True, verbose_name='image status'),
+        ),
+        migrations.AddField(
+            model_name='imagetask',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, verbose_name='image variants'),
+        ),
+        migrations.AlterField(
+            model_name='imagetask',
+            name='image',
+            field=models.ImageField(upload_to=lessons.models.ImageTask.file_path, validators=[django.core.validators.FileExtensionValidator(['jpg', 'png', 'jpeg'])]),
+        ),
+    ]
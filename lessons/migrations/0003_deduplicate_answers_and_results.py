@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# Answers of the same option are equal, duplicate results keep the latest one
+DELETE_DUPLICATES = {
+    'answers': """
+        DELETE FROM lessons_answer answer USING (
+            SELECT id, row_number() OVER (PARTITION BY user_id, answer_id ORDER BY id) AS number
+            FROM lessons_answer
+        ) duplicate
+        WHERE answer.id = duplicate.id AND duplicate.number > 1
+    """,
+    'results': """
+        DELETE FROM lessons_result result USING (
+            SELECT id, row_number() OVER (PARTITION BY lesson_id, user_id ORDER BY date DESC, id DESC) AS number
+            FROM lessons_result
+        ) duplicate
+        WHERE result.id = duplicate.id AND duplicate.number > 1
+    """,
+}
+
+
+def delete_duplicates(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for name, sql in DELETE_DUPLICATES.items():
+            cursor.execute(sql)
+            if cursor.rowcount:
+                print(f'\n  Deleted {cursor.rowcount} duplicate {name}', end='')
+
+
+class Migration(migrations.Migration):
+    """
+    Duplicates are deleted before unique constraints of answers and results are added.
+    Deleted rows can't be restored, reverse migration keeps remaining rows.
+    """
+    dependencies = [
+        ('lessons', '0002_imagetask_image_processing'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.1.3 on 2026-10-18 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0003_deduplicate_answers_and_results'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['course', 'sort'], name='lesson_course_sort_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='answer',
+            constraint=models.UniqueConstraint(fields=('user', 'answer'), name='unique_answer'),
+        ),
+        migrations.AddConstraint(
+            model_name='result',
+            constraint=models.UniqueConstraint(fields=('lesson', 'user'), name='unique_result'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.3 on 2026-10-18 14:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'curator'], name='task_status_curator_idx'),
+        ),
+    ]
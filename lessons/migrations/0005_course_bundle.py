@@ -0,0 +1,32 @@
+# Generated by Django 4.1.3 on 2026-10-18 14:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_course_progress'),
+        ('lessons', '0004_task_queue_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseBundle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variant', models.CharField(choices=[('full', 'With correct options'), ('learner', 'Without correct options'), ('preview', 'Content only of free lessons')], max_length=10, verbose_name='readers')),
+                ('changes', models.IntegerField(default=0, verbose_name='changes of content')),
+                ('built', models.IntegerField(blank=True, null=True, verbose_name='changes of built content')),
+                ('version', models.IntegerField(default=0, verbose_name='version')),
+                ('etag', models.CharField(blank=True, max_length=66, verbose_name='ETag')),
+                ('content', models.TextField(blank=True, verbose_name='rendered JSON')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bundles', to='courses.course')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='coursebundle',
+            constraint=models.UniqueConstraint(fields=('course', 'variant'), name='unique_course_bundle'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.3 on 2026-10-18 15:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_course_progress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('lessons', '0005_course_bundle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('target', models.CharField(choices=[('material', 'Material of the lesson'), ('cover', 'Cover of the course')], max_length=10, verbose_name='target')),
+                ('filename', models.CharField(max_length=100, verbose_name='file name')),
+                ('size', models.PositiveIntegerField(verbose_name='file size')),
+                ('received', models.PositiveIntegerField(default=0, verbose_name='received bytes')),
+                ('sha256', models.CharField(blank=True, max_length=64, verbose_name='SHA-256 of the file')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='courses.course')),
+                ('lesson', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='lessons.lesson')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.1.3 on 2026-10-18 15:38
+
+import django.core.validators
+from django.db import migrations, models
+import lessons.models
+import users.validators
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0006_upload_session'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='imagetask',
+            name='image',
+            field=models.ImageField(max_length=255, upload_to=lessons.models.ImageTask.file_path, validators=[django.core.validators.FileExtensionValidator(['jpg', 'png', 'jpeg'])]),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='file',
+            field=models.FileField(max_length=255, upload_to=lessons.models.Material.file_path, validators=[django.core.validators.FileExtensionValidator(['jpg', 'png', 'jpeg', 'pdf']), users.validators.validate_size]),
+        ),
+    ]
@@ -0,0 +1,30 @@
+import os
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_filenames(apps, schema_editor):
+    Material = apps.get_model('lessons', 'Material')
+    materials = list(Material.objects.only('id', 'file'))
+    for material in materials:
+        material.filename = os.path.basename(material.file.name)
+    Material.objects.bulk_update(materials, ['filename'], batch_size=1000)
+    # Bundles show names of materials
+    apps.get_model('lessons', 'CourseBundle').objects.update(changes=F('changes') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0007_file_max_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='filename',
+            field=models.CharField(blank=True, max_length=255, verbose_name='file name'),
+        ),
+        migrations.RunPython(fill_filenames, migrations.RunPython.noop),
+    ]
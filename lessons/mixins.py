@@ -0,0 +1,314 @@
+import hashlib
+import os
+from collections import defaultdict
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, Q, Case, When, Value, F, IntegerField, Sum, Prefetch
+from django.db.models.functions import Concat
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from courses_platform_api.choices_types import TaskStatus, ProfileRoles, ImageStatus
+from courses_platform_api.db.routers import read_from_primary
+from courses_platform_api.mixins import ImageMixin
+from courses_platform_api.settings import UPLOADS
+from lessons.models import Lesson, Material, Question, Option, Answer, Result, Task, ImageTask, CourseBundle, \
+    UploadSession
+from users.models import Lead
+
+
+class TestMixin:
+    @staticmethod
+    def save_answers(user, pk, answers):
+        """
+        Save learner answers with one select and one bulk insert.
+        Options that do not belong to the lesson test or are already answered are skipped.
+        """
+        options = Option.objects.values_list('id', flat=True).\
+            filter(question__lesson_id=pk, id__in=answers).exclude(answers__user_id=user)
+        Answer.objects.bulk_create([Answer(user_id=user, answer_id=option) for option in options], ignore_conflicts=True)
+
+    @staticmethod
+    def create_questions(lesson, questions):
+        """
+        Questions of the lesson test with their options are saved by two bulk inserts,
+        bulk queries don't send model signals, so bundles of the course are invalidated here
+        """
+        created = Question.objects.bulk_create([Question(lesson_id=lesson, question=data['question'])
+                                                for data in questions])
+        Option.objects.bulk_create([
+            Option(question=question, option=option['option'], correct=option.get('correct', False))
+            for question, data in zip(created, questions) for option in data['options']
+        ], batch_size=1000)
+        CourseBundleMixin.invalidate_on_commit(Lesson.objects.values('course_id').filter(pk=lesson))
+        return created
+
+    @staticmethod
+    def update_options(question, options):
+        """
+        Options with id are updated by one bulk update, options without id are created by one bulk insert,
+        options of the question missing from the list are deleted
+        """
+        updated = [Option(id=option['id'], question=question, option=option['option'],
+                          correct=option.get('correct', False)) for option in options if option.get('id')]
+        created = [Option(question=question, option=option['option'], correct=option.get('correct', False))
+                   for option in options if not option.get('id')]
+        Option.objects.filter(question=question).exclude(id__in=[option.id for option in updated]).delete()
+        Option.objects.bulk_update(updated, ['option', 'correct'], batch_size=1000)
+        Option.objects.bulk_create(created, batch_size=1000)
+        CourseBundleMixin.invalidate_on_commit(Lesson.objects.values('course_id').filter(pk=question.lesson_id))
+
+    @staticmethod
+    def check_test(user, pk):
+        """
+        Question is right, when learner chose all correct options of it.
+        Whole lesson test is graded by one aggregate query.
+        """
+        questions = Question.objects.filter(lesson_id=pk).annotate(
+            correct_options=Count('options', filter=Q(options__correct=True), distinct=True),
+            right_answers=Count('options', distinct=True,
+                                filter=Q(options__correct=True, options__answers__user_id=user))
+        ).annotate(
+            is_right=Case(When(correct_options__gt=0, correct_options=F('right_answers'), then=Value(1)),
+                          default=Value(0), output_field=IntegerField())
+        ).aggregate(total=Count('id'), right=Sum('is_right'))
+
+        result = int(questions['right'] / questions['total'] * 100) if questions['total'] else 0
+        Result.objects.create(lesson_id=pk, user_id=user, result=result)
+        return result
+
+
+class TaskQueueMixin:
+    @staticmethod
+    def queue(curator):
+        """
+        Home tasks on review of active courses, whose administrators lead the curator, oldest first.
+        Images of tasks of the page are loaded by one prefetch query.
+        """
+        admins = Lead.objects.values_list('lead_id').filter(user_id=curator)
+        return Task.objects.select_related('lesson__course').\
+            annotate(full_name=Concat('user__first_name', Value(' '), 'user__last_name'), user_slug=F('user__slug')).\
+            prefetch_related(Prefetch('images', queryset=ImageTask.objects.order_by('id'))).\
+            filter(status=TaskStatus.REVIEW, lesson__course__admin_id__in=admins, lesson__course__is_active=True).\
+            order_by('id')
+
+    @classmethod
+    def claim(cls, curator, count):
+        """
+        Assigns up to count oldest unclaimed tasks of the queue to the curator.
+        Rows locked by claims of other curators are skipped, so concurrent claims never get the same task.
+        """
+        with transaction.atomic():
+            tasks = list(cls.queue(curator).filter(curator__isnull=True).values_list('id', flat=True).
+                         select_for_update(skip_locked=True, of=('self', ))[:count])
+            Task.objects.filter(id__in=tasks).update(curator_id=curator)
+        return cls.queue(curator).filter(id__in=tasks)
+
+
+class CourseBundleMixin:
+    LESSON_FIELDS = ('id', 'sort', 'name', 'description', 'free_access', 'video', 'text', 'home_task', 'test')
+    PREVIEW_FIELDS = ('id', 'sort', 'name', 'description', 'free_access')
+
+    @staticmethod
+    def variant(request, course):
+        if request.user.role == ProfileRoles.LEARNER:
+            return CourseBundle.LEARNER if course.learner_access else CourseBundle.PREVIEW
+        return CourseBundle.FULL
+
+    @staticmethod
+    def invalidate(courses):
+        CourseBundle.objects.filter(course_id__in=courses).update(changes=F('changes') + 1)
+
+    @classmethod
+    def invalidate_on_commit(cls, courses):
+        """
+        Marks bundles as changed after commit, so bundles built before the commit aren't stored as fresh.
+        `courses` are ids or a query of ids evaluated on commit.
+        """
+        transaction.on_commit(lambda: cls.invalidate(courses))
+
+    @classmethod
+    def get(cls, course, variant):
+        """
+        Fresh bundle is read by one query, stale one is built by four queries and saved,
+        unless content changed again while it was built. Returns (etag, content).
+        Bundles are read and built from the primary database, so ETags never name content of lagging replicas.
+        """
+        with read_from_primary():
+            return cls.read(course, variant)
+
+    @classmethod
+    def read(cls, course, variant):
+        bundle = CourseBundle.objects.values('changes', 'built', 'etag', 'content', 'version').\
+            filter(course=course, variant=variant).first()
+        if bundle is None:
+            CourseBundle.objects.bulk_create([CourseBundle(course=course, variant=name) for name, _ in
+                                              CourseBundle.VARIANTS], ignore_conflicts=True)
+            bundle = {'changes': 0, 'built': None, 'version': 0}
+        if bundle['built'] == bundle['changes']:
+            return bundle['etag'], bundle['content']
+
+        version = bundle['version'] + 1
+        content = JSONRenderer().render(cls.build(course, variant, version)).decode()
+        etag = '"%s"' % hashlib.sha256(content.encode()).hexdigest()[:32]
+        CourseBundle.objects.filter(course=course, variant=variant, changes=bundle['changes']).\
+            update(built=bundle['changes'], version=version, etag=etag, content=content)
+        return etag, content
+
+    @classmethod
+    def build(cls, course, variant, version):
+        """
+        Lessons in the order of the lessons list with their materials and questions,
+        learners don't get correct options, preview has content only of free lessons
+        """
+        lessons = list(Lesson.objects.values(*cls.LESSON_FIELDS).filter(course=course).order_by('sort', 'id'))
+        ids = {lesson['id'] for lesson in lessons if variant != CourseBundle.PREVIEW or lesson['free_access']}
+        materials, questions, options = defaultdict(list), defaultdict(list), defaultdict(list)
+        for material in Material.objects.values('id', 'lesson_id', 'filename').filter(lesson_id__in=ids).\
+                order_by('id'):
+            url = reverse('v1.0:courses:lessons:material-download',
+                          args=[course.slug, material['lesson_id'], material['id']])
+            materials[material['lesson_id']].append({'id': material['id'], 'file': material['filename'], 'url': url})
+        option_fields = ('id', 'question_id', 'option') + (('correct', ) if variant == CourseBundle.FULL else ())
+        for option in Option.objects.values(*option_fields).filter(question__lesson_id__in=ids).order_by('id'):
+            options[option.pop('question_id')].append(option)
+        for question in Question.objects.values('id', 'lesson_id', 'question').filter(lesson_id__in=ids).\
+                order_by('id'):
+            questions[question.pop('lesson_id')].append({**question, 'options': options[question['id']]})
+
+        content = []
+        for lesson in lessons:
+            if lesson['id'] not in ids:
+                content.append({field: lesson[field] for field in cls.PREVIEW_FIELDS})
+                continue
+            content.append({**lesson, 'materials': materials[lesson['id']], 'questions': questions[lesson['id']]})
+        return {'course': course.slug, 'version': version, 'lessons': content}
+
+
+class UploadedPartsFile(File):
+    """
+    Completed upload, FileSystemStorage moves it to the upload path of the field instead of copying
+    """
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class UploadMixin:
+    BLOCK_SIZE = 64 * 1024
+
+    @staticmethod
+    def start(session):
+        os.makedirs(UPLOADS['DIR'], exist_ok=True)
+        open(session.path, 'wb').close()
+
+    @classmethod
+    def write_chunk(cls, session, stream, length, checksum=None):
+        """
+        Streams the chunk from the request body to the end of received part, body isn't buffered in memory.
+        Chunk with wrong SHA-256 `checksum` is cut off. Returns False when checksum doesn't match.
+        """
+        digest = hashlib.sha256()
+        with open(session.path, 'r+b') as part:
+            part.seek(session.received)
+            remaining = length
+            while remaining > 0 and (block := stream.read(min(cls.BLOCK_SIZE, remaining))):
+                digest.update(block)
+                part.write(block)
+                remaining -= len(block)
+            matched = not checksum or digest.hexdigest() == checksum.lower()
+            written = length - remaining if matched else 0
+            part.truncate(session.received + written)
+        session.received += written
+        UploadSession.objects.filter(pk=session.pk).update(received=session.received)
+        return matched
+
+    @classmethod
+    def checksum(cls, session):
+        digest = hashlib.sha256()
+        with open(session.path, 'rb') as part:
+            while block := part.read(cls.BLOCK_SIZE):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def complete(session):
+        """
+        Attaches the received file to a new material of the lesson or to the cover of the course
+        """
+        with open(session.path, 'rb') as part:
+            file = UploadedPartsFile(part, name=session.filename)
+            if session.target == UploadSession.MATERIAL:
+                attached = Material(lesson=session.lesson)
+                attached.file.save(session.filename, file)
+            else:
+                attached = session.course
+                if attached.cover:
+                    ImageMixin.remove(attached.cover)
+                    ImageMixin.remove_variants(attached.cover, attached.cover_variants)
+                attached.cover_status, attached.cover_variants = ImageStatus.PENDING, {}
+                attached.cover.save(session.filename, file)
+        UploadMixin.abort(session)
+        return attached
+
+    @staticmethod
+    def abort(session):
+        if os.path.exists(session.path):
+            os.remove(session.path)
+        session.delete()
+
+    @classmethod
+    def clean_expired(cls):
+        sessions = UploadSession.objects.filter(created__lt=timezone.now() - UPLOADS['EXPIRE_AFTER'])
+        for session in sessions:
+            cls.abort(session)
+        return len(sessions)
+
+
+class CourseCloneMixin:
+    @staticmethod
+    def copy(instance, **values):
+        """
+        Unsaved copy of the row without primary key
+        """
+        fields = {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields
+                  if not field.primary_key}
+        return type(instance)(**{**fields, **values})
+
+    @classmethod
+    def clone(cls, course, name=None):
+        """
+        Copies the course with lessons, materials, questions and options by one select and one bulk insert
+        per table, files are shared by references of their blobs. Copy keeps status of the source.
+        Results and home tasks of learners aren't copied.
+        """
+        with transaction.atomic():
+            lessons = list(Lesson.objects.filter(course=course).order_by('id'))
+            materials = list(Material.objects.filter(lesson__course=course).order_by('id'))
+            questions = list(Question.objects.filter(lesson__course=course).order_by('id'))
+            options = list(Option.objects.filter(question__lesson__course=course).order_by('id'))
+
+            covers = {course.cover.name, *course.cover_variants.values()} if course.cover else set()
+            files = default_storage.reference([*covers, *[material.file.name for material in materials]])
+
+            clone = cls.copy(course, slug='', name=name or course.name,
+                             cover=files.get(course.cover.name, course.cover.name),
+                             cover_variants={variant: files.get(path, path)
+                                             for variant, path in course.cover_variants.items()})
+            # Cover of the source is already processed, its variants are shared
+            clone.admin, clone.saved_cover = course.admin, clone.cover.name
+            clone.save()
+
+            copied = Lesson.objects.bulk_create([cls.copy(lesson, course_id=clone.pk) for lesson in lessons])
+            lesson_ids = {lesson.pk: copy.pk for lesson, copy in zip(lessons, copied)}
+            Material.objects.bulk_create([
+                cls.copy(material, lesson_id=lesson_ids[material.lesson_id], file=files[material.file.name])
+                for material in materials])
+            copied = Question.objects.bulk_create([
+                cls.copy(question, lesson_id=lesson_ids[question.lesson_id]) for question in questions])
+            question_ids = {question.pk: copy.pk for question, copy in zip(questions, copied)}
+            Option.objects.bulk_create([
+                cls.copy(option, question_id=question_ids[option.question_id]) for option in options])
+        return clone
@@ -1,15 +1,13 @@
-import time
+import os
+import uuid
 from django.contrib.auth import get_user_model
 from django.core.validators import FileExtensionValidator
 from django.db import models
 
-from imagekit import register
-from imagekit.models import ProcessedImageField
-
 from courses.models import Course
-from courses_platform_api.choices_types import TaskStatus
-from courses_platform_api.images import ImageThumbnail
-from courses_platform_api.settings import FILES_EXTENSIONS, VALID_EXTENSIONS
+from courses_platform_api.choices_types import TaskStatus, ImageStatus
+from courses_platform_api.mixins import ImageMixin
+from courses_platform_api.settings import FILES_EXTENSIONS, VALID_EXTENSIONS, UPLOADS
 from users.validators import validate_size
 
 User = get_user_model()
@@ -26,20 +24,30 @@ class Lesson(models.Model):
     home_task = models.TextField(null=True, blank=True)
     test = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['course', 'sort'], name='lesson_course_sort_idx'),
+        ]
+
 
 class Material(models.Model):
     def file_path(self, filename):
-        return "media/%s/courses/%s/%s_%s" % (
-            self.lesson.course.admin.slug,
-            self.lesson.course.slug,
-            str(time.time()),
-            filename
-        )
+        # Directory of the file is chosen by the content-addressed storage, name of the upload is kept by the row
+        self.filename = os.path.basename(filename)
+        return filename
 
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='materials')
-    file = models.FileField(upload_to=file_path, validators=[FileExtensionValidator(FILES_EXTENSIONS), validate_size])
+    file = models.FileField(upload_to=file_path, max_length=255,
+                            validators=[FileExtensionValidator(FILES_EXTENSIONS), validate_size])
+    # Declared after `file`, so the name set by its upload_to is saved
+    filename = models.CharField('file name', max_length=255, blank=True)
     lookup_url_kwarg = 'material_pk'
 
+    def save(self, *args, **kwargs):
+        if not self.filename and self.file:
+            self.filename = os.path.basename(self.file.name)
+        super().save(*args, **kwargs)
+
 
 class Question(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='questions')
@@ -56,6 +64,11 @@ class Answer(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     answer = models.ForeignKey(Option, on_delete=models.CASCADE, related_name='answers')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'answer'], name='unique_answer'),
+        ]
+
 
 class Result(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -63,6 +76,11 @@ class Result(models.Model):
     date = models.DateTimeField('result date created', auto_now_add=True)
     result = models.SmallIntegerField('test result')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['lesson', 'user'], name='unique_result'),
+        ]
+
 
 class Task(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -72,18 +90,97 @@ class Task(models.Model):
     curator = models.ForeignKey(User, related_name='tasks', on_delete=models.CASCADE, null=True, blank=True)
     review = models.CharField('comment from curator', max_length=250, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'curator'], name='task_status_curator_idx'),
+        ]
+
+    # Status loaded from the database, progress of the course is changed by the difference with the saved one
+    saved_status = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.saved_status = instance.__dict__.get('status')
+        return instance
+
 
 class ImageTask(models.Model):
     def file_path(self, filename):
-        return "media/%s/courses/%s/homeworks/%s/%s/%s_%s" % (
-            self.task.lesson.course.admin.slug,
-            self.task.lesson.course.slug,
-            self.task.lesson.id,
-            self.task.user,
-            str(time.time()), filename)
-
-    register.generator('tasks:thumbnail', ImageThumbnail)
+        # Directory of the file is chosen by the content-addressed storage
+        return filename
 
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='images')
-    image = ProcessedImageField(spec_id='tasks:thumbnail', upload_to=file_path,
-                                validators=[FileExtensionValidator(VALID_EXTENSIONS)])
+    image = models.ImageField(upload_to=file_path, max_length=255, validators=[FileExtensionValidator(VALID_EXTENSIONS)])
+    image_status = models.IntegerField('image status', choices=ImageStatus.CHOICES, null=True, blank=True)
+    image_variants = models.JSONField('image variants', default=dict, blank=True)
+
+    # Image loaded from the database, variants of a new image are made again
+    saved_image = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.saved_image = instance.__dict__.get('image')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if ImageMixin.is_new_upload(self.image, self.saved_image):
+            self.image_status, self.image_variants = ImageStatus.PENDING, {}
+        super().save(*args, **kwargs)
+        self.saved_image = self.image.name
+
+
+class CourseBundle(models.Model):
+    """
+    Rendered JSON of all lessons of the course with materials and tests, one row per variant of readers.
+    Changes of lesson content bump `changes`, bundle is fresh while `built` equals it.
+    """
+    FULL = 'full'
+    LEARNER = 'learner'
+    PREVIEW = 'preview'
+    VARIANTS = [
+        (FULL, 'With correct options'),
+        (LEARNER, 'Without correct options'),
+        (PREVIEW, 'Content only of free lessons'),
+    ]
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='bundles')
+    variant = models.CharField('readers', max_length=10, choices=VARIANTS)
+    changes = models.IntegerField('changes of content', default=0)
+    built = models.IntegerField('changes of built content', null=True, blank=True)
+    version = models.IntegerField('version', default=0)
+    etag = models.CharField('ETag', max_length=66, blank=True)
+    content = models.TextField('rendered JSON', blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'variant'], name='unique_course_bundle'),
+        ]
+
+
+class UploadSession(models.Model):
+    """
+    Resumable upload of a material of the lesson or a cover of the course, received chunks are kept in `path`
+    """
+    MATERIAL = 'material'
+    COVER = 'cover'
+    TARGETS = [
+        (MATERIAL, 'Material of the lesson'),
+        (COVER, 'Cover of the course'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='uploads')
+    target = models.CharField('target', max_length=10, choices=TARGETS)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='uploads')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, null=True, blank=True, related_name='uploads')
+    filename = models.CharField('file name', max_length=100)
+    size = models.PositiveIntegerField('file size')
+    received = models.PositiveIntegerField('received bytes', default=0)
+    sha256 = models.CharField('SHA-256 of the file', max_length=64, blank=True)
+    created = models.DateTimeField('created', auto_now_add=True)
+
+    @property
+    def path(self):
+        return os.path.join(UPLOADS['DIR'], f'{self.id}.part')
@@ -1,15 +1,25 @@
+import os
+
+from django.db import transaction
 from rest_framework import serializers
 
-from lessons.models import Lesson, Material, Question, Option
+from courses.models import Course
+from courses.serializers import ImageVariantsField
+from courses_platform_api.choices_types import TaskStatus
+from courses_platform_api.metrics import SerializerTimingMixin
+from courses_platform_api.settings import UPLOADS, FILES_EXTENSIONS, VALID_EXTENSIONS
+from lessons.mixins import TestMixin
+from lessons.models import Lesson, Material, Question, Option, Task, ImageTask, UploadSession
 
 
-class MaterialSerializer(serializers.ModelSerializer):
+class MaterialSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = Material
-        fields = ('file', )
+        fields = ('file', 'filename')
+        read_only_fields = ('filename', )
 
 
-class LessonsListSerializer(serializers.ModelSerializer):
+class LessonsListSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = Lesson
         fields = ('id', 'name', 'description')
@@ -22,7 +32,7 @@ class LessonSerializer(LessonsListSerializer):
         fields = ('free_access', 'name', 'video', 'text', 'home_task', 'materials_list')
 
 
-class OptionSerializer(serializers.ModelSerializer):
+class OptionSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     id = serializers.IntegerField(required=False)
 
     class Meta:
@@ -30,29 +40,100 @@ class OptionSerializer(serializers.ModelSerializer):
         fields = ('id', 'option', 'correct')
 
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     options = OptionSerializer(many=True)
 
     class Meta:
         model = Question
         fields = ('question', 'options')
 
+    def validate_options(self, options):
+        if self.instance is not None:
+            ids = {option['id'] for option in options if option.get('id')}
+            if ids - set(self.instance.options.values_list('id', flat=True)):
+                raise serializers.ValidationError('Options must be options of this question.')
+        return options
+
+    @transaction.atomic
     def create(self, validated_data):
         lesson = self.context.get('view').kwargs.get('pk')
-        options_data = validated_data.pop('options')
-        question = Question.objects.create(lesson_id=lesson, **validated_data)
-        for option_data in options_data:
-            Option.objects.create(question=question, **option_data)
-        return question
+        return TestMixin.create_questions(lesson, [validated_data])[0]
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         instance.question = validated_data['question']
-        instance.save()
-        for option_data in validated_data['options']:
-            if 'correct' not in option_data:
-                option_data['correct'] = False
-            if 'id' not in option_data:
-                option_data['id'] = None
-            option_data['question'] = instance
-            Option.objects.update_or_create(pk=option_data['id'], defaults=option_data)
+        instance.save(update_fields=['question'])
+        TestMixin.update_options(instance, validated_data['options'])
         return instance
+
+
+class TestImportSerializer(serializers.Serializer):
+    questions = QuestionSerializer(many=True, allow_empty=False, max_length=200)
+    replace = serializers.BooleanField(default=False)
+
+
+class ImageTaskSerializer(SerializerTimingMixin, serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
+    class Meta:
+        model = ImageTask
+        fields = ('id', 'image', 'image_status', 'image_variants')
+
+
+class TaskQueueSerializer(SerializerTimingMixin, serializers.ModelSerializer):
+    course = serializers.CharField(source='lesson.course.slug', read_only=True)
+    lesson_name = serializers.CharField(source='lesson.name', read_only=True)
+    home_task = serializers.CharField(source='lesson.home_task', read_only=True)
+    user_slug = serializers.CharField(read_only=True)
+    full_name = serializers.CharField(read_only=True)
+    images = ImageTaskSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Task
+        fields = ('id', 'course', 'lesson', 'lesson_name', 'home_task', 'user_slug', 'full_name', 'status', 'text',
+                  'curator', 'review', 'images')
+
+
+class TaskClaimSerializer(serializers.Serializer):
+    count = serializers.IntegerField(min_value=1, max_value=50, default=1)
+
+
+class TaskReviewSerializer(SerializerTimingMixin, serializers.ModelSerializer):
+    status = serializers.ChoiceField(choices=[TaskStatus.EDIT, TaskStatus.ACCEPT])
+    review = serializers.CharField(max_length=250, required=False, allow_blank=True, allow_null=True)
+
+    class Meta:
+        model = Task
+        fields = ('status', 'review')
+
+
+class UploadSessionSerializer(SerializerTimingMixin, serializers.ModelSerializer):
+    course = serializers.SlugRelatedField(slug_field='slug', queryset=Course.objects.select_related('admin'))
+    size = serializers.IntegerField(min_value=1)
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False)
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ('id', 'target', 'course', 'lesson', 'filename', 'size', 'received', 'sha256', 'chunk_size')
+        read_only_fields = ('received', )
+
+    def get_chunk_size(self, obj):
+        return UPLOADS['CHUNK_SIZE']
+
+    def validate_size(self, value):
+        if value > UPLOADS['MAX_SIZE']:
+            raise serializers.ValidationError(f'Max size of the file is {UPLOADS["MAX_SIZE"]} bytes.')
+        return value
+
+    def validate(self, attrs):
+        extensions = FILES_EXTENSIONS if attrs['target'] == UploadSession.MATERIAL else VALID_EXTENSIONS
+        if os.path.splitext(attrs['filename'])[1][1:].lower() not in extensions:
+            raise serializers.ValidationError({'filename': f'Allowed extensions are: {", ".join(extensions)}.'})
+        lesson = attrs.get('lesson')
+        if attrs['target'] == UploadSession.MATERIAL and (lesson is None or lesson.course_id != attrs['course'].pk):
+            raise serializers.ValidationError({'lesson': 'Lesson of the course is required for materials.'})
+        if attrs['target'] == UploadSession.COVER:
+            attrs['lesson'] = None
+        attrs['sha256'] = attrs.get('sha256', '').lower()
+        return attrs
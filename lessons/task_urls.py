@@ -0,0 +1,12 @@
+from django.urls import path
+
+from lessons.views import TaskQueueAPIView, TaskClaimAPIView, TaskReviewAPIView, TaskImageDownloadAPIView
+
+app_name = 'tasks'
+
+urlpatterns = [
+    path('', TaskQueueAPIView.as_view(), name='task-list'),
+    path('claim/', TaskClaimAPIView.as_view(), name='task-claim'),
+    path('<int:pk>/review/', TaskReviewAPIView.as_view(), name='task-review'),
+    path('images/<int:pk>/download/', TaskImageDownloadAPIView.as_view(), name='task-image-download'),
+    ]
@@ -1,12 +1,29 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import psycopg2
 from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 
 from rest_framework.test import APITestCase, APIClient
 
-from courses.models import Permission, Course
-from courses_platform_api.choices_types import ProfileRoles
-from lessons.models import Lesson, Question, Option
+from courses.cache import course_access
+from courses.models import Permission, Course, CourseProgress
+from courses.tests.test_views import async_get
+from courses_platform_api.choices_types import ProfileRoles, TaskStatus, ImageStatus
+from lessons.mixins import TaskQueueMixin
+from lessons.models import Lesson, Question, Option, Answer, Result, Material, Task, ImageTask, UploadSession
+from lessons.views import LessonsListAsyncView, LessonAsyncView
+from users.models import Lead
 
 User = get_user_model()
 
@@ -194,16 +211,603 @@ class QuestionsListAPIViewTestCase(LessonInitialMixin):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         options = Option.objects.all().order_by('id')
         self.assertEqual(Question.objects.last().question, "Is it the new question text?")
-        self.assertEqual(options.count(), 4)
+        self.assertEqual(options.count(), 3)
         self.assertEqual(options[0].option, "Option 1 new")
         self.assertEqual(options[0].correct, False)
+        self.assertEqual(options[1].correct, True)
+        self.assertEqual(options[2].option, "Option 4")
 
         url = reverse('v1.0:courses:lessons:option-detail', args=[
             self.course1.slug,
             self.lesson1.pk,
             question.pk,
-            options[3].pk
+            options[2].pk
         ])
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
-        self.assertEqual(Option.objects.all().count(), 3)
+        self.assertEqual(Option.objects.all().count(), 2)
+
+    def test_question_create_and_update_queries_do_not_depend_on_options(self):
+        self.data['options'] = [{'option': f'Option {i}'} for i in range(50)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, self.data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['options']), 50)
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 2)
+
+        question = Question.objects.last()
+        url = reverse('v1.0:courses:lessons:lesson-test-detail', args=[self.course1.slug, self.lesson1.pk, question.pk])
+        options = [{'id': pk, 'option': 'Updated', 'correct': True}
+                   for pk in question.options.values_list('id', flat=True)[:40]] + [{'option': 'New'}] * 5
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(url, {'question': 'Updated', 'options': options}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries.captured_queries), 15)
+        self.assertEqual(question.options.count(), 45)
+        self.assertEqual(question.options.filter(option='Updated', correct=True).count(), 40)
+
+    def test_question_update_options_of_other_question_error(self):
+        self.test_lesson_test_question_creation()
+        self.test_lesson_test_question_creation()
+        first, second = Question.objects.order_by('id')
+        url = reverse('v1.0:courses:lessons:lesson-test-detail', args=[self.course1.slug, self.lesson1.pk, second.pk])
+        data = {'question': 'Question', 'options': [{'id': first.options.first().pk, 'option': 'Stolen'}]}
+        response = self.client.put(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(first.options.count(), 3)
+
+
+class TestImportAPIViewTestCase(LessonInitialMixin):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('v1.0:courses:lessons:lesson-test-import', args=[self.course1.slug, self.lesson1.pk])
+        self.data = {
+            'questions': [
+                {'question': f'Question {i}',
+                 'options': [{'option': f'Option {j}', 'correct': j == 0} for j in range(4)]}
+                for i in range(50)
+            ]
+        }
+
+    def test_import_whole_test_by_bulk_inserts(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, self.data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['questions']), 50)
+        self.assertLessEqual(len(queries.captured_queries), 7)
+        self.assertEqual(Question.objects.filter(lesson=self.lesson1).count(), 50)
+        self.assertEqual(Option.objects.filter(question__lesson=self.lesson1, correct=True).count(), 50)
+        self.assertEqual(Option.objects.filter(question__lesson=self.lesson1).count(), 200)
+
+    def test_import_replace_existing_questions(self):
+        self.client.post(self.url, self.data, format="json")
+        self.data['questions'] = self.data['questions'][:2]
+        self.data['replace'] = True
+        response = self.client.post(self.url, self.data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Question.objects.filter(lesson=self.lesson1).count(), 2)
+        self.assertEqual(Option.objects.filter(question__lesson=self.lesson1).count(), 8)
+
+    def test_import_invalid_data_saves_nothing(self):
+        self.data['questions'][10]['options'][0]['option'] = ''
+        response = self.client.post(self.url, self.data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Question.objects.exists())
+        response = self.client.post(self.url, {'questions': []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_permissions(self):
+        for email in ('user2@user.com', 'user4@user.com', 'user5@user.com'):
+            res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': 'strong'})
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+            response = self.client.post(self.url, self.data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user1@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        url = reverse('v1.0:courses:lessons:lesson-test-import', args=[self.course3.slug, self.lesson1.pk])
+        response = self.client.post(url, self.data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(self.url, self.data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class TestResultAPIViewTestCase(LessonInitialMixin):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('v1.0:courses:lessons:lesson-test-result', args=[self.course1.slug, self.lesson1.pk])
+        self.answers = {}
+        for number in range(4):
+            question = Question.objects.create(lesson=self.lesson1, question=f"Question {number}")
+            right = Option.objects.create(question=question, option="Right", correct=True)
+            wrong = Option.objects.create(question=question, option="Wrong")
+            self.answers[str(question.pk)] = right.pk if number % 2 else wrong.pk
+
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user5@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_learner_test_result(self):
+        response = self.client.post(self.url, self.answers, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['result'], 50)
+        self.assertEqual(Answer.objects.filter(user=self.user5).count(), 4)
+        self.assertEqual(Result.objects.get(user=self.user5, lesson=self.lesson1).result, 50)
+
+    def test_learner_take_test_only_once(self):
+        self.client.post(self.url, self.answers, format="json")
+        response = self.client.post(self.url, self.answers, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_learner_concurrent_submits_of_test_forbidden(self):
+        # Result of the concurrent submit is saved after the check of this one
+        Result.objects.create(user=self.user5, lesson=self.lesson1, result=100)
+        with mock.patch.object(Result.objects, 'filter', return_value=Result.objects.none()):
+            response = self.client.post(self.url, self.answers, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Answer.objects.filter(user=self.user5).exists())
+        self.assertEqual(Result.objects.get(user=self.user5, lesson=self.lesson1).result, 100)
+
+    def test_learner_answers_from_other_lesson_ignored(self):
+        question = Question.objects.create(lesson=self.lesson2, question="Other lesson question")
+        option = Option.objects.create(question=question, option="Right", correct=True)
+        self.answers[str(question.pk)] = option.pk
+        response = self.client.post(self.url, self.answers, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Answer.objects.filter(answer=option).exists())
+
+    def test_test_result_query_count_does_not_depend_on_questions_count(self):
+        course_access.clear()
+        with CaptureQueriesContext(connection) as small_test:
+            self.client.post(self.url, self.answers, format="json")
+
+        url = reverse('v1.0:courses:lessons:lesson-test-result', args=[self.course1.slug, self.lesson2.pk])
+        answers = {}
+        for number in range(20):
+            question = Question.objects.create(lesson=self.lesson2, question=f"Question {number}")
+            answers[str(question.pk)] = Option.objects.create(question=question, option="Right", correct=True).pk
+        course_access.clear()
+        with CaptureQueriesContext(connection) as big_test:
+            response = self.client.post(url, answers, format="json")
+        self.assertEqual(response.data['result'], 100)
+        self.assertEqual(len(small_test.captured_queries), len(big_test.captured_queries))
+
+
+class CourseResolutionTestCase(LessonInitialMixin):
+    def setUp(self):
+        super().setUp()
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user5@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def course_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [query for query in queries.captured_queries if 'FROM "courses_course"' in query['sql']]
+
+    def test_lessons_list_loads_course_once(self):
+        url = reverse('v1.0:courses:lessons:lesson-list', args=[self.course1.slug])
+        self.assertEqual(len(self.course_queries(url)), 1)
+
+    def test_lesson_detail_loads_course_once(self):
+        url = reverse('v1.0:courses:lessons:lesson-detail', args=[self.course1.slug, self.lesson2.pk])
+        self.assertEqual(len(self.course_queries(url)), 1)
+
+    def test_lessons_list_unknown_course_not_found(self):
+        response = self.client.get(reverse('v1.0:courses:lessons:lesson-list', args=['unknown']))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class LessonsAsyncViewsTestCase(LessonInitialMixin):
+    def setUp(self):
+        super().setUp()
+        course_access.clear()
+        Lesson.objects.create(course=self.course1, sort=-1, name='First')
+        Material.objects.create(lesson=self.lesson1, file='materials/file.pdf')
+        self.list_url = reverse('v1.0:courses:lessons:lesson-list', args=[self.course1.slug])
+        self.tokens = {
+            user.email: self.client.post(reverse('v1.0:token_obtain_pair'),
+                                         {'email': user.email, 'password': 'strong'}).data['access']
+            for user in (self.user, self.user1, self.user2, self.user4, self.user5)
+        }
+
+    def assertSameAsSync(self, view, url, email):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.tokens[email]}')
+        expected = self.client.get(url)
+        course_access.clear()
+        response = async_get(view, url, self.tokens[email])
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content or 'null'), json.loads(expected.content or 'null'))
+        return response
+
+    def test_lessons_list_same_as_sync_view(self):
+        for email in ('super@super.super', 'user1@user.com', 'user2@user.com', 'user4@user.com', 'user5@user.com'):
+            self.assertSameAsSync(LessonsListAsyncView.as_view(), self.list_url, email)
+        response = self.assertSameAsSync(LessonsListAsyncView.as_view(), self.list_url + '?limit=1&offset=1',
+                                         'user5@user.com')
+        data = json.loads(response.content)
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(data['results'][0]['id'], self.lesson1.pk)
+        self.assertIn('offset=2', data['next'])
+
+    def test_lesson_same_as_sync_view(self):
+        for lesson in (self.lesson1, self.lesson2):
+            url = reverse('v1.0:courses:lessons:lesson-detail', args=[self.course1.slug, lesson.pk])
+            for email in ('super@super.super', 'user1@user.com', 'user2@user.com', 'user4@user.com', 'user5@user.com'):
+                self.assertSameAsSync(LessonAsyncView.as_view(), url, email)
+
+    def test_lesson_learner_without_access_only_free_lessons(self):
+        Permission.objects.filter(pk=self.permission2.pk).update(access=False)
+        course_access.clear()
+        url = reverse('v1.0:courses:lessons:lesson-detail', args=[self.course1.slug, self.lesson1.pk])
+        with self.assertNumQueries(3):
+            response = async_get(LessonAsyncView.as_view(), url, self.tokens['user5@user.com'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        url = reverse('v1.0:courses:lessons:lesson-detail', args=[self.course1.slug, self.lesson2.pk])
+        response = async_get(LessonAsyncView.as_view(), url, self.tokens['user5@user.com'])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_lesson_not_found(self):
+        url = reverse('v1.0:courses:lessons:lesson-detail', args=[self.course1.slug, 0])
+        response = async_get(LessonAsyncView.as_view(), url, self.tokens['user1@user.com'])
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        url = reverse('v1.0:courses:lessons:lesson-list', args=['unknown'])
+        response = async_get(LessonsListAsyncView.as_view(), url, self.tokens['user1@user.com'])
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TaskQueueAPIViewTestCase(LessonInitialMixin):
+    def setUp(self):
+        super().setUp()
+        Lead.objects.create(user=self.user4, lead=self.user1)
+        self.tasks = [Task.objects.create(user=self.user5, lesson=lesson, status=TaskStatus.REVIEW, text='Done')
+                      for lesson in (self.lesson1, self.lesson2)]
+        ImageTask.objects.bulk_create([ImageTask(task=self.tasks[0], image=f'image{number}.jpg') for number in range(2)])
+        other_lesson = Lesson.objects.create(course=self.course2)
+        Task.objects.create(user=self.user5, lesson=other_lesson, status=TaskStatus.REVIEW)
+        Task.objects.create(user=self.user5, lesson=self.lesson1, status=TaskStatus.NEW)
+
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user4@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_queue_of_led_courses_with_images(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('v1.0:tasks:task-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([task['id'] for task in response.data['results']], [task.pk for task in self.tasks])
+        self.assertEqual(len(response.data['results'][0]['images']), 2)
+        self.assertEqual(response.data['results'][0]['course'], self.course1.slug)
+        self.assertEqual(len(queries.captured_queries), 3)
+
+    def test_queue_only_for_curators(self):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user1@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        response = self.client.get(reverse('v1.0:tasks:task-list'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_claim_and_review(self):
+        response = self.client.post(reverse('v1.0:tasks:task-claim'), {'count': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([task['id'] for task in response.data['results']], [self.tasks[0].pk])
+        self.assertEqual(response.data['results'][0]['curator'], self.user4.pk)
+
+        response = self.client.get(reverse('v1.0:tasks:task-list'))
+        self.assertEqual([task['id'] for task in response.data['results']], [self.tasks[1].pk])
+        response = self.client.get(reverse('v1.0:tasks:task-list') + '?claimed=true')
+        self.assertEqual([task['id'] for task in response.data['results']], [self.tasks[0].pk])
+
+        url = reverse('v1.0:tasks:task-review', args=[self.tasks[1].pk])
+        response = self.client.put(url, {'status': TaskStatus.ACCEPT})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        url = reverse('v1.0:tasks:task-review', args=[self.tasks[0].pk])
+        response = self.client.put(url, {'status': TaskStatus.ACCEPT, 'review': 'Well done'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Task.objects.get(pk=self.tasks[0].pk).review, 'Well done')
+        progress = CourseProgress.objects.get(user=self.user5, course=self.course1)
+        self.assertEqual((progress.lessons_completed, progress.tasks_pending), (1, 1))
+
+    def test_review_status_choices(self):
+        self.client.post(reverse('v1.0:tasks:task-claim'), {'count': 2})
+        url = reverse('v1.0:tasks:task-review', args=[self.tasks[0].pk])
+        response = self.client.put(url, {'status': TaskStatus.NEW})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TaskClaimConcurrencyTestCase(TransactionTestCase):
+    def setUp(self):
+        admin = User.objects.create_user(email='user1@user.com', password='strong', role=ProfileRoles.ADMINISTRATOR)
+        self.curator = User.objects.create_user(email='user2@user.com', password='strong', role=ProfileRoles.CURATOR)
+        learner = User.objects.create_user(email='user3@user.com', password='strong', role=ProfileRoles.LEARNER)
+        Lead.objects.create(user=self.curator, lead=admin)
+        lesson = Lesson.objects.create(course=Course.objects.create(admin=admin, name='Course'))
+        self.tasks = [Task.objects.create(user=learner, lesson=lesson, status=TaskStatus.REVIEW) for _ in range(3)]
+
+    def test_claim_skips_rows_locked_by_other_claim(self):
+        other = psycopg2.connect(**connection.get_connection_params())
+        try:
+            with other.cursor() as cursor:
+                cursor.execute('SELECT id FROM lessons_task WHERE id = %s FOR UPDATE', [self.tasks[0].pk])
+                claimed = list(TaskQueueMixin.claim(self.curator.pk, 2))
+            other.rollback()
+        finally:
+            other.close()
+        self.assertEqual([task.pk for task in claimed], [task.pk for task in self.tasks[1:]])
+        self.assertIsNone(Task.objects.get(pk=self.tasks[0].pk).curator_id)
+
+
+class CourseBundleAPIViewTestCase(LessonInitialMixin):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('v1.0:courses:lessons:lesson-bundle', args=[self.course1.slug])
+        Material.objects.create(lesson=self.lesson1, file='media/material.pdf')
+        question = Question.objects.create(lesson=self.lesson2, question='Question')
+        Option.objects.create(question=question, option='Right', correct=True)
+
+    def login(self, email):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_bundle_of_course_lessons(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        bundle = json.loads(response.content)
+        self.assertEqual([lesson['id'] for lesson in bundle['lessons']], [self.lesson1.pk, self.lesson2.pk])
+        self.assertEqual(len(bundle['lessons'][0]['materials']), 1)
+        self.assertTrue(bundle['lessons'][1]['questions'][0]['options'][0]['correct'])
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_fresh_bundle_read_by_one_query_and_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(queries.captured_queries), 2)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_bundle_rebuilt_after_content_changes(self):
+        etag = self.client.get(self.url)['ETag']
+        url = reverse('v1.0:courses:lessons:lesson-detail', args=[self.course1.slug, self.lesson1.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(url, {'name': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        bundle = json.loads(response.content)
+        self.assertEqual(bundle['lessons'][0]['name'], 'Renamed')
+        self.assertEqual(bundle['version'], 2)
+
+    def test_bundle_rebuilt_after_changes_of_rows_outside_views(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Option.objects.filter(question__lesson=self.lesson2).update(option='Changed')
+        self.assertEqual(self.client.get(self.url)['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Option.objects.create(question=Question.objects.get(lesson=self.lesson2), option='Wrong')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(json.loads(response.content)['lessons'][1]['questions'][0]['options']), 2)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.lesson2.delete()
+        self.assertEqual(len(callbacks), 1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual([lesson['id'] for lesson in json.loads(response.content)['lessons']], [self.lesson1.pk])
+
+    def test_learner_bundles(self):
+        self.login('user5@user.com')
+        Permission.objects.filter(user=self.user5).update(access=False)
+        course_access.invalidate(self.user5.pk, self.course1.pk)
+        lessons = json.loads(self.client.get(self.url).content)['lessons']
+        self.assertIn('materials', lessons[0])
+        self.assertEqual(set(lessons[1]), {'id', 'sort', 'name', 'description', 'free_access'})
+
+        Permission.objects.filter(user=self.user5).update(access=True)
+        course_access.invalidate(self.user5.pk, self.course1.pk)
+        lessons = json.loads(self.client.get(self.url).content)['lessons']
+        self.assertEqual(lessons[1]['questions'][0]['options'], [{'id': lessons[1]['questions'][0]['options'][0]['id'],
+                                                                 'option': 'Right'}])
+
+
+class MediaDownloadTestCase(LessonInitialMixin):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.material = Material(lesson=self.lesson2)
+        self.material.file.save('material.pdf', ContentFile(b'0123456789'))
+        self.url = reverse('v1.0:courses:lessons:material-download',
+                           args=[self.course1.slug, self.lesson2.pk, self.material.pk])
+
+        task = Task.objects.create(user=self.user5, lesson=self.lesson1, status=TaskStatus.REVIEW)
+        self.image = ImageTask(task=task)
+        self.image.image.save('home.jpg', ContentFile(b'image'))
+        self.image_url = reverse('v1.0:tasks:task-image-download', args=[self.image.pk])
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def login(self, email):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_material_streamed_with_ranges(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="material.pdf"')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=7-', HTTP_IF_RANGE='Wed, 21 Oct 2015 07:28:00 GMT')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5-3')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_material_sent_by_web_server(self):
+        with mock.patch.dict('courses_platform_api.media.MEDIA_SERVE', {'MODE': 'accel'}):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/' + self.material.file.name)
+        self.assertEqual(response.content, b'')
+
+        with mock.patch.dict('courses_platform_api.media.MEDIA_SERVE', {'MODE': 'sendfile'}):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.material.file.path)
+
+    def test_material_of_closed_lesson_for_learner_without_access(self):
+        self.login('user5@user.com')
+        Permission.objects.filter(user=self.user5).update(access=False)
+        course_access.invalidate(self.user5.pk, self.course1.pk)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_task_image_access(self):
+        self.login('user5@user.com')
+        response = self.client.get(self.image_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'image')
+        response = self.client.get(self.image_url + '?variant=320.webp')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.login('user4@user.com')
+        response = self.client.get(self.image_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        Lead.objects.create(user=self.user4, lead=self.user1)
+        response = self.client.get(self.image_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.login('user2@user.com')
+        response = self.client.get(self.image_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class UploadAPIViewTestCase(LessonInitialMixin):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.uploads = mock.patch.dict('courses_platform_api.settings.UPLOADS',
+                                       {'DIR': os.path.join(self.media_root, 'uploads'), 'MAX_SIZE': 100})
+        self.uploads.start()
+        self.url = reverse('v1.0:uploads:upload-list')
+        self.content = b'0123456789' * 3
+        self.data = {'target': 'material', 'course': self.course1.slug, 'lesson': self.lesson2.pk,
+                     'filename': 'material.pdf', 'size': len(self.content),
+                     'sha256': hashlib.sha256(self.content).hexdigest()}
+
+    def tearDown(self):
+        self.uploads.stop()
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def send(self, pk, chunk, offset, **extra):
+        return self.client.generic('PATCH', reverse('v1.0:uploads:upload-detail', args=[pk]), chunk,
+                                   content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset), **extra)
+
+    def test_material_uploaded_by_chunks_and_resumed(self):
+        response = self.client.post(self.url, self.data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        pk = response.data['id']
+        self.assertEqual(response.data['received'], 0)
+
+        response = self.send(pk, self.content[:10], 0)
+        self.assertEqual(response.data, {'received': 10})
+        response = self.send(pk, self.content[10:20], 0)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['received'], 10)
+        response = self.send(pk, self.content[10:20], 10, HTTP_UPLOAD_CHECKSUM='0' * 64)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(UploadSession.objects.get(pk=pk).received, 10)
+
+        response = self.client.post(reverse('v1.0:uploads:upload-complete', args=[pk]))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        response = self.client.get(reverse('v1.0:uploads:upload-detail', args=[pk]))
+        self.assertEqual(response.data['received'], 10)
+        response = self.send(pk, self.content[10:], 10, HTTP_UPLOAD_CHECKSUM=hashlib.sha256(self.content[10:]).hexdigest())
+        self.assertEqual(response.data, {'received': 30})
+        response = self.send(pk, b'more', 30)
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        response = self.client.post(reverse('v1.0:uploads:upload-complete', args=[pk]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        material = Material.objects.get(pk=response.data['id'])
+        self.assertEqual(material.lesson, self.lesson2)
+        with material.file.open('rb') as file:
+            self.assertEqual(file.read(), self.content)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'uploads')), [])
+
+    def test_upload_with_wrong_checksum_aborted(self):
+        pk = self.client.post(self.url, {**self.data, 'sha256': '0' * 64}).data['id']
+        self.send(pk, self.content, 0)
+        response = self.client.post(reverse('v1.0:uploads:upload-complete', args=[pk]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(Material.objects.exists())
+
+    def test_upload_validated_before_transfer(self):
+        response = self.client.post(self.url, {**self.data, 'size': 101})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {**self.data, 'filename': 'material.exe'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {**self.data, 'course': self.course2.slug})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {**self.data, 'target': 'cover', 'filename': 'cover.pdf'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_of_other_course_or_user_no_access(self):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user2@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        response = self.client.post(self.url, self.data)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        session = UploadSession.objects.create(user=self.user, target='material', course=self.course1,
+                                               lesson=self.lesson2, filename='material.pdf', size=30)
+        response = self.send(session.pk, self.content, 0)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.delete(reverse('v1.0:uploads:upload-detail', args=[session.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cover_uploaded_and_queued_for_processing(self):
+        response = self.client.post(self.url, {'target': 'cover', 'course': self.course1.slug,
+                                               'filename': 'cover.png', 'size': 5})
+        pk = response.data['id']
+        self.assertIsNone(response.data['lesson'])
+        self.send(pk, b'image', 0)
+        response = self.client.post(reverse('v1.0:uploads:upload-complete', args=[pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.course1.refresh_from_db()
+        self.assertEqual(self.course1.cover_status, ImageStatus.PENDING)
+        self.assertEqual(self.course1.cover.name, response.data['cover'])
+        with self.course1.cover.open('rb') as file:
+            self.assertEqual(file.read(), b'image')
+
+    def test_upload_aborted(self):
+        pk = self.client.post(self.url, self.data).data['id']
+        self.send(pk, self.content[:10], 0)
+        response = self.client.delete(reverse('v1.0:uploads:upload-detail', args=[pk]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'uploads')), [])
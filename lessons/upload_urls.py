@@ -0,0 +1,11 @@
+from django.urls import path
+
+from lessons.views import UploadSessionAPIView, UploadSessionDetailAPIView, UploadCompleteAPIView
+
+app_name = 'uploads'
+
+urlpatterns = [
+    path('', UploadSessionAPIView.as_view(), name='upload-list'),
+    path('<uuid:pk>/', UploadSessionDetailAPIView.as_view(), name='upload-detail'),
+    path('<uuid:pk>/complete/', UploadCompleteAPIView.as_view(), name='upload-complete'),
+    ]
@@ -1,17 +1,23 @@
 from django.urls import path
 
 from lessons.views import LessonsListAPIView, LessonAPIView, MaterialAPIView, MaterialDetailAPIView, \
-    QuestionsListAPIView, QuestionAPIView, OptionAPIView, TestResultAPIView
+    QuestionsListAPIView, QuestionAPIView, OptionAPIView, TestResultAPIView, LessonsListAsyncView, LessonAsyncView, \
+    TestImportAPIView, CourseBundleAPIView, MaterialDownloadAPIView
+from courses_platform_api.async_views import method_view
 
 app_name = 'lessons'
 
 urlpatterns = [
-    path('', LessonsListAPIView.as_view(), name='lesson-list'),
-    path('<int:pk>/', LessonAPIView.as_view(), name='lesson-detail'),
+    path('', method_view(LessonsListAsyncView.as_view(), LessonsListAPIView.as_view()), name='lesson-list'),
+    path('bundle/', CourseBundleAPIView.as_view(), name='lesson-bundle'),
+    path('<int:pk>/', method_view(LessonAsyncView.as_view(), LessonAPIView.as_view()), name='lesson-detail'),
     path('<int:pk>/tests/', QuestionsListAPIView.as_view(), name='lesson-test'),
+    path('<int:pk>/tests/import/', TestImportAPIView.as_view(), name='lesson-test-import'),
     path('<int:pk>/tests/result/', TestResultAPIView.as_view(), name='lesson-test-result'),
     path('<int:pk>/tests/<int:test_pk>/', QuestionAPIView.as_view(), name='lesson-test-detail'),
     path('<int:pk>/tests/<int:test_pk>/<int:option_pk>/', OptionAPIView.as_view(), name='option-detail'),
     path('<int:pk>/materials/', MaterialAPIView.as_view(), name='add-material'),
     path('<int:pk>/materials/<int:material_pk>/', MaterialDetailAPIView.as_view(), name='material-detail'),
+    path('<int:pk>/materials/<int:material_pk>/download/', MaterialDownloadAPIView.as_view(),
+         name='material-download'),
     ]
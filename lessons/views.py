@@ -1,15 +1,26 @@
 from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from courses.models import Course
+from courses.mixins import CourseMixin
+from courses_platform_api.async_views import AsyncAPIView
+from courses_platform_api.media import MediaMixin
 from courses_platform_api.mixins import ImageMixin
+from courses_platform_api.pagination import KeysetPagination
 from courses_platform_api.permissions import IsSuperuserAllOrOwnerAllOrCuratorActiveCoursesReadOnlyLearnerReadOnly, \
-    LessonPermission, IsLearnerAll
-from lessons.models import Lesson, Material, Question, Option, Answer, Result
+    LessonPermission, IsLearnerAll, IsCurator, TaskImagePermission, \
+    IsSuperuserAllOrAdministratorActiveCoursesAllOrCuratorActiveCoursesReadOnly
+from courses_platform_api.settings import UPLOADS
+from lessons.mixins import TestMixin, TaskQueueMixin, CourseBundleMixin, UploadMixin
+from lessons.models import Lesson, Material, Question, Option, Result, ImageTask, UploadSession
 from lessons.serializers import LessonsListSerializer, LessonSerializer, MaterialSerializer, QuestionSerializer, \
-    OptionSerializer
+    OptionSerializer, TestImportSerializer, TaskQueueSerializer, TaskClaimSerializer, TaskReviewSerializer, \
+    UploadSessionSerializer
 
 
 class LessonsListAPIView(generics.ListCreateAPIView):
@@ -17,9 +28,8 @@ class LessonsListAPIView(generics.ListCreateAPIView):
     permission_classes = (IsSuperuserAllOrOwnerAllOrCuratorActiveCoursesReadOnlyLearnerReadOnly, )
 
     def get_queryset(self):
-        slug = self.kwargs['slug']
-        course = Course.objects.get(slug=slug)
-        return Lesson.objects.filter(course=course)
+        course = CourseMixin.get_course(self.request, self.kwargs['slug'])
+        return Lesson.objects.filter(course=course).order_by('sort', 'id')
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -27,9 +37,18 @@ class LessonsListAPIView(generics.ListCreateAPIView):
         return self.serializer_class
 
     def perform_create(self, serializer):
-        slug = self.kwargs['slug']
-        if course := Course.objects.get(slug=slug):
-            Lesson.objects.create(**serializer.validated_data, course=course)
+        course = CourseMixin.get_course(self.request, self.kwargs['slug'])
+        Lesson.objects.create(**serializer.validated_data, course=course)
+
+
+class LessonsListAsyncView(AsyncAPIView):
+    permission_classes = LessonsListAPIView.permission_classes
+    pagination_class = LessonsListAPIView.pagination_class
+
+    async def get(self, request, *args, **kwargs):
+        course = await CourseMixin.aget_course(request, self.kwargs['slug'])
+        lessons = await self.paginate_queryset(Lesson.objects.filter(course=course).order_by('sort', 'id'))
+        return self.paginator.get_paginated_response(LessonsListSerializer(lessons, many=True).data)
 
 
 class LessonAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -51,6 +70,36 @@ class LessonAPIView(generics.RetrieveUpdateDestroyAPIView):
         instance.delete()
 
 
+class LessonAsyncView(AsyncAPIView):
+    permission_classes = (LessonPermission, )
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            lesson = await Lesson.objects.values('free_access', 'name', 'video', 'text', 'home_task').\
+                annotate(materials_list=ArrayAgg('materials__file')).aget(pk=self.kwargs['pk'])
+        except Lesson.DoesNotExist:
+            raise Http404
+        self.check_object_permissions(request, lesson)
+        return Response(LessonSerializer(lesson).data)
+
+
+class CourseBundleAPIView(APIView):
+    """
+    All lessons of the course with materials and tests in one response, served from the precomputed bundle
+    with strong ETag, conditional requests are answered with 304
+    """
+    permission_classes = (IsSuperuserAllOrOwnerAllOrCuratorActiveCoursesReadOnlyLearnerReadOnly, )
+
+    def get(self, request, *args, **kwargs):
+        course = CourseMixin.get_course(request, self.kwargs['slug'])
+        etag, content = CourseBundleMixin.get(course, CourseBundleMixin.variant(request, course))
+        if response := get_conditional_response(request, etag=etag):
+            return response
+        response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        return response
+
+
 class MaterialAPIView(generics.CreateAPIView):
     queryset = Material.objects.all()
     serializer_class = MaterialSerializer
@@ -75,6 +124,21 @@ class MaterialDetailAPIView(MaterialAPIView, generics.RetrieveUpdateDestroyAPIVi
         instance.delete()
 
 
+class MaterialDownloadAPIView(APIView):
+    """
+    File of the material, access of the lesson is checked once and the body is sent by MEDIA_SERVE mode
+    """
+    permission_classes = (LessonPermission, )
+
+    def get(self, request, *args, **kwargs):
+        course = CourseMixin.get_course(request, self.kwargs['slug'])
+        material = get_object_or_404(Material.objects.select_related('lesson').
+                                     only('file', 'filename', 'lesson__free_access'),
+                                     pk=self.kwargs['material_pk'], lesson_id=self.kwargs['pk'], lesson__course=course)
+        self.check_object_permissions(request, {'free_access': material.lesson.free_access})
+        return MediaMixin.serve(request, material.file.storage, material.file.name, filename=material.filename)
+
+
 class QuestionsListAPIView(generics.ListCreateAPIView):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
@@ -94,6 +158,25 @@ class QuestionAPIView(generics.RetrieveUpdateDestroyAPIView):
     lookup_url_kwarg = 'test_pk'
 
 
+class TestImportAPIView(APIView):
+    permission_classes = (IsSuperuserAllOrOwnerAllOrCuratorActiveCoursesReadOnlyLearnerReadOnly, )
+
+    def post(self, request, *args, **kwargs):
+        """
+        Whole lesson test is saved by bulk inserts in one transaction,
+        with replace = true existing questions of the lesson are deleted
+        """
+        course = CourseMixin.get_course(request, self.kwargs['slug'])
+        lesson = get_object_or_404(Lesson.objects.only('id'), pk=self.kwargs['pk'], course=course)
+        serializer = TestImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            if serializer.validated_data['replace']:
+                Question.objects.filter(lesson=lesson).delete()
+            questions = TestMixin.create_questions(lesson.pk, serializer.validated_data['questions'])
+        return Response({'questions': [question.pk for question in questions]}, status=status.HTTP_201_CREATED)
+
+
 class OptionAPIView(generics.DestroyAPIView):
     queryset = Option.objects.all()
     serializer_class = OptionSerializer
@@ -104,23 +187,158 @@ class OptionAPIView(generics.DestroyAPIView):
 class TestResultAPIView(APIView):
     permission_classes = (IsLearnerAll, )
 
-    @staticmethod
-    def check_test(user, pk):
-        questions_list = Question.objects.filter(lesson_id=pk)
-        right_answers = 0
-        for question in questions_list:
-            options = Option.objects.values_list('id').filter(question=question, correct=True)
-            if len(options) > 0 and len(options) == Answer.objects.filter(user_id=user, answer__in=options).count():
-                right_answers += 1
-        result = int(right_answers / len(questions_list) * 100)
-        Result.objects.create(lesson_id=pk, user_id=user, result=result)
-        return result
-
     def post(self, request, pk, *args, **kwargs):
         user = request.user.pk
         if Result.objects.filter(lesson_id=pk, user_id=user).exists():
             return Response({"error": "You can take the test only once."}, status=status.HTTP_403_FORBIDDEN)
-        for answer in request.data:
-            Answer.objects.get_or_create(user_id=user, answer_id=request.data[answer])
-        result = self.check_test(user, pk)
+        try:
+            # Result of a concurrent submit is saved first, answers of this one are rolled back
+            with transaction.atomic():
+                TestMixin.save_answers(user, pk, request.data.values())
+                result = TestMixin.check_test(user, pk)
+        except IntegrityError:
+            return Response({"error": "You can take the test only once."}, status=status.HTTP_403_FORBIDDEN)
         return Response({"result": result}, status=status.HTTP_201_CREATED)
+
+
+class TaskQueueAPIView(generics.ListAPIView):
+    """
+    Home tasks on review of courses led by the curator: unclaimed by default, `?claimed=true` - claimed by the curator
+    """
+    serializer_class = TaskQueueSerializer
+    permission_classes = (IsCurator, )
+    pagination_class = KeysetPagination
+    keyset_tiebreaker = 'id'
+
+    def get_queryset(self):
+        queryset = TaskQueueMixin.queue(self.request.user.pk)
+        if self.request.query_params.get('claimed') == 'true':
+            return queryset.filter(curator_id=self.request.user.pk)
+        return queryset.filter(curator__isnull=True)
+
+
+class TaskClaimAPIView(APIView):
+    """
+    Claim of the oldest unclaimed tasks of the queue: {"count": 10}
+    """
+    permission_classes = (IsCurator, )
+
+    def post(self, request, *args, **kwargs):
+        serializer = TaskClaimSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tasks = TaskQueueMixin.claim(request.user.pk, serializer.validated_data['count'])
+        data = TaskQueueSerializer(tasks, many=True, context={'request': request}).data
+        return Response({'results': data}, status=status.HTTP_200_OK)
+
+
+class TaskReviewAPIView(APIView):
+    """
+    Review of the task claimed by the curator: {"status": 3 (edit) or 4 (accept), "review": "comment"}
+    """
+    permission_classes = (IsCurator, )
+
+    def put(self, request, pk, *args, **kwargs):
+        task = get_object_or_404(TaskQueueMixin.queue(request.user.pk), pk=pk, curator_id=request.user.pk)
+        serializer = TaskReviewSerializer(task, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class TaskImageDownloadAPIView(APIView):
+    """
+    Image of home task, `?variant=320.webp` - processed variant of the image
+    """
+    permission_classes = (TaskImagePermission, )
+
+    def get(self, request, pk, *args, **kwargs):
+        image = get_object_or_404(ImageTask.objects.select_related('task__lesson__course').
+                                  only('image', 'image_variants', 'task__user_id', 'task__lesson__course__admin_id'),
+                                  pk=pk)
+        self.check_object_permissions(request, image)
+        name = image.image.name
+        if variant := request.query_params.get('variant'):
+            if variant not in image.image_variants:
+                raise Http404
+            name = image.image_variants[variant]
+        return MediaMixin.serve(request, image.image.storage, name)
+
+
+class UploadSessionAPIView(generics.CreateAPIView):
+    """
+    Start of chunked upload of a material or a cover:
+    {"target": "material", "course": "slug", "lesson": 1, "filename": "file.pdf", "size": 1000, "sha256": "..."}
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = (IsSuperuserAllOrAdministratorActiveCoursesAllOrCuratorActiveCoursesReadOnly, )
+
+    def perform_create(self, serializer):
+        self.check_object_permissions(self.request, serializer.validated_data['course'])
+        UploadMixin.start(serializer.save(user_id=self.request.user.pk))
+
+
+class UploadSessionDetailAPIView(APIView):
+    """
+    GET - received bytes to resume the upload, PATCH - next chunk as raw body with `Upload-Offset` header
+    equal to received bytes and optional `Upload-Checksum` (SHA-256 hex of the chunk), DELETE - abort
+    """
+    permission_classes = (IsSuperuserAllOrAdministratorActiveCoursesAllOrCuratorActiveCoursesReadOnly, )
+
+    def get_session(self, lock=False):
+        queryset = UploadSession.objects.select_related('course', 'lesson')
+        if lock:
+            queryset = queryset.select_for_update(of=('self', ))
+        session = get_object_or_404(queryset, pk=self.kwargs['pk'], user_id=self.request.user.pk)
+        self.check_object_permissions(self.request, session.course)
+        return session
+
+    def get(self, request, *args, **kwargs):
+        return Response(UploadSessionSerializer(self.get_session()).data, status=status.HTTP_200_OK)
+
+    def patch(self, request, *args, **kwargs):
+        try:
+            length = int(request.META['CONTENT_LENGTH'])
+            offset = int(request.META['HTTP_UPLOAD_OFFSET'])
+        except (KeyError, ValueError):
+            return Response({'error': 'Content-Length and Upload-Offset headers are required.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            session = self.get_session(lock=True)
+            if offset != session.received:
+                return Response({'error': 'Upload-Offset must be equal to received bytes.',
+                                 'received': session.received}, status=status.HTTP_409_CONFLICT)
+            if length > UPLOADS['CHUNK_SIZE'] or offset + length > session.size:
+                return Response({'error': 'Chunk is larger than max chunk size or the rest of the file.'},
+                                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            if not UploadMixin.write_chunk(session, request.stream, length, request.META.get('HTTP_UPLOAD_CHECKSUM')):
+                return Response({'error': 'Checksum of the chunk does not match.', 'received': session.received},
+                                status=status.HTTP_400_BAD_REQUEST)
+        return Response({'received': session.received}, status=status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        UploadMixin.abort(self.get_session())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadCompleteAPIView(UploadSessionDetailAPIView):
+    """
+    Completed upload is attached to a new material of the lesson or to the cover of the course
+    """
+    http_method_names = ['post', 'options']
+
+    def post(self, request, *args, **kwargs):
+        with transaction.atomic():
+            session = self.get_session(lock=True)
+            if session.received != session.size:
+                return Response({'error': 'File is not uploaded completely.', 'received': session.received},
+                                status=status.HTTP_409_CONFLICT)
+            if session.sha256 and UploadMixin.checksum(session) != session.sha256:
+                UploadMixin.abort(session)
+                return Response({'error': 'Checksum of the file does not match, upload is aborted.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            attached = UploadMixin.complete(session)
+        if session.target == UploadSession.MATERIAL:
+            return Response({'id': attached.pk, 'file': attached.file.name, 'filename': attached.filename},
+                            status=status.HTTP_201_CREATED)
+        return Response({'slug': attached.slug, 'cover': attached.cover.name, 'cover_status': attached.cover_status},
+                        status=status.HTTP_200_OK)
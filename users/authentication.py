@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+
+User = get_user_model()
+
+
+class TokenClaimsUser(TokenUser):
+    """
+    User built from access token claims without database query.
+    Fields which are not in claims are taken from User loaded on first access,
+    async views use only claims, the load is synchronous.
+    Access tokens aren't checked against the database, so deleted users keep access until their
+    access token expires (ACCESS_TOKEN_LIFETIME), refresh of tokens checks the user.
+    """
+    def __str__(self):
+        return str(self.user)
+
+    def claim(self, name):
+        if name not in self.token:
+            raise AuthenticationFailed(f'Token has no {name} claim', code='token_not_valid')
+        return self.token[name]
+
+    @cached_property
+    def role(self):
+        return self.claim('role')
+
+    @cached_property
+    def slug(self):
+        return self.claim('slug')
+
+    @cached_property
+    def profile_access(self):
+        return self.token.get('profile_access', False)
+
+    @cached_property
+    def user(self):
+        if user := User.objects.filter(pk=self.pk).first():
+            return user
+        raise AuthenticationFailed('User not found', code='user_not_found')
+
+    def __getattr__(self, attr):
+        if attr == 'token' or attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.user, attr)
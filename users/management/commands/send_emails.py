@@ -0,0 +1,114 @@
+import logging
+import time
+from datetime import timedelta
+from smtplib import SMTPException
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from courses_platform_api.choices_types import EmailStatus
+from courses_platform_api.settings import EMAIL_OUTBOX
+from users.models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails in batches over one SMTP connection, failed emails are retried with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EMAIL_OUTBOX['BATCH_SIZE'])
+        parser.add_argument('--max-attempts', type=int, default=EMAIL_OUTBOX['MAX_ATTEMPTS'])
+        parser.add_argument('--retry-delay', type=int, default=EMAIL_OUTBOX['RETRY_DELAY'],
+                            help='seconds before the first retry, doubled on every next attempt')
+        parser.add_argument('--loop', action='store_true', help='keep polling the outbox')
+        parser.add_argument('--interval', type=int, default=EMAIL_OUTBOX['POLL_INTERVAL'],
+                            help='seconds between polls of the empty outbox')
+        parser.add_argument('--stats', action='store_true', help='show count of emails by status and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            return self.show_stats()
+
+        while True:
+            sent, failed = self.send_batch(options['batch_size'], options['max_attempts'], options['retry_delay'])
+            if sent or failed:
+                self.stdout.write(f'Sent {sent} emails, failed {failed} emails.')
+            if not options['loop']:
+                break
+            if sent + failed < options['batch_size']:
+                time.sleep(options['interval'])
+
+    @staticmethod
+    def backoff(attempts, retry_delay):
+        return timezone.now() + timedelta(seconds=retry_delay * 2 ** (attempts - 1))
+
+    def claim(self, batch_size, retry_delay):
+        """
+        Due emails are claimed by a short transaction: attempt is counted and the email is postponed by backoff,
+        so it's retried, when the worker stops before saving of the result. SMTP runs without row locks.
+        """
+        with transaction.atomic():
+            emails = list(OutgoingEmail.objects.select_for_update(skip_locked=True).
+                          filter(status=EmailStatus.PENDING, send_after__lte=timezone.now()).
+                          order_by('send_after')[:batch_size])
+            for email in emails:
+                email.attempts += 1
+                email.send_after = self.backoff(email.attempts, retry_delay)
+            OutgoingEmail.objects.bulk_update(emails, ['attempts', 'send_after'])
+        return emails
+
+    def send_batch(self, batch_size, max_attempts, retry_delay):
+        emails = self.claim(batch_size, retry_delay)
+        if not emails:
+            return 0, 0
+
+        sent = failed = 0
+        connection = get_connection()
+        try:
+            connection.open()
+        except (OSError, SMTPException) as e:
+            for email in emails:
+                self.retry(email, e, max_attempts, retry_delay)
+            failed = len(emails)
+        else:
+            try:
+                for email in emails:
+                    message = EmailMultiAlternatives(email.subject, email.message, email.from_email, [email.recipient],
+                                                     connection=connection)
+                    if email.html_message:
+                        message.attach_alternative(email.html_message, 'text/html')
+                    try:
+                        message.send()
+                    except Exception as e:
+                        failed += 1
+                        self.retry(email, e, max_attempts, retry_delay)
+                    else:
+                        sent += 1
+                        email.status = EmailStatus.SENT
+                        email.sent = timezone.now()
+            finally:
+                try:
+                    connection.close()
+                except (OSError, SMTPException):
+                    pass
+        OutgoingEmail.objects.bulk_update(emails, ['status', 'last_error', 'send_after', 'sent'])
+        return sent, failed
+
+    @classmethod
+    def retry(cls, email, error, max_attempts, retry_delay):
+        email.last_error = repr(error)
+        if email.attempts >= max_attempts:
+            email.status = EmailStatus.FAILED
+            logger.error('Email %s to %s failed after %s attempts: %r', email.pk, email.recipient, email.attempts, error)
+        else:
+            email.send_after = cls.backoff(email.attempts, retry_delay)
+            logger.warning('Email %s to %s failed, attempt %s: %r', email.pk, email.recipient, email.attempts, error)
+
+    def show_stats(self):
+        statuses = dict(EmailStatus.CHOICES)
+        for row in OutgoingEmail.objects.values('status').annotate(count=Count('id')).order_by('status'):
+            self.stdout.write(f"{statuses[row['status']]}: {row['count']}")
@@ -1,6 +1,7 @@
 from django.contrib.auth.base_user import BaseUserManager
 
 from courses_platform_api.choices_types import ProfileRoles
+from courses_platform_api.mixins import GeneratorMixin
 
 
 class UserManager(BaseUserManager):
@@ -24,3 +25,13 @@ class UserManager(BaseUserManager):
 
     def create_superuser(self, email, password, role=ProfileRoles.SUPERUSER, **extra_fields):
         return self._create_user(email, password, role, **extra_fields)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Users without slug get slugs generated at once
+        """
+        objs = list(objs)
+        missing = [user for user in objs if not user.slug]
+        for user, slug in zip(missing, GeneratorMixin.slugs(len(missing))):
+            user.slug = slug
+        return super().bulk_create(objs, *args, **kwargs)
@@ -0,0 +1,35 @@
+# Generated by Django 4.1.3 on 2026-10-18 12:55
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_alter_user_slug'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=200, verbose_name='subject')),
+                ('message', models.TextField(verbose_name='message')),
+                ('html_message', models.TextField(blank=True, null=True, verbose_name='html message')),
+                ('from_email', models.CharField(max_length=254, verbose_name='from email')),
+                ('recipient', models.EmailField(max_length=254, verbose_name='recipient')),
+                ('status', models.IntegerField(choices=[(1, 'Pending'), (2, 'Sent'), (3, 'Failed')], default=1, verbose_name='status')),
+                ('attempts', models.SmallIntegerField(default=0, verbose_name='sending attempts')),
+                ('last_error', models.TextField(blank=True, null=True, verbose_name='last sending error')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created date')),
+                ('send_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='send after date')),
+                ('sent', models.DateTimeField(blank=True, null=True, verbose_name='sent date')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='outgoingemail',
+            index=models.Index(fields=['status', 'send_after'], name='users_outgo_status_ebc411_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.3 on 2026-10-18 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['user', 'lead'], name='lead_user_lead_idx'),
+        ),
+    ]
@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from django.contrib.postgres.expressions import ArraySubquery
 from django.db.models import OuterRef, F, Value
 from django.db.models.functions import JSONObject, Concat
@@ -5,27 +7,76 @@ from rest_framework import generics
 
 from courses.models import Permission
 from courses_platform_api.choices_types import ProfileRoles
+from courses_platform_api.export import StreamingExportMixin
+from courses_platform_api.pagination import KeysetPagination
 
 
 class UserMixin:
-    @staticmethod
-    def annotation():
-        courses_list = Permission.objects.filter(user_id=OuterRef("pk"), course__isnull=False). \
-                annotate(data=JSONObject(access=F('access'), name=F('course__name'), slug=F('course__slug'))).\
-                values_list("data").order_by('course__name', '-access')
+    SUBQUERY = 'subquery'
+    PREFETCH = 'prefetch'
 
+    @staticmethod
+    def annotation(courses_list=True):
         annotation = {
             "full_name": Concat('first_name', Value(' '), 'last_name'),
-            "courses_list": ArraySubquery(courses_list)
         }
+        if courses_list:
+            courses = Permission.objects.filter(user_id=OuterRef("pk"), course__isnull=False). \
+                annotate(data=JSONObject(access=F('access'), name=F('course__name'), slug=F('course__slug'))).\
+                values_list("data").order_by('course__name', '-access')
+            annotation["courses_list"] = ArraySubquery(courses)
         return annotation
 
+    @staticmethod
+    def attach_courses_list(users):
+        """
+        Courses lists of all users by one query, instead of subquery for every user
+        """
+        slugs = [user['slug'] if isinstance(user, dict) else user.slug for user in users]
+        courses = Permission.objects.filter(user__slug__in=slugs, course__isnull=False).\
+            values('access', user_slug=F('user__slug'), name=F('course__name'), slug=F('course__slug')).\
+            order_by('course__name', '-access')
+
+        courses_lists = defaultdict(list)
+        for course in courses:
+            courses_lists[course.pop('user_slug')].append(course)
+        for user, slug in zip(users, slugs):
+            if isinstance(user, dict):
+                user['courses_list'] = courses_lists[slug]
+            else:
+                user.courses_list = courses_lists[slug]
+        return users
+
+
+class UsersCoursesListMixin:
+    """
+    Loading strategy of users courses lists:
+    subquery - ArraySubquery for every user of the queryset,
+    prefetch - one query for users of the page after pagination
+    """
+    courses_list_strategy = UserMixin.PREFETCH
+
+    def get_annotation(self):
+        return UserMixin.annotation(courses_list=self.courses_list_strategy == UserMixin.SUBQUERY)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and self.courses_list_strategy == UserMixin.PREFETCH:
+            UserMixin.attach_courses_list(page)
+        return page
+
+    def prepare_export_chunk(self, rows):
+        rows = super().prepare_export_chunk(rows)
+        if self.courses_list_strategy == UserMixin.PREFETCH:
+            UserMixin.attach_courses_list(rows)
+        return rows
+
+
+class UsersListAdministratorLimitPermissionAPIView(StreamingExportMixin, generics.ListAPIView):
+    pagination_class = KeysetPagination
 
-class UsersListAdministratorLimitPermissionAPIView(generics.ListAPIView):
-    def filter_queryset(self, queryset):
-        queryset = super().filter_queryset(queryset)
-        for backend in list(self.filter_backends):
-            queryset = backend().filter_queryset(self.request, queryset, self)
+    @property
+    def results_limit(self):
         if self.request.user.role == ProfileRoles.ADMINISTRATOR and not self.request.auth['profile_access']:
-            return queryset[:5]
-        return queryset
+            return 5
+        return None
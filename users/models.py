@@ -2,15 +2,15 @@ import random
 from string import digits
 
 from django.contrib.auth.base_user import AbstractBaseUser
-from django.core.mail import send_mail
 from django.db import models
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
 from rest_framework.authtoken.models import Token
 
 from courses_platform_api.mixins import GeneratorMixin
 from courses_platform_api.settings import EMAIL_HOST_USER, FRONT_END_NEW_PASSWORD_URL
-from courses_platform_api.choices_types import ProfileRoles
+from courses_platform_api.choices_types import ProfileRoles, EmailStatus
 from users.managers import UserManager
 
 
@@ -39,7 +39,7 @@ class User(AbstractBaseUser):
         return ''.join(random.sample(digits, length))
 
     def set_lead(self, lead):
-        Lead.objects.create(user=self, lead=lead)
+        Lead.objects.create(user=self, lead_id=lead.pk)
 
     def send_security_code(self):
         self.security_code = self.generate_security_code()
@@ -52,8 +52,7 @@ class User(AbstractBaseUser):
         }
         subject = 'Courses platform security code'
         html = render_to_string('email_security_code.html', context=context)
-        message = strip_tags(html)
-        send_mail(subject, message, EMAIL_HOST_USER, [self.email], html_message=html)
+        OutgoingEmail.queue(subject, strip_tags(html), self.email, html_message=html)
 
     def send_invitation_link(self):
         token = InvitationToken.objects.create(user_id=self.id)
@@ -66,16 +65,15 @@ class User(AbstractBaseUser):
 
         subject = 'Invitation to Courses Platform password creation'
         html = render_to_string('invitation_to_courses_platform.html', context=context)
-        message = strip_tags(html)
-
-        send_mail(subject, message, EMAIL_HOST_USER, [self.email], html_message=html)
+        OutgoingEmail.queue(subject, strip_tags(html), self.email, html_message=html)
 
     def __str__(self):
         return self.get_full_name()
 
     def save(self, *args, **kwargs):
         if not self.id:
-            self.slug = GeneratorMixin.slug(self.id)
+            return GeneratorMixin.save_with_slug(self, lambda: super(User, self).save(*args, **kwargs),
+                                                 kwargs.get('using'))
         super().save(*args, **kwargs)
 
 
@@ -86,3 +84,30 @@ class InvitationToken(Token):
 class Lead(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='users')
     lead = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leads')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'lead'], name='lead_user_lead_idx'),
+        ]
+
+
+class OutgoingEmail(models.Model):
+    subject = models.CharField('subject', max_length=200)
+    message = models.TextField('message')
+    html_message = models.TextField('html message', null=True, blank=True)
+    from_email = models.CharField('from email', max_length=254)
+    recipient = models.EmailField('recipient')
+    status = models.IntegerField('status', choices=EmailStatus.CHOICES, default=EmailStatus.PENDING)
+    attempts = models.SmallIntegerField('sending attempts', default=0)
+    last_error = models.TextField('last sending error', null=True, blank=True)
+    created = models.DateTimeField('created date', auto_now_add=True)
+    send_after = models.DateTimeField('send after date', default=timezone.now)
+    sent = models.DateTimeField('sent date', null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'send_after'])]
+
+    @classmethod
+    def queue(cls, subject, message, recipient, html_message=None):
+        return cls.objects.create(subject=subject, message=message, html_message=html_message,
+                                  from_email=EMAIL_HOST_USER, recipient=recipient)
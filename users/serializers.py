@@ -4,10 +4,13 @@ import django.contrib.auth.password_validation as validators
 from django.core import exceptions
 
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 
 from courses.models import Permission, Course
 from courses_platform_api.choices_types import ProfileRoles
+from courses_platform_api.metrics import SerializerTimingMixin
 from users.models import InvitationToken
 
 User = get_user_model()
@@ -22,12 +25,45 @@ class TokenEmailObtainPairSerializer(TokenObtainPairSerializer):
 
         @classmethod
         def get_token(cls, user):
-            token = super().get_token(user)
+            return cls.set_claims(super().get_token(user), user)
+
+        @staticmethod
+        def set_claims(token, user):
+            token['role'] = user.role
+            token['slug'] = user.slug
             if user.role == ProfileRoles.ADMINISTRATOR:
                 token['profile_access'] = Permission.objects.filter(user=user, access=True).exists()
+            elif 'profile_access' in token:
+                del token['profile_access']
             return token
 
 
+class TokenActiveUserRefreshSerializer(TokenRefreshSerializer):
+    """
+    Access tokens are stateless, so deleted users lose access on refresh.
+    Claims are taken from the user again, so changes of role and profile access apply on refresh.
+    """
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}).first()
+        if user is None:
+            raise InvalidToken('User not found')
+        TokenEmailObtainPairSerializer.set_claims(refresh, user)
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    pass
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
+
+
 class RequestEmailSerializer(serializers.Serializer):
     email = serializers.EmailField(min_length=2)
 
@@ -68,7 +104,7 @@ class RecoveryPasswordSerializer(serializers.Serializer):
         return attr
 
 
-class UserSignUpSerializer(serializers.ModelSerializer):
+class UserSignUpSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validators.validate_password])
     confirm_password = serializers.CharField(write_only=True, required=True)
 
@@ -82,7 +118,7 @@ class UserSignUpSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class CreateUserSerializer(serializers.ModelSerializer):
+class CreateUserSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     curator_lead = serializers.IntegerField(read_only=True)
 
     class Meta:
@@ -90,7 +126,7 @@ class CreateUserSerializer(serializers.ModelSerializer):
         fields = ('role', 'first_name', 'last_name', 'email', 'phone', 'instagram', 'facebook', 'curator_lead')
 
 
-class UserCoursesListSerializer(serializers.ModelSerializer):
+class UserCoursesListSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     access = serializers.BooleanField()
 
     class Meta:
@@ -98,7 +134,7 @@ class UserCoursesListSerializer(serializers.ModelSerializer):
         fields = ('slug', 'name', 'access')
 
 
-class UsersListSerializer(serializers.ModelSerializer):
+class UsersListSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     slug = serializers.CharField(read_only=True)
     role = serializers.SerializerMethodField()
     full_name = serializers.CharField()
@@ -119,7 +155,7 @@ class UsersListForCuratorSerializer(UsersListSerializer):
         fields = ('slug', 'role', 'full_name', 'last_login', 'date_joined', 'courses_list')
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     last_login = serializers.DateTimeField(read_only=True)
     role = serializers.SerializerMethodField(read_only=True)
     email = serializers.EmailField(read_only=True)
@@ -0,0 +1,93 @@
+from io import StringIO
+from smtplib import SMTPException
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from courses_platform_api.choices_types import EmailStatus
+from users.models import OutgoingEmail
+
+User = get_user_model()
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise SMTPException('Connection unexpectedly closed')
+
+
+class UnreachableEmailBackend(BaseEmailBackend):
+    def open(self):
+        raise ConnectionRefusedError('Connection refused')
+
+    def send_messages(self, email_messages):
+        raise AssertionError('Messages are sent without connection')
+
+
+class SendEmailsCommandTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user@user.user', first_name='User')
+
+    def test_security_code_queued_and_sent_by_command(self):
+        self.user.send_security_code()
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutgoingEmail.objects.get(recipient=self.user.email)
+        self.assertEqual(email.status, EmailStatus.PENDING)
+
+        call_command('send_emails', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.user.email])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        email.refresh_from_db()
+        self.assertEqual(email.status, EmailStatus.SENT)
+        self.assertEqual(email.attempts, 1)
+        self.assertTrue(email.sent)
+
+    def test_emails_sent_in_batches(self):
+        for number in range(5):
+            User.objects.create_user(email=f'user{number}@user.user').send_invitation_link()
+        call_command('send_emails', '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(OutgoingEmail.objects.filter(status=EmailStatus.PENDING).count(), 3)
+
+    @override_settings(EMAIL_BACKEND='users.tests.test_commands.FailingEmailBackend')
+    def test_failed_email_retried_with_backoff(self):
+        self.user.send_security_code()
+        with self.assertLogs('users.management.commands.send_emails', level='WARNING'):
+            call_command('send_emails', '--retry-delay', '60', stdout=StringIO())
+        email = OutgoingEmail.objects.get(recipient=self.user.email)
+        self.assertEqual(email.status, EmailStatus.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('Connection unexpectedly closed', email.last_error)
+        self.assertGreater(email.send_after, timezone.now())
+
+        call_command('send_emails', stdout=StringIO())
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 1)
+
+        OutgoingEmail.objects.update(send_after=timezone.now())
+        with self.assertLogs('users.management.commands.send_emails', level='ERROR'):
+            call_command('send_emails', '--max-attempts', '2', stdout=StringIO())
+        email.refresh_from_db()
+        self.assertEqual(email.status, EmailStatus.FAILED)
+
+    @override_settings(EMAIL_BACKEND='users.tests.test_commands.UnreachableEmailBackend')
+    def test_unreachable_server_postpones_whole_batch(self):
+        self.user.send_security_code()
+        self.user.send_invitation_link()
+        with self.assertLogs('users.management.commands.send_emails', level='WARNING'):
+            call_command('send_emails', stdout=StringIO())
+        for email in OutgoingEmail.objects.all():
+            self.assertEqual((email.status, email.attempts), (EmailStatus.PENDING, 1))
+            self.assertIn('Connection refused', email.last_error)
+            self.assertGreater(email.send_after, timezone.now())
+
+    def test_outbox_stats(self):
+        self.user.send_security_code()
+        out = StringIO()
+        call_command('send_emails', '--stats', stdout=out)
+        self.assertIn('Pending: 1', out.getvalue())
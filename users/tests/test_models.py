@@ -1,7 +1,11 @@
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from rest_framework.test import APITestCase
 
 from courses_platform_api.choices_types import ProfileRoles
+from courses_platform_api.mixins import GeneratorMixin
 
 User = get_user_model()
 
@@ -22,3 +26,27 @@ class TestUserModel(APITestCase):
         self.assertTrue(user.date_joined)
         self.assertEqual(user.email, 'user@user.user')
         self.assertEqual(user.role, ProfileRoles.LEARNER)
+
+    def test_slugs_are_unique_slug_chars(self):
+        slugs = GeneratorMixin.slugs(1000)
+        self.assertEqual(len(set(slugs)), 1000)
+        self.assertTrue(all(len(slug) == 15 and slug.replace('-', '').replace('_', '').isalnum() for slug in slugs))
+
+    def test_taken_slug_is_replaced(self):
+        taken = User.objects.create_user(email='user@user.user').slug
+        with mock.patch.object(GeneratorMixin, 'slug', side_effect=[taken, 'free-slug']):
+            user = User.objects.create_user(email='other@user.user')
+        self.assertEqual(user.slug, 'free-slug')
+
+    def test_other_integrity_errors_are_not_retried(self):
+        User.objects.create_user(email='user@user.user')
+        with mock.patch.object(GeneratorMixin, 'slug', wraps=GeneratorMixin.slug) as slug:
+            with self.assertRaises(IntegrityError):
+                User.objects.create_user(email='user@user.user')
+        self.assertEqual(slug.call_count, 1)
+
+    def test_bulk_create_generates_slugs(self):
+        users = User.objects.bulk_create([User(email=f'user{i}@user.user') for i in range(3)] + [
+            User(email='slug@user.user', slug='own-slug')])
+        self.assertEqual(len({user.slug for user in users}), 4)
+        self.assertEqual(users[-1].slug, 'own-slug')
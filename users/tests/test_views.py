@@ -1,13 +1,22 @@
+import csv
+import json
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
 from django.core import mail
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework import status
 
 from rest_framework.test import APITestCase, APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
 from courses.models import Course, Permission
 from courses_platform_api.choices_types import ProfileRoles
+from users.authentication import TokenClaimsUser
 from users.models import InvitationToken, Lead
+from users.views import UsersListAPIView
 
 User = get_user_model()
 
@@ -32,6 +41,48 @@ class TokenObtainPairViewTestCase(APITestCase):
         response = self.client.post(self.url, {})
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_access_token_contains_user_claims(self):
+        response = self.client.post(self.url, {'email': 'super@super.super', 'password': 'strong'})
+        token = AccessToken(response.data['access'])
+        self.assertEqual(token['role'], ProfileRoles.SUPERUSER)
+        self.assertEqual(token['slug'], self.user.slug)
+
+    def test_authenticated_request_does_not_load_user(self):
+        response = self.client.post(self.url, {'email': 'super@super.super', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('v1.0:users:role-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_token_user_loads_other_fields_from_database(self):
+        response = self.client.post(self.url, {'email': 'super@super.super', 'password': 'strong'})
+        user = TokenClaimsUser(AccessToken(response.data['access']))
+        with self.assertNumQueries(0):
+            self.assertEqual(user.role, ProfileRoles.SUPERUSER)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'super@super.super')
+            self.assertEqual(user.date_joined, self.user.date_joined)
+        with self.assertRaises(AttributeError):
+            user.missing_field
+
+    def test_refresh_takes_claims_from_user(self):
+        response = self.client.post(self.url, {'email': 'super@super.super', 'password': 'strong'})
+        self.user.role = ProfileRoles.ADMINISTRATOR
+        self.user.save()
+        response = self.client.post(reverse('v1.0:token_refresh'), {'refresh': response.data['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AccessToken(response.data['access'])['role'], ProfileRoles.ADMINISTRATOR)
+        self.assertFalse(AccessToken(response.data['access'])['profile_access'])
+
+    def test_refresh_of_deleted_user_rejected(self):
+        response = self.client.post(self.url, {'email': 'super@super.super', 'password': 'strong'})
+        refresh = response.data['refresh']
+        response = self.client.post(reverse('v1.0:token_refresh'), {'refresh': refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.delete()
+        response = self.client.post(reverse('v1.0:token_refresh'), {'refresh': refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
 
 class ResetPasswordRequestEmailTestCase(APITestCase):
     def setUp(self):
@@ -400,15 +451,87 @@ class UsersListAPIViewTestCase(APITestCase):
         self.assertEqual(response.data['results'][2]['full_name'], "Bbb Abb")
         self.assertEqual(response.data['results'][3]['full_name'], "Bbb Aaa")
 
+    def walk_pages(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            url = response.data['next']
+        return pages
+
+    def test_users_list_keyset_pagination_walks_all_users_once(self):
+        expected = [user['slug'] for user in self.client.get(self.url + '?ordering=-full_name').data['results']]
+        pages = self.walk_pages(self.url + '?ordering=-full_name&limit=3')
+        self.assertEqual(len(pages), 4)
+        self.assertEqual([user['slug'] for page in pages for user in page['results']], expected)
+
+        response = self.client.get(pages[2]['previous'])
+        self.assertEqual(response.data['results'], pages[1]['results'])
+        self.assertEqual(response.data['next'], pages[1]['next'])
+
+    def test_administrator_without_access_limit_applied_to_all_pages(self):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user3@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        pages = self.walk_pages(self.url + '?limit=2')
+        self.assertEqual(len([user for page in pages for user in page['results']]), 5)
+
+    def test_users_list_count_modes(self):
+        response = self.client.get(self.url + '?count=approximate')
+        self.assertTrue(type(response.data['count']) is int)
+        response = self.client.get(self.url + '?count=none')
+        self.assertFalse('count' in response.data)
+
+    def test_users_list_courses_list_of_page_users(self):
+        response = self.client.get(self.url + '?limit=50')
+        user = next(user for user in response.data['results'] if user['slug'] == self.user7.slug)
+        self.assertEqual([(course['name'], course['access']) for course in user['courses_list']],
+                         [('Course 1', True), ('Course 2', False)])
+
+    def test_users_list_changed_cursor_not_found(self):
+        response = self.client.get(self.url + '?cursor=changed')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @mock.patch.object(UsersListAPIView, 'export_chunk_size', 3)
+    def test_users_list_export_ndjson_streams_all_users(self):
+        response = self.client.get(self.url + '?export=ndjson&ordering=-full_name')
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        users = [json.loads(line) for line in content.splitlines()]
+        expected = [user['slug'] for page in self.walk_pages(self.url + '?ordering=-full_name') for user in page['results']]
+        self.assertEqual([user['slug'] for user in users], expected)
+        user = next(user for user in users if user['slug'] == self.user7.slug)
+        self.assertEqual([course['name'] for course in user['courses_list']], ['Course 1', 'Course 2'])
+
+    def test_users_list_export_csv_for_curator_and_limited_administrator(self):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user3@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        response = self.client.get(self.url + '?export=csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="users.csv"')
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:3], ['slug', 'role', 'full_name'])
+        self.assertEqual(len(rows), 6)
+
+        Permission.objects.create(user=self.user2, access=True)
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user4@user.com', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        response = self.client.get(self.url + '?export=csv')
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ['slug', 'role', 'full_name', 'last_login', 'date_joined', 'courses_list'])
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(json.loads(rows[1][-1])[0]['name'], 'Course 1')
+
     def test_superuser_create_administrator_and_send_invitation_mail(self):
         response = self.client.post(self.url, self.data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        call_command('send_emails')
         self.assertEqual(len(mail.outbox), 1)
 
     def test_superuser_create_curator_and_send_invitation_mail(self):
         self.data['role'] = 3
         response = self.client.post(self.url, self.data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        call_command('send_emails')
         self.assertEqual(len(mail.outbox), 1)
 
     def test_curator_permission_no_access_to_post_method(self):
@@ -423,6 +546,7 @@ class UsersListAPIViewTestCase(APITestCase):
         self.data['role'] = 3
         response = self.client.post(self.url, self.data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        call_command('send_emails')
         self.assertEqual(len(mail.outbox), 1)
         self.assertTrue(Lead.objects.filter(user__email=self.data['email'], lead=self.user2).exists())
 
@@ -7,18 +7,19 @@ from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from courses.catalog import CatalogCacheMixin, catalog_cache
 from courses.models import Permission, Course
 from courses.serializers import CourseSerializer
 from courses_platform_api.permissions import IsSuperuserOrAdministratorAllOrCuratorReadOnly, IsSuperuser
 from courses_platform_api.choices_types import ProfileRoles
 from users.filters import UsersFilter
-from users.mixin import UserMixin, UsersListAdministratorLimitPermissionAPIView
+from users.mixin import UserMixin, UsersListAdministratorLimitPermissionAPIView, UsersCoursesListMixin
 from users.models import InvitationToken, Lead
 from users.serializers import TokenEmailObtainPairSerializer, RequestEmailSerializer, SecurityCodeSerializer, \
     UserSignUpSerializer, UsersListSerializer, RecoveryPasswordSerializer, UsersListForCuratorSerializer, \
-    CreateUserSerializer, UserSerializer
+    CreateUserSerializer, UserSerializer, TokenActiveUserRefreshSerializer
 
 User = get_user_model()
 
@@ -27,6 +28,10 @@ class EmailTokenObtainPairView(TokenObtainPairView):
     serializer_class = TokenEmailObtainPairSerializer
 
 
+class ActiveUserTokenRefreshView(TokenRefreshView):
+    serializer_class = TokenActiveUserRefreshSerializer
+
+
 class ResetPasswordRequestEmailAPIView(generics.GenericAPIView):
     serializer_class = RequestEmailSerializer
     permission_classes = (AllowAny, )
@@ -85,7 +90,7 @@ class UserSignUpAPIView(generics.CreateAPIView):
         User.objects.create_user(**user_data)
 
 
-class UsersListAPIView(UsersListAdministratorLimitPermissionAPIView, generics.CreateAPIView):
+class UsersListAPIView(UsersCoursesListMixin, UsersListAdministratorLimitPermissionAPIView, generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (IsSuperuserOrAdministratorAllOrCuratorReadOnly, )
 
@@ -94,13 +99,14 @@ class UsersListAPIView(UsersListAdministratorLimitPermissionAPIView, generics.Cr
 
     ordering_fields = ['role', 'full_name']
     ordering = ['role', 'full_name']
+    export_filename = 'users'
 
     def get_queryset(self):
         if self.request.method == 'GET':
             pk = self.request.user.id
             role = self.request.user.role
             default_values = ['slug', 'role', 'email', 'phone', 'instagram', 'facebook', 'last_login', 'date_joined']
-            annotation = UserMixin.annotation()
+            annotation = self.get_annotation()
 
             if role == ProfileRoles.ADMINISTRATOR:
                 queryset = User.objects.values(*default_values).\
@@ -183,26 +189,29 @@ class AdministratorSwitchStatusAPIView(APIView):
             admin_permission.delete()
             if first_course := Course.objects.values_list('id').filter(admin__slug=slug).order_by('id'):
                 Course.objects.filter(admin__slug=slug).exclude(id=first_course[0][0]).update(is_active=False)
+                catalog_cache.bump()
             return Response({'access': False}, status=status.HTTP_204_NO_CONTENT)
         user = User.objects.values_list('id').get(slug=slug)[0]
         Permission.objects.create(user_id=user, access=True)
         return Response({'access': True}, status=status.HTTP_200_OK)
 
 
-class UserCoursesListAPIView(generics.ListAPIView):
+class UserCoursesListAPIView(CatalogCacheMixin, generics.ListAPIView):
     serializer_class = CourseSerializer
     permission_classes = (AllowAny, )
+    catalog_user_scope = False
 
     def get_queryset(self):
         slug = self.kwargs['slug']
         return Course.objects.filter(admin__slug=slug)
 
 
-class UserCourseAPIView(generics.RetrieveAPIView):
+class UserCourseAPIView(CatalogCacheMixin, generics.RetrieveAPIView):
     serializer_class = CourseSerializer
     permission_classes = (AllowAny, )
+    catalog_user_scope = False
 
-    def get(self, request, *args, **kwargs):
+    def catalog_response(self, request, *args, **kwargs):
         course_slug = self.kwargs.get('course_slug')
         if course := Course.objects.get(slug=course_slug):
             serializer = CourseSerializer(course)